@@ -1,4 +1,5 @@
 import os
+import re
 from logging.config import fileConfig
 
 from alembic import context
@@ -8,10 +9,15 @@ from sqlalchemy import engine_from_config, pool
 # access to the values within the .ini file in use.
 config = context.config
 
+# A connection is passed when migrating from the app (app.prestart), which
+# has its own logging setup
+app_connection = config.attributes.get("connection")
+
 # Interpret the config file for Python logging.
 # This line sets up loggers basically.
-assert config.config_file_name is not None
-fileConfig(config.config_file_name)
+if app_connection is None:
+    assert config.config_file_name is not None
+    fileConfig(config.config_file_name)
 
 # add your model's MetaData object here
 # for 'autogenerate' support
@@ -30,6 +36,15 @@ target_metadata = SQLModel.metadata
 # ... etc.
 
 
+# The monthly partitions of item are managed by app.item_partitions, not the
+# models
+ITEM_PARTITION_NAME = re.compile(r"item_\d{4}_\d{2}")
+
+
+def include_name(name, type_, parent_names):
+    return not (type_ == "table" and ITEM_PARTITION_NAME.fullmatch(name))
+
+
 def get_url():
     return str(settings.DATABASE_URL)
 
@@ -48,7 +63,8 @@ def run_migrations_offline():
     """
     url = get_url()
     context.configure(
-        url=url, target_metadata=target_metadata, literal_binds=True, compare_type=True
+        url=url, target_metadata=target_metadata, literal_binds=True,
+        compare_type=True, include_name=include_name,
     )
 
     with context.begin_transaction():
@@ -62,6 +78,15 @@ def run_migrations_online():
     and associate a connection with the context.
 
     """
+    if app_connection is not None:
+        context.configure(
+            connection=app_connection, target_metadata=target_metadata, compare_type=True,
+            include_name=include_name,
+        )
+        with context.begin_transaction():
+            context.run_migrations()
+        return
+
     configuration = config.get_section(config.config_ini_section)
     assert configuration is not None
     configuration["sqlalchemy.url"] = get_url()
@@ -73,7 +98,8 @@ def run_migrations_online():
 
     with connectable.connect() as connection:
         context.configure(
-            connection=connection, target_metadata=target_metadata, compare_type=True
+            connection=connection, target_metadata=target_metadata, compare_type=True,
+            include_name=include_name,
         )
 
         with context.begin_transaction():
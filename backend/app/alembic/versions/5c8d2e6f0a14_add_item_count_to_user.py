@@ -0,0 +1,83 @@
+"""Add item_count to user, maintained by triggers on item
+
+Revision ID: 5c8d2e6f0a14
+Revises: 7b1e4c2a9d53
+Create Date: 2026-10-18 23:48:05.129563
+
+"""
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel.sql.sqltypes
+
+
+# revision identifiers, used by Alembic.
+revision = '5c8d2e6f0a14'
+down_revision = '7b1e4c2a9d53'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('user', sa.Column('item_count', sa.Integer(), server_default='0', nullable=False))
+
+    # Statement-level, so a bulk insert or delete updates each owner once
+    op.execute("""
+        CREATE FUNCTION update_user_item_count() RETURNS trigger
+        LANGUAGE plpgsql AS $$
+        BEGIN
+            IF TG_OP = 'INSERT' THEN
+                UPDATE "user" SET item_count = item_count + changed.delta
+                FROM (SELECT owner_id, count(*) AS delta FROM new_items GROUP BY owner_id) AS changed
+                WHERE "user".id = changed.owner_id;
+            ELSIF TG_OP = 'DELETE' THEN
+                UPDATE "user" SET item_count = item_count - changed.delta
+                FROM (SELECT owner_id, count(*) AS delta FROM old_items GROUP BY owner_id) AS changed
+                WHERE "user".id = changed.owner_id;
+            ELSE
+                UPDATE "user" SET item_count = item_count + changed.delta
+                FROM (
+                    SELECT owner_id, sum(delta) AS delta FROM (
+                        SELECT owner_id, 1 AS delta FROM new_items
+                        UNION ALL
+                        SELECT owner_id, -1 AS delta FROM old_items
+                    ) AS moved
+                    GROUP BY owner_id
+                    HAVING sum(delta) <> 0
+                ) AS changed
+                WHERE "user".id = changed.owner_id;
+            END IF;
+            RETURN NULL;
+        END
+        $$
+    """)
+    op.execute("""
+        CREATE TRIGGER item_count_insert AFTER INSERT ON item
+        REFERENCING NEW TABLE AS new_items
+        FOR EACH STATEMENT EXECUTE FUNCTION update_user_item_count()
+    """)
+    op.execute("""
+        CREATE TRIGGER item_count_delete AFTER DELETE ON item
+        REFERENCING OLD TABLE AS old_items
+        FOR EACH STATEMENT EXECUTE FUNCTION update_user_item_count()
+    """)
+    op.execute("""
+        CREATE TRIGGER item_count_update AFTER UPDATE ON item
+        REFERENCING OLD TABLE AS old_items NEW TABLE AS new_items
+        FOR EACH STATEMENT EXECUTE FUNCTION update_user_item_count()
+    """)
+
+    # Backfill, with writes to item blocked until the migration commits
+    op.execute('LOCK TABLE item IN SHARE MODE')
+    op.execute("""
+        UPDATE "user" SET item_count = counts.item_count
+        FROM (SELECT owner_id, count(*) AS item_count FROM item GROUP BY owner_id) AS counts
+        WHERE "user".id = counts.owner_id
+    """)
+
+
+def downgrade():
+    op.execute('DROP TRIGGER item_count_update ON item')
+    op.execute('DROP TRIGGER item_count_delete ON item')
+    op.execute('DROP TRIGGER item_count_insert ON item')
+    op.execute('DROP FUNCTION update_user_item_count()')
+    op.drop_column('user', 'item_count')
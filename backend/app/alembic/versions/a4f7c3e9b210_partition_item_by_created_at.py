@@ -0,0 +1,122 @@
+"""Partition item by month of created_at
+
+Revision ID: a4f7c3e9b210
+Revises: 5c8d2e6f0a14
+Create Date: 2026-10-19 00:31:27.604118
+
+"""
+from datetime import UTC, datetime
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel.sql.sqltypes
+
+
+# revision identifiers, used by Alembic.
+revision = 'a4f7c3e9b210'
+down_revision = '5c8d2e6f0a14'
+branch_labels = None
+depends_on = None
+
+# Partitions created ahead of the current month, app.item_partitions keeps
+# creating them afterwards
+PARTITIONS_AHEAD_MONTHS = 3
+
+ITEM_COUNT_TRIGGERS = [
+    """
+    CREATE TRIGGER item_count_insert AFTER INSERT ON item
+    REFERENCING NEW TABLE AS new_items
+    FOR EACH STATEMENT EXECUTE FUNCTION update_user_item_count()
+    """,
+    """
+    CREATE TRIGGER item_count_delete AFTER DELETE ON item
+    REFERENCING OLD TABLE AS old_items
+    FOR EACH STATEMENT EXECUTE FUNCTION update_user_item_count()
+    """,
+    """
+    CREATE TRIGGER item_count_update AFTER UPDATE ON item
+    REFERENCING OLD TABLE AS old_items NEW TABLE AS new_items
+    FOR EACH STATEMENT EXECUTE FUNCTION update_user_item_count()
+    """,
+]
+
+
+def add_months(month, months):
+    index = month.year * 12 + month.month - 1 + months
+    return datetime(index // 12, index % 12 + 1, 1, tzinfo=UTC)
+
+
+def upgrade():
+    # Writes wait until the table is copied, reads of the old table too
+    op.execute('LOCK TABLE item IN ACCESS EXCLUSIVE MODE')
+    op.execute('UPDATE item SET created_at = now() WHERE created_at IS NULL')
+    op.execute('ALTER TABLE item RENAME TO item_unpartitioned')
+    op.execute('ALTER INDEX item_pkey RENAME TO item_unpartitioned_pkey')
+    op.drop_index('ix_item_owner_id', table_name='item_unpartitioned')
+
+    # The primary key has to include the partition key
+    op.execute("""
+        CREATE TABLE item (
+            description VARCHAR(255),
+            title VARCHAR(255) NOT NULL,
+            id UUID NOT NULL,
+            owner_id UUID NOT NULL,
+            created_at TIMESTAMP WITH TIME ZONE NOT NULL,
+            CONSTRAINT item_pkey PRIMARY KEY (id, created_at),
+            CONSTRAINT item_owner_id_fkey FOREIGN KEY (owner_id) REFERENCES "user" (id) ON DELETE CASCADE
+        ) PARTITION BY RANGE (created_at)
+    """)
+    op.create_index('ix_item_owner_id_created_at', 'item', ['owner_id', 'created_at'], unique=False)
+    op.create_index('ix_item_created_at', 'item', ['created_at'], unique=False)
+
+    # One partition per month, from the oldest item to a few months ahead
+    oldest, newest = op.get_bind().execute(
+        sa.text('SELECT min(created_at), max(created_at) FROM item_unpartitioned')
+    ).one()
+    now = datetime.now(UTC)
+    month = datetime((oldest or now).year, (oldest or now).month, 1, tzinfo=UTC)
+    last = max(
+        add_months(datetime(now.year, now.month, 1, tzinfo=UTC), PARTITIONS_AHEAD_MONTHS),
+        datetime((newest or now).year, (newest or now).month, 1, tzinfo=UTC),
+    )
+    while month <= last:
+        op.execute(
+            f"CREATE TABLE item_{month:%Y_%m} PARTITION OF item "
+            f"FOR VALUES FROM ('{month.isoformat()}') TO ('{add_months(month, 1).isoformat()}')"
+        )
+        month = add_months(month, 1)
+
+    # Copied before the triggers exist, user.item_count is already right
+    op.execute("""
+        INSERT INTO item (description, title, id, owner_id, created_at)
+        SELECT description, title, id, owner_id, created_at FROM item_unpartitioned
+    """)
+    op.drop_table('item_unpartitioned')
+    for trigger in ITEM_COUNT_TRIGGERS:
+        op.execute(trigger)
+
+
+def downgrade():
+    op.execute('LOCK TABLE item IN ACCESS EXCLUSIVE MODE')
+    op.execute('ALTER TABLE item RENAME TO item_partitioned')
+    op.execute('ALTER INDEX item_pkey RENAME TO item_partitioned_pkey')
+    op.execute("""
+        CREATE TABLE item (
+            description VARCHAR(255),
+            title VARCHAR(255) NOT NULL,
+            id UUID NOT NULL,
+            owner_id UUID NOT NULL,
+            created_at TIMESTAMP WITH TIME ZONE,
+            CONSTRAINT item_pkey PRIMARY KEY (id),
+            CONSTRAINT item_owner_id_fkey FOREIGN KEY (owner_id) REFERENCES "user" (id) ON DELETE CASCADE
+        )
+    """)
+    op.execute("""
+        INSERT INTO item (description, title, id, owner_id, created_at)
+        SELECT description, title, id, owner_id, created_at FROM item_partitioned
+    """)
+    # Drops the partitions, their indexes and the triggers
+    op.drop_table('item_partitioned')
+    op.create_index(op.f('ix_item_owner_id'), 'item', ['owner_id'], unique=False)
+    for trigger in ITEM_COUNT_TRIGGERS:
+        op.execute(trigger)
@@ -0,0 +1,29 @@
+"""Add search_vector to item
+
+Revision ID: c3d9a1f6e852
+Revises: a4f7c3e9b210
+Create Date: 2026-10-19 09:12:44.318270
+
+"""
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel.sql.sqltypes
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = 'c3d9a1f6e852'
+down_revision = 'a4f7c3e9b210'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Rewrites item and its partitions, with an ACCESS EXCLUSIVE lock
+    op.add_column('item', sa.Column('search_vector', postgresql.TSVECTOR(), sa.Computed("setweight(to_tsvector('english', title), 'A') || setweight(to_tsvector('english', coalesce(description, '')), 'B')", persisted=True), nullable=True))
+    op.create_index('ix_item_search_vector', 'item', ['search_vector'], unique=False, postgresql_using='gin')
+
+
+def downgrade():
+    op.drop_index('ix_item_search_vector', table_name='item', postgresql_using='gin')
+    op.drop_column('item', 'search_vector')
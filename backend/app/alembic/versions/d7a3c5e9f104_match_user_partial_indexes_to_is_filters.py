@@ -0,0 +1,32 @@
+"""Match the user partial indexes to the IS TRUE / IS FALSE filters
+
+Revision ID: d7a3c5e9f104
+Revises: b5e1d7c3a982
+Create Date: 2026-10-19 14:06:41.520837
+
+"""
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel.sql.sqltypes
+
+
+# revision identifiers, used by Alembic.
+revision = 'd7a3c5e9f104'
+down_revision = 'b5e1d7c3a982'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # The planner only uses a partial index when the query has its condition
+    op.drop_index('ix_user_created_at_inactive', table_name='user', postgresql_where=sa.text('NOT is_active'))
+    op.drop_index('ix_user_created_at_superuser', table_name='user', postgresql_where=sa.text('is_superuser'))
+    op.create_index('ix_user_created_at_superuser', 'user', ['created_at'], unique=False, postgresql_where=sa.text('is_superuser IS TRUE'))
+    op.create_index('ix_user_created_at_inactive', 'user', ['created_at'], unique=False, postgresql_where=sa.text('is_active IS FALSE'))
+
+
+def downgrade():
+    op.drop_index('ix_user_created_at_inactive', table_name='user', postgresql_where=sa.text('is_active IS FALSE'))
+    op.drop_index('ix_user_created_at_superuser', table_name='user', postgresql_where=sa.text('is_superuser IS TRUE'))
+    op.create_index('ix_user_created_at_superuser', 'user', ['created_at'], unique=False, postgresql_where=sa.text('is_superuser'))
+    op.create_index('ix_user_created_at_inactive', 'user', ['created_at'], unique=False, postgresql_where=sa.text('NOT is_active'))
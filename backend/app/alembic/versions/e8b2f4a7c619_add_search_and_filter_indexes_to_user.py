@@ -0,0 +1,36 @@
+"""Add search and filter indexes to user
+
+Revision ID: e8b2f4a7c619
+Revises: c3d9a1f6e852
+Create Date: 2026-10-19 10:02:17.845361
+
+"""
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel.sql.sqltypes
+
+
+# revision identifiers, used by Alembic.
+revision = 'e8b2f4a7c619'
+down_revision = 'c3d9a1f6e852'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Trusted, so the owner of the database can create it
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    # Writes to user wait while the indexes are built
+    op.create_index('ix_user_email_trgm', 'user', ['email'], unique=False, postgresql_using='gin', postgresql_ops={'email': 'gin_trgm_ops'})
+    op.create_index('ix_user_full_name_trgm', 'user', ['full_name'], unique=False, postgresql_using='gin', postgresql_ops={'full_name': 'gin_trgm_ops'})
+    op.create_index(op.f('ix_user_created_at'), 'user', ['created_at'], unique=False)
+    op.create_index('ix_user_created_at_superuser', 'user', ['created_at'], unique=False, postgresql_where=sa.text('is_superuser'))
+    op.create_index('ix_user_created_at_inactive', 'user', ['created_at'], unique=False, postgresql_where=sa.text('NOT is_active'))
+
+
+def downgrade():
+    op.drop_index('ix_user_created_at_inactive', table_name='user', postgresql_where=sa.text('NOT is_active'))
+    op.drop_index('ix_user_created_at_superuser', table_name='user', postgresql_where=sa.text('is_superuser'))
+    op.drop_index(op.f('ix_user_created_at'), table_name='user')
+    op.drop_index('ix_user_full_name_trgm', table_name='user', postgresql_using='gin', postgresql_ops={'full_name': 'gin_trgm_ops'})
+    op.drop_index('ix_user_email_trgm', table_name='user', postgresql_using='gin', postgresql_ops={'email': 'gin_trgm_ops'})
@@ -0,0 +1,27 @@
+from fastapi import APIRouter, Response
+
+from app.core.health import get_readiness
+from app.core.server_timing import TimedRoute
+from app.models import Readiness
+
+router = APIRouter(prefix="/health", tags=["health"], route_class=TimedRoute)
+
+
+@router.get("/live")
+async def liveness() -> bool:
+    """
+    Report that the process is up, without checking its dependencies.
+    """
+    return True
+
+
+@router.get("/ready", responses={503: {"model": Readiness}})
+async def readiness(response: Response) -> Readiness:
+    """
+    Report whether the app can serve requests, with 503 when it can't.
+    """
+    # async, so probes still get an answer when the threadpool is full
+    result = await get_readiness()
+    if not result.ready:
+        response.status_code = 503
+    return result
@@ -1,50 +1,128 @@
+import base64
+import json
 import uuid
-from typing import Any
+from datetime import datetime
+from typing import Annotated, Any
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy import ColumnElement
 from sqlmodel import col, func, select
 
-from app.api.deps import CurrentUser, SessionDep
-from app.models import Item, ItemCreate, ItemPublic, ItemsPublic, ItemUpdate, Message
+from app import crud
+from app.api.deps import CurrentUser, SessionDep, get_current_user
+from app.core.bulkheads import bulkhead
+from app.core.config import settings
+from app.core.server_timing import TimedRoute
+from app.models import (
+    Item,
+    ItemCreate,
+    ItemPublic,
+    ItemsPublic,
+    ItemsSearchPublic,
+    ItemUpdate,
+    Message,
+    User,
+)
 
-router = APIRouter(prefix="/items", tags=["items"])
+router = APIRouter(
+    prefix="/items",
+    tags=["items"],
+    route_class=TimedRoute,
+    # Authenticate first, so unauthenticated requests can't take the slots
+    dependencies=[Depends(get_current_user), bulkhead("items")],
+)
 
 
 @router.get("/", response_model=ItemsPublic)
 def read_items(
-    session: SessionDep, current_user: CurrentUser, skip: int = 0, limit: int = 100
+    session: SessionDep,
+    current_user: CurrentUser,
+    skip: int = 0,
+    limit: int = 100,
+    since: datetime | None = None,
 ) -> Any:
     """
-    Retrieve items.
-    """
+    Retrieve items, newest first.
 
-    if current_user.is_superuser:
-        count_statement = select(func.count()).select_from(Item)
+    With since, only the items created since then are listed and counted, and
+    the partitions of the months before it aren't scanned.
+    """
+    filters: list[ColumnElement[bool]] = []
+    if not current_user.is_superuser:
+        filters.append(col(Item.owner_id) == current_user.id)
+    if since is not None:
+        filters.append(col(Item.created_at) >= since)
+        count = session.exec(
+            select(func.count()).select_from(Item).where(*filters)
+        ).one()
+    # Counts are maintained in user.item_count, instead of counting the items
+    elif current_user.is_superuser:
+        count_statement = select(func.coalesce(func.sum(User.item_count), 0))
         count = session.exec(count_statement).one()
-        statement = (
-            select(Item).order_by(col(Item.created_at).desc()).offset(skip).limit(limit)
-        )
-        items = session.exec(statement).all()
     else:
-        count_statement = (
-            select(func.count())
-            .select_from(Item)
-            .where(Item.owner_id == current_user.id)
-        )
-        count = session.exec(count_statement).one()
-        statement = (
-            select(Item)
-            .where(Item.owner_id == current_user.id)
-            .order_by(col(Item.created_at).desc())
-            .offset(skip)
-            .limit(limit)
-        )
-        items = session.exec(statement).all()
+        count = current_user.item_count
+    statement = (
+        select(Item)
+        .where(*filters)
+        .order_by(col(Item.created_at).desc())
+        .offset(skip)
+        .limit(limit)
+    )
+    items = session.exec(statement).all()
 
     items_public = [ItemPublic.model_validate(item) for item in items]
     return ItemsPublic(data=items_public, count=count)
 
 
+def _encode_cursor(rank: float, id: uuid.UUID) -> str:
+    return base64.urlsafe_b64encode(json.dumps([rank, str(id)]).encode()).decode()
+
+
+def _decode_cursor(cursor: str) -> tuple[float, uuid.UUID]:
+    try:
+        rank, id = json.loads(base64.urlsafe_b64decode(cursor))
+        return float(rank), uuid.UUID(id)
+    except AttributeError, TypeError, ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+@router.get("/search", response_model=ItemsSearchPublic)
+def search_items(
+    session: SessionDep,
+    current_user: CurrentUser,
+    q: Annotated[str, Query(min_length=1, max_length=255)],
+    cursor: str | None = None,
+    limit: Annotated[int, Query(ge=1, le=100)] = 20,
+) -> Any:
+    """
+    Search items by title and description, best matches first.
+
+    q supports quoted phrases, OR and -word, like web search engines. Only the
+    ITEM_SEARCH_MAX_MATCHES most recent matches are ranked. Pass the
+    next_cursor of a page as cursor to get the next one.
+    """
+    after = _decode_cursor(cursor) if cursor else None
+    owner_id = None if current_user.is_superuser else current_user.id
+    # One more than the page, to know if there's a next one
+    results = crud.search_items(
+        session=session,
+        query=q,
+        owner_id=owner_id,
+        limit=limit + 1,
+        max_matches=settings.ITEM_SEARCH_MAX_MATCHES,
+        after=after,
+    )
+    next_cursor = None
+    if len(results) > limit:
+        results = results[:limit]
+        last_item, last_rank = results[-1]
+        next_cursor = _encode_cursor(last_rank, last_item.id)
+    return ItemsSearchPublic(
+        data=[ItemPublic.model_validate(item) for item, _ in results],
+        next_cursor=next_cursor,
+    )
+
+
 @router.get("/{id}", response_model=ItemPublic)
 def read_item(session: SessionDep, current_user: CurrentUser, id: uuid.UUID) -> Any:
     """
@@ -8,7 +8,9 @@ from fastapi.security import OAuth2PasswordRequestForm
 from app import crud
 from app.api.deps import CurrentUser, SessionDep, get_current_active_superuser
 from app.core import security
+from app.core.bulkheads import bulkhead
 from app.core.config import settings
+from app.core.server_timing import TimedRoute
 from app.models import Message, NewPassword, Token, UserPublic, UserUpdate
 from app.utils import (
     generate_password_reset_token,
@@ -17,7 +19,9 @@ from app.utils import (
     verify_password_reset_token,
 )
 
-router = APIRouter(tags=["login"])
+router = APIRouter(
+    tags=["login"], route_class=TimedRoute, dependencies=[bulkhead("auth")]
+)
 
 
 @router.post("/login/access-token")
@@ -50,7 +54,7 @@ def test_token(current_user: CurrentUser) -> Any:
     return current_user
 
 
-@router.post("/password-recovery/{email}")
+@router.post("/password-recovery/{email}", dependencies=[bulkhead("email")])
 def recover_password(email: str, session: SessionDep) -> Message:
     """
     Password Recovery
@@ -99,7 +103,7 @@ def reset_password(session: SessionDep, body: NewPassword) -> Message:
 
 @router.post(
     "/password-recovery-html-content/{email}",
-    dependencies=[Depends(get_current_active_superuser)],
+    dependencies=[Depends(get_current_active_superuser), bulkhead("admin")],
     response_class=HTMLResponse,
 )
 def recover_password_html_content(email: str, session: SessionDep) -> Any:
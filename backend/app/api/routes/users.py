@@ -1,8 +1,9 @@
 import uuid
-from typing import Any
+from typing import Annotated, Any
 
-from fastapi import APIRouter, Depends, HTTPException
-from sqlmodel import col, delete, func, select
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy import ColumnElement
+from sqlmodel import col, delete, func, or_, select
 
 from app import crud
 from app.api.deps import (
@@ -10,8 +11,10 @@ from app.api.deps import (
     SessionDep,
     get_current_active_superuser,
 )
+from app.core.bulkheads import bulkhead
 from app.core.config import settings
 from app.core.security import get_password_hash, verify_password
+from app.core.server_timing import TimedRoute
 from app.models import (
     Item,
     Message,
@@ -26,24 +29,56 @@ from app.models import (
 )
 from app.utils import generate_new_account_email, send_email
 
-router = APIRouter(prefix="/users", tags=["users"])
+router = APIRouter(prefix="/users", tags=["users"], route_class=TimedRoute)
+
+
+def _escape_like(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
 
 
 @router.get(
     "/",
-    dependencies=[Depends(get_current_active_superuser)],
+    dependencies=[Depends(get_current_active_superuser), bulkhead("admin")],
     response_model=UsersPublic,
 )
-def read_users(session: SessionDep, skip: int = 0, limit: int = 100) -> Any:
+def read_users(
+    session: SessionDep,
+    skip: int = 0,
+    limit: int = 100,
+    q: Annotated[str | None, Query(min_length=3, max_length=255)] = None,
+    is_active: bool | None = None,
+    is_superuser: bool | None = None,
+) -> Any:
     """
     Retrieve users.
+
+    q matches a part of the email or full name, ignoring case. It needs at
+    least 3 characters, the trigram indexes can't find shorter ones.
     """
+    filters: list[ColumnElement[bool]] = []
+    if q is not None:
+        pattern = f"%{_escape_like(q)}%"
+        filters.append(
+            or_(
+                col(User.email).ilike(pattern, escape="\\"),
+                col(User.full_name).ilike(pattern, escape="\\"),
+            )
+        )
+    # Written like the conditions of the partial indexes, so they're used
+    if is_active is not None:
+        filters.append(col(User.is_active).is_(is_active))
+    if is_superuser is not None:
+        filters.append(col(User.is_superuser).is_(is_superuser))
 
-    count_statement = select(func.count()).select_from(User)
+    count_statement = select(func.count()).select_from(User).where(*filters)
     count = session.exec(count_statement).one()
 
     statement = (
-        select(User).order_by(col(User.created_at).desc()).offset(skip).limit(limit)
+        select(User)
+        .where(*filters)
+        .order_by(col(User.created_at).desc())
+        .offset(skip)
+        .limit(limit)
     )
     users = session.exec(statement).all()
 
@@ -52,7 +87,13 @@ def read_users(session: SessionDep, skip: int = 0, limit: int = 100) -> Any:
 
 
 @router.post(
-    "/", dependencies=[Depends(get_current_active_superuser)], response_model=UserPublic
+    "/",
+    dependencies=[
+        Depends(get_current_active_superuser),
+        bulkhead("admin"),
+        bulkhead("email"),
+    ],
+    response_model=UserPublic,
 )
 def create_user(*, session: SessionDep, user_in: UserCreate) -> Any:
     """
@@ -181,7 +222,7 @@ def read_user_by_id(
 
 @router.patch(
     "/{user_id}",
-    dependencies=[Depends(get_current_active_superuser)],
+    dependencies=[Depends(get_current_active_superuser), bulkhead("admin")],
     response_model=UserPublic,
 )
 def update_user(
@@ -211,7 +252,10 @@ def update_user(
     return db_user
 
 
-@router.delete("/{user_id}", dependencies=[Depends(get_current_active_superuser)])
+@router.delete(
+    "/{user_id}",
+    dependencies=[Depends(get_current_active_superuser), bulkhead("admin")],
+)
 def delete_user(
     session: SessionDep, current_user: CurrentUser, user_id: uuid.UUID
 ) -> Message:
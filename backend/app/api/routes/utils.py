@@ -1,16 +1,20 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException
 from pydantic.networks import EmailStr
 
 from app.api.deps import get_current_active_superuser
-from app.models import Message
+from app.core.bulkheads import bulkhead, get_bulkhead_stats
+from app.core.server_timing import TimedRoute
+from app.core.slow_queries import get_slow_queries
+from app.core.workers import read_worker_metrics
+from app.models import BulkheadsPublic, Message, SlowQueriesPublic, WorkerMetrics
 from app.utils import generate_test_email, send_email
 
-router = APIRouter(prefix="/utils", tags=["utils"])
+router = APIRouter(prefix="/utils", tags=["utils"], route_class=TimedRoute)
 
 
 @router.post(
     "/test-email/",
-    dependencies=[Depends(get_current_active_superuser)],
+    dependencies=[Depends(get_current_active_superuser), bulkhead("email")],
     status_code=201,
 )
 def test_email(email_to: EmailStr) -> Message:
@@ -26,6 +30,45 @@ def test_email(email_to: EmailStr) -> Message:
     return Message(message="Test email sent")
 
 
+@router.get(
+    "/slow-queries/",
+    dependencies=[Depends(get_current_active_superuser)],
+)
+def read_slow_queries() -> SlowQueriesPublic:
+    """
+    Retrieve the most recent slow queries and their EXPLAIN plans.
+    """
+    slow_queries = get_slow_queries()
+    return SlowQueriesPublic(data=slow_queries, count=len(slow_queries))
+
+
+@router.get(
+    "/bulkheads/",
+    dependencies=[Depends(get_current_active_superuser)],
+)
+async def read_bulkheads() -> BulkheadsPublic:
+    """
+    Retrieve the occupancy of the threadpool and of each bulkhead.
+    """
+    # async, so it still answers when the threadpool is full
+    stats = get_bulkhead_stats()
+    return BulkheadsPublic(data=stats, count=len(stats))
+
+
+@router.get(
+    "/workers/",
+    dependencies=[Depends(get_current_active_superuser)],
+)
+def read_workers() -> WorkerMetrics:
+    """
+    Retrieve the worker processes of the server and why they were replaced.
+    """
+    metrics = read_worker_metrics()
+    if metrics is None:
+        raise HTTPException(status_code=404, detail="Not running under app.server")
+    return metrics
+
+
 @router.get("/health-check/")
 async def health_check() -> bool:
     return True
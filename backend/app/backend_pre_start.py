@@ -1,35 +1,45 @@
 import logging
 
 from sqlalchemy import Engine
-from sqlmodel import Session, select
-from tenacity import after_log, before_log, retry, stop_after_attempt, wait_fixed
+from tenacity import (
+    after_log,
+    before_log,
+    retry,
+    stop_after_delay,
+    wait_random_exponential,
+)
 
 from app.core.db import engine
+from app.core.health import check_database_connection
+from app.core.logs import setup_logging
 
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-max_tries = 60 * 5  # 5 minutes
-wait_seconds = 1
+max_wait_seconds = 60 * 5  # 5 minutes
+# Exponential backoff, with random jitter, from 0.5 up to 10 seconds
+wait_multiplier_seconds = 0.5
+max_interval_seconds = 10
 
 
 @retry(
-    stop=stop_after_attempt(max_tries),
-    wait=wait_fixed(wait_seconds),
+    stop=stop_after_delay(max_wait_seconds),
+    wait=wait_random_exponential(
+        multiplier=wait_multiplier_seconds, max=max_interval_seconds
+    ),
     before=before_log(logger, logging.INFO),
     after=after_log(logger, logging.WARN),
 )
 def init(db_engine: Engine) -> None:
     try:
-        with Session(db_engine) as session:
-            # Try to create session to check if DB is awake
-            session.exec(select(1))
+        # The same check as the database part of readiness
+        check_database_connection(db_engine)
     except Exception as e:
         logger.error(e)
         raise e
 
 
 def main() -> None:
+    setup_logging()
     logger.info("Initializing service")
     init(engine)
     logger.info("Service finished initializing")
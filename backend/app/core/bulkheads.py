@@ -0,0 +1,99 @@
+from collections.abc import AsyncGenerator
+from typing import Any
+
+import anyio
+from anyio import to_thread
+from fastapi import Depends, HTTPException
+
+from app.core.config import settings
+from app.models import BulkheadStats
+
+# For bulkheads without a BULKHEAD_QUEUE_TIMEOUTS entry
+DEFAULT_QUEUE_TIMEOUT_SECONDS = 5.0
+
+
+class Bulkhead:
+    """
+    Limit the requests running at once in the routes it's attached to.
+
+    Requests over the limit wait up to the queue timeout for a slot, and then
+    get a 503, so a group of slow routes can't take every thread of the
+    threadpool.
+    """
+
+    def __init__(self, name: str, limit: int, queue_timeout: float) -> None:
+        self.name = name
+        self.limiter = anyio.CapacityLimiter(limit)
+        self.queue_timeout = queue_timeout
+        self.rejected = 0
+
+    async def __call__(self) -> AsyncGenerator[None]:
+        token = object()
+        try:
+            self.limiter.acquire_on_behalf_of_nowait(token)
+        except anyio.WouldBlock:
+            try:
+                with anyio.fail_after(self.queue_timeout):
+                    await self.limiter.acquire_on_behalf_of(token)
+            except TimeoutError:
+                self.rejected += 1
+                raise HTTPException(
+                    status_code=503,
+                    detail=f"Too many {self.name} requests in progress",
+                    headers={"Retry-After": str(max(1, round(self.queue_timeout)))},
+                )
+        try:
+            yield
+        finally:
+            self.limiter.release_on_behalf_of(token)
+
+    def stats(self) -> BulkheadStats:
+        return BulkheadStats(
+            name=self.name,
+            limit=int(self.limiter.total_tokens),
+            in_use=self.limiter.borrowed_tokens,
+            waiting=self.limiter.statistics().tasks_waiting,
+            rejected=self.rejected,
+        )
+
+
+bulkheads = {
+    name: Bulkhead(
+        name,
+        limit,
+        settings.BULKHEAD_QUEUE_TIMEOUTS.get(name, DEFAULT_QUEUE_TIMEOUT_SECONDS),
+    )
+    for name, limit in settings.BULKHEAD_LIMITS.items()
+}
+
+
+def bulkhead(name: str) -> Any:
+    """
+    Attach the named bulkhead to a router or route, in its dependencies.
+
+    The slot is released when the route function returns, before the
+    response is sent.
+    """
+    return Depends(bulkheads[name], scope="function")
+
+
+def set_threadpool_size() -> None:
+    # The threadpool runs the sync routes and dependencies, 40 by default
+    to_thread.current_default_thread_limiter().total_tokens = settings.THREADPOOL_SIZE
+
+
+def get_bulkhead_stats() -> list[BulkheadStats]:
+    """
+    Return the occupancy of each bulkhead, and of the whole threadpool.
+    """
+    threadpool = to_thread.current_default_thread_limiter()
+    return [
+        BulkheadStats(
+            name="threadpool",
+            limit=int(threadpool.total_tokens),
+            in_use=threadpool.borrowed_tokens,
+            waiting=threadpool.statistics().tasks_waiting,
+            rejected=0,
+        ),
+        *(bulkhead.stats() for bulkhead in bulkheads.values()),
+    ]
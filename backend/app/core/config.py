@@ -1,4 +1,6 @@
+import tempfile
 import warnings
+from pathlib import Path
 from typing import Literal, Self
 
 from pydantic import (
@@ -39,6 +41,103 @@ class Settings(BaseSettings):
                 return database_url.replace(scheme, "postgresql+psycopg://", 1)
         return database_url
 
+    # Connections kept open in the pool, and extra ones opened under load
+    DATABASE_POOL_SIZE: int = 5
+    DATABASE_MAX_OVERFLOW: int = 10
+    # Readiness checks are cached this long, so frequent probes share one check
+    HEALTH_CHECK_CACHE_SECONDS: float = 2.0
+    # Workers are unready once every pool connection has been in use this long
+    HEALTH_POOL_SATURATION_SECONDS: float = 30.0
+
+    # Threads running the sync routes and dependencies, shared by all requests
+    THREADPOOL_SIZE: int = 40
+    # Requests running at once in the routes of each bulkhead, and how long the
+    # ones over the limit wait for a slot before getting a 503
+    BULKHEAD_LIMITS: dict[str, int] = {"auth": 10, "admin": 4, "email": 4, "items": 20}
+    BULKHEAD_QUEUE_TIMEOUTS: dict[str, float] = {
+        "auth": 5.0,
+        "admin": 10.0,
+        "email": 1.0,
+        "items": 5.0,
+    }
+
+    # Requests running at once in a worker before the next ones wait in a queue,
+    # rejected with a 503 when it's full or after the max delay. 0 to disable
+    LOAD_SHEDDING_MAX_IN_FLIGHT: int = 64
+    LOAD_SHEDDING_QUEUE_SIZE: int = 64
+    LOAD_SHEDDING_MAX_QUEUE_DELAY_MS: int = 1000
+    # Low priority requests are rejected without queueing over this delay
+    LOAD_SHEDDING_TARGET_QUEUE_DELAY_MS: int = 100
+    # By path prefix, the longest match wins, "normal" for the rest
+    LOAD_SHEDDING_PRIORITIES: dict[
+        str, Literal["critical", "high", "normal", "low"]
+    ] = {
+        "/api/v1/health/": "critical",
+        "/api/v1/login/access-token": "high",
+        "/api/v1/users/me": "high",
+        "/api/v1/items/": "low",
+        "/api/v1/users/": "low",
+    }
+    # Deadline of a request, overridden by path prefix in REQUEST_TIMEOUTS, the
+    # longest match wins. Clients can lower it with the X-Request-Timeout header
+    REQUEST_TIMEOUT_SECONDS: float = 30.0
+    REQUEST_TIMEOUTS: dict[str, float] = {
+        "/api/v1/health/": 5.0,
+        "/api/v1/items/": 10.0,
+        "/api/v1/users/": 10.0,
+    }
+    # POST requests to these paths with an Idempotency-Key header are run once,
+    # repeated keys get the stored response until it expires
+    IDEMPOTENT_PATHS: list[str] = ["/api/v1/items/", "/api/v1/users/signup"]
+    IDEMPOTENCY_KEY_TTL_HOURS: int = 24
+    IDEMPOTENCY_CLEANUP_INTERVAL_SECONDS: int = 600
+    # The item table is partitioned by month of created_at. Partitions are created
+    # this many months ahead, and detached into ITEM_ARCHIVE_SCHEMA once older
+    # than the retention, None keeps them all
+    ITEM_PARTITIONS_AHEAD_MONTHS: int = 3
+    ITEM_PARTITION_RETENTION_MONTHS: int | None = None
+    ITEM_ARCHIVE_SCHEMA: str = "archive"
+    ITEM_PARTITION_MAINTENANCE_INTERVAL_SECONDS: int = 86400
+    # /items/search ranks this many of the most recent matches, ranking all the
+    # items matching a common word would take seconds
+    ITEM_SEARCH_MAX_MATCHES: int = 1000
+
+    # Worker processes of app.server, by default one per CPU of the cgroup quota
+    WEB_CONCURRENCY: int | None = None
+    # Workers are replaced after this many requests, plus up to the jitter...
+    WORKER_MAX_REQUESTS: int = 10_000
+    WORKER_MAX_REQUESTS_JITTER: int = 1_000
+    # ...or once their RSS passes this, less up to the jitter fraction, 0 to disable
+    WORKER_MAX_RSS_MB: int = 1024
+    WORKER_MAX_RSS_JITTER: float = 0.1
+    # In-flight requests get this long to finish when a worker stops
+    WORKER_GRACEFUL_TIMEOUT_SECONDS: int = 30
+    WORKER_METRICS_FILE: Path = Path(tempfile.gettempdir()) / "app-workers.json"
+
+    LOG_LEVEL: str = "INFO"
+    LOG_FORMAT: Literal["json", "text"] = "json"
+    # Records logged while the queue is full are dropped
+    LOG_QUEUE_SIZE: int = 10_000
+
+    # Requests over any of these are logged as a warning
+    QUERY_COUNT_WARNING_THRESHOLD: int = 20
+    QUERY_TIME_WARNING_THRESHOLD_MS: int = 500
+    # Statements slower than this are logged with their EXPLAIN, 0 to disable
+    SLOW_QUERY_THRESHOLD_MS: int = 500
+    SLOW_QUERY_LOG_SIZE: int = 100
+    SLOW_QUERY_EXPLAIN_INTERVAL_SECONDS: int = 60
+    # Add a Server-Timing header with the time spent in each request phase
+    SERVER_TIMING_ENABLED: bool = False
+    # Profile 1 in N requests to these path prefixes, 0 to disable
+    PROFILING_SAMPLE_RATE: int = 0
+    PROFILING_ROUTES: list[str] = []
+    PROFILING_DIR: Path = Path("profiles")
+    # Fraction of requests traced, overridden by route prefix in TRACES_SAMPLE_RATES
+    TRACES_SAMPLE_RATE: float = 0.01
+    TRACES_SAMPLE_RATES: dict[str, float] = {}
+    # Write traces to this file instead of sending them to Sentry
+    TRACES_FILE: Path | None = None
+
     SMTP_TLS: bool = True
     SMTP_SSL: bool = False
     SMTP_PORT: int = 587
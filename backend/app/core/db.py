@@ -1,10 +1,19 @@
+from sqlalchemy.dialects.postgresql import insert
 from sqlmodel import Session, create_engine, select
 
-from app import crud
+from app.core import deadlines, query_stats, slow_queries
 from app.core.config import settings
+from app.core.security import get_password_hash
 from app.models import User, UserCreate
 
-engine = create_engine(str(settings.DATABASE_URL))
+engine = create_engine(
+    str(settings.DATABASE_URL),
+    pool_size=settings.DATABASE_POOL_SIZE,
+    max_overflow=settings.DATABASE_MAX_OVERFLOW,
+)
+query_stats.instrument_engine(engine)
+slow_queries.instrument_engine(engine)
+deadlines.instrument_engine(engine)
 
 
 # make sure all SQLModel models are imported (app.models) before initializing DB
@@ -30,4 +39,14 @@ def init_db(session: Session) -> None:
             password=settings.FIRST_SUPERUSER_PASSWORD,
             is_superuser=True,
         )
-        user = crud.create_user(session=session, user_create=user_in)
+        db_obj = User.model_validate(
+            user_in,
+            update={"hashed_password": get_password_hash(user_in.password)},
+        )
+        # Another replica may have created it since the check above
+        session.exec(
+            insert(User)
+            .values(**db_obj.model_dump())
+            .on_conflict_do_nothing(index_elements=[User.email])
+        )
+        session.commit()
@@ -0,0 +1,229 @@
+import asyncio
+import math
+import threading
+import time
+from collections.abc import Generator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any
+
+from psycopg import errors
+from sqlalchemy import Connection, Engine, event
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import SessionTransaction
+from sqlalchemy.pool import ConnectionPoolEntry
+from sqlmodel import Session
+from starlette.datastructures import Headers
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+REQUEST_TIMEOUT_HEADER = "X-Request-Timeout"
+
+
+class DeadlineExceeded(Exception):
+    pass
+
+
+class Deadline:
+    """
+    The time a request has to finish, and the database connections running
+    its statements, cancelled when the client disconnects.
+    """
+
+    def __init__(self, timeout: float) -> None:
+        self.expires_at = time.monotonic() + timeout
+        self.cancelled = False
+        self.connections: set[Any] = set()
+        self.lock = threading.Lock()
+
+    def remaining(self) -> float:
+        if self.cancelled:
+            return 0.0
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def add_connection(self, dbapi_connection: Any) -> None:
+        with self.lock:
+            self.connections.add(dbapi_connection)
+
+    def remove_connection(self, dbapi_connection: Any) -> None:
+        # Under the lock, so the connection is never cancelled once it's back
+        # in the pool and used by another request
+        with self.lock:
+            self.connections.discard(dbapi_connection)
+
+    def cancel(self) -> None:
+        with self.lock:
+            self.cancelled = True
+            for dbapi_connection in self.connections:
+                dbapi_connection.cancel_safe()
+
+
+deadline_var: ContextVar[Deadline | None] = ContextVar("deadline", default=None)
+
+
+@contextmanager
+def session_deadline(session: Session) -> Generator[None]:
+    """
+    Limit each transaction of the session to the time left before the deadline
+    of the request, with SET LOCAL statement_timeout. Statements cancelled by
+    it raise DeadlineExceeded.
+    """
+    deadline = deadline_var.get()
+    if deadline is None:
+        yield
+        return
+
+    def set_statement_timeout(
+        session: Session,  # noqa: ARG001
+        transaction: SessionTransaction,  # noqa: ARG001
+        connection: Connection,
+    ) -> None:
+        remaining_ms = math.ceil(deadline.remaining() * 1000)
+        if remaining_ms <= 0:
+            raise DeadlineExceeded
+        connection.exec_driver_sql(f"SET LOCAL statement_timeout = {remaining_ms}")
+        dbapi_connection = connection.connection.driver_connection
+        deadline.add_connection(dbapi_connection)
+        # Removed when the connection goes back to the pool, see instrument_engine
+        connection.info["deadline"] = (deadline, dbapi_connection)
+
+    event.listen(session, "after_begin", set_statement_timeout)
+    try:
+        yield
+    except OperationalError as e:
+        # Cancelled by the statement_timeout or a client disconnect
+        if isinstance(e.orig, errors.QueryCanceled):
+            raise DeadlineExceeded from e
+        raise
+    finally:
+        event.remove(session, "after_begin", set_statement_timeout)
+
+
+def _checkin(
+    dbapi_connection: Any,  # noqa: ARG001
+    connection_record: ConnectionPoolEntry,
+) -> None:
+    # After a commit the session returns its connection to the pool, where
+    # another request can use it, before the end of the request
+    registered = connection_record.info.pop("deadline", None)
+    if registered is not None:
+        deadline, dbapi_connection = registered
+        deadline.remove_connection(dbapi_connection)
+
+
+def instrument_engine(engine: Engine) -> None:
+    event.listen(engine, "checkin", _checkin)
+
+
+class DeadlineMiddleware:
+    """
+    Set the deadline of each request, and cancel its database statements when
+    the client disconnects before the response is sent.
+    """
+
+    def __init__(
+        self, app: ASGIApp, *, default_timeout: float, timeouts: dict[str, float]
+    ) -> None:
+        self.app = app
+        self.default_timeout = default_timeout
+        # Longest prefix first, so the most specific one matches
+        self.timeouts = sorted(
+            timeouts.items(), key=lambda item: len(item[0]), reverse=True
+        )
+
+    def get_timeout(self, scope: Scope) -> float:
+        timeout = self.default_timeout
+        for prefix, route_timeout in self.timeouts:
+            if scope["path"].startswith(prefix):
+                timeout = route_timeout
+                break
+        # The client can only lower it
+        try:
+            requested = float(Headers(scope=scope).get(REQUEST_TIMEOUT_HEADER, ""))
+        except ValueError:
+            return timeout
+        if 0 < requested < timeout:
+            return requested
+        return timeout
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        deadline = Deadline(self.get_timeout(scope))
+        # Only the watcher reads from the server, so it sees the disconnect even
+        # when the app doesn't read the request, it hands the messages over. The
+        # queue is unbounded, a body the app doesn't read must not block it.
+        messages: asyncio.Queue[Message] = asyncio.Queue()
+        response_started = False
+        response_complete = False
+        timed_out = False
+
+        async def watch_disconnect() -> None:
+            while True:
+                message = await receive()
+                messages.put_nowait(message)
+                if message["type"] == "http.disconnect":
+                    if not response_complete:
+                        await asyncio.to_thread(deadline.cancel)
+                    return
+
+        async def receive_from_watcher() -> Message:
+            message = await messages.get()
+            if message["type"] == "http.disconnect":
+                # Every later receive gets the disconnect too
+                messages.put_nowait(message)
+            return message
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal response_started, response_complete
+            if timed_out:
+                return
+            if message["type"] == "http.response.start":
+                response_started = True
+            if message["type"] == "http.response.body" and not message.get(
+                "more_body", False
+            ):
+                response_complete = True
+            await send(message)
+
+        async def run_app() -> None:
+            await self.app(scope, receive_from_watcher, send_wrapper)
+
+        token = deadline_var.set(deadline)
+        watcher = asyncio.create_task(watch_disconnect())
+        handler = asyncio.create_task(run_app())
+        try:
+            # The statement_timeout only covers the database, this also covers
+            # the rest, like sending emails or hashing passwords
+            await asyncio.wait({handler}, timeout=deadline.remaining())
+            if handler.done() or response_started:
+                await handler
+                return
+            timed_out = True
+            # A sync route keeps its thread until it returns, but its statements
+            # are cancelled and its next transaction raises DeadlineExceeded
+            handler.cancel()
+            await asyncio.to_thread(deadline.cancel)
+            response = await deadline_exceeded_handler(
+                Request(scope), DeadlineExceeded()
+            )
+            await response(scope, receive_from_watcher, send)
+        finally:
+            # No-op once the handler is done
+            handler.cancel()
+            handler.add_done_callback(_discard_result)
+            watcher.cancel()
+            deadline_var.reset(token)
+
+
+def _discard_result(handler: asyncio.Task[None]) -> None:
+    # Retrieved so the error of an abandoned request isn't logged as unhandled
+    if not handler.cancelled():
+        handler.exception()
+
+
+async def deadline_exceeded_handler(request: Request, exc: Exception) -> Response:  # noqa: ARG001
+    return JSONResponse({"detail": "Request deadline exceeded"}, status_code=504)
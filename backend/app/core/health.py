@@ -0,0 +1,140 @@
+import functools
+import time
+from pathlib import Path
+
+import anyio
+from anyio import to_thread
+from sqlalchemy import Connection, Engine, text
+from sqlalchemy.exc import ProgrammingError
+from sqlalchemy.pool import QueuePool
+from sqlmodel import Session, select
+
+from app.core.config import settings
+from app.core.db import engine
+from app.core.warmup import is_warmed_up
+from app.models import HealthCheck, Readiness
+
+ALEMBIC_DIR = Path(__file__).parent.parent / "alembic"
+
+_cache_lock = anyio.Lock()
+_cached_readiness: tuple[float, Readiness] | None = None
+_pool_saturated_since: float | None = None
+# The database check gets its own thread, so it doesn't queue behind requests
+# when the threadpool is full
+_check_limiter = anyio.CapacityLimiter(1)
+
+
+def check_database_connection(db_engine: Engine) -> None:
+    """
+    Raise if the database can't be reached.
+    """
+    with Session(db_engine) as session:
+        session.exec(select(1))
+
+
+def get_database_revision(conn: Connection) -> str | None:
+    """
+    Return the Alembic revision of the database, None before any migration.
+    """
+    try:
+        return conn.execute(
+            text("SELECT version_num FROM alembic_version")
+        ).scalar_one_or_none()
+    except ProgrammingError:
+        # The table is created with the first migration
+        conn.rollback()
+        return None
+
+
+@functools.cache
+def get_alembic_head() -> str | None:
+    # Imported here, it's only needed once
+    from alembic.script import ScriptDirectory
+
+    return ScriptDirectory(str(ALEMBIC_DIR)).get_current_head()
+
+
+def _check_database(db_engine: Engine) -> list[HealthCheck]:
+    try:
+        check_database_connection(db_engine)
+        with db_engine.connect() as conn:
+            revision = get_database_revision(conn)
+    except Exception as e:
+        return [HealthCheck(name="database", healthy=False, detail=str(e))]
+    head = get_alembic_head()
+    return [
+        HealthCheck(name="database", healthy=True),
+        HealthCheck(
+            name="migrations",
+            healthy=revision == head,
+            detail=f"At revision {revision}, head is {head}",
+        ),
+    ]
+
+
+def _check_pool(db_engine: Engine, now: float) -> tuple[HealthCheck, bool]:
+    """
+    Return the pool check, and whether every connection is in use.
+
+    A saturated pool only makes the check unhealthy after
+    HEALTH_POOL_SATURATION_SECONDS, bursts of requests are expected.
+    """
+    global _pool_saturated_since
+    pool = db_engine.pool
+    if not isinstance(pool, QueuePool):
+        return HealthCheck(name="pool", healthy=True), False
+    capacity = pool.size() + settings.DATABASE_MAX_OVERFLOW
+    checked_out = pool.checkedout()
+    detail = f"{checked_out} of {capacity} connections in use"
+    if checked_out < capacity:
+        _pool_saturated_since = None
+        return HealthCheck(name="pool", healthy=True, detail=detail), False
+    if _pool_saturated_since is None:
+        _pool_saturated_since = now
+    saturated_for = now - _pool_saturated_since
+    return (
+        HealthCheck(
+            name="pool",
+            healthy=saturated_for < settings.HEALTH_POOL_SATURATION_SECONDS,
+            detail=f"{detail} for {saturated_for:.0f}s",
+        ),
+        True,
+    )
+
+
+async def get_readiness(db_engine: Engine = engine) -> Readiness:
+    """
+    Check the database, migrations, connection pool and warm-up.
+
+    The result is cached for HEALTH_CHECK_CACHE_SECONDS. Concurrent callers
+    wait for a single check instead of each querying the database. The
+    database isn't checked when the pool is exhausted.
+    """
+    global _cached_readiness
+    async with _cache_lock:
+        now = time.monotonic()
+        if (
+            _cached_readiness is not None
+            and now - _cached_readiness[0] < settings.HEALTH_CHECK_CACHE_SECONDS
+        ):
+            return _cached_readiness[1]
+        pool, saturated = _check_pool(db_engine, now)
+        # With every connection in use, the database check would wait for one
+        # for the pool_timeout
+        database = (
+            []
+            if saturated
+            else await to_thread.run_sync(
+                _check_database, db_engine, limiter=_check_limiter
+            )
+        )
+        checks = [
+            *database,
+            pool,
+            HealthCheck(name="warm_up", healthy=is_warmed_up()),
+        ]
+        readiness = Readiness(
+            ready=all(check.healthy for check in checks), checks=checks
+        )
+        _cached_readiness = (now, readiness)
+        return readiness
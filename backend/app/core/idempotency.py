@@ -0,0 +1,349 @@
+import asyncio
+import hashlib
+import logging
+from datetime import timedelta
+from typing import Any
+
+import jwt
+from anyio import CancelScope, to_thread
+from fastapi.security.utils import get_authorization_scheme_param
+from psycopg import errors
+from sqlalchemy import (
+    ColumnElement,
+    Connection,
+    Engine,
+    Row,
+    and_,
+    delete,
+    func,
+    or_,
+    select,
+)
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.exc import OperationalError
+from sqlmodel import col
+from starlette.datastructures import Headers
+from starlette.responses import JSONResponse, Response
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core import security
+from app.core.config import settings
+from app.core.deadlines import deadline_var
+from app.models import IdempotencyKey, get_datetime_utc
+
+logger = logging.getLogger(__name__)
+
+IDEMPOTENCY_KEY_HEADER = "Idempotency-Key"
+MAX_KEY_LENGTH = 255
+# A duplicate of a request in progress checks for its response this often
+POLL_INTERVAL_SECONDS = 0.1
+# Claims are short transactions, don't queue behind a stuck one
+CLAIM_LOCK_TIMEOUT_MS = 1000
+
+
+def _key_matches(record: IdempotencyKey) -> ColumnElement[bool]:
+    return and_(
+        col(IdempotencyKey.client) == record.client,
+        col(IdempotencyKey.path) == record.path,
+        col(IdempotencyKey.key) == record.key,
+    )
+
+
+def claim_key(conn: Connection, record: IdempotencyKey) -> Row[Any] | None:
+    """
+    Insert the key as in progress until record.locked_until, or take it over
+    if it expired or its request stopped without storing a response.
+
+    Returns None when claimed, and the stored key when another request has it.
+    The claim is committed, no lock is held while the request runs.
+    """
+    conn.exec_driver_sql(f"SET LOCAL lock_timeout = {CLAIM_LOCK_TIMEOUT_MS}")
+    table = IdempotencyKey.__table__  # type: ignore[attr-defined]
+    while True:
+        claimed = conn.execute(
+            insert(IdempotencyKey)
+            .values(**record.model_dump())
+            .on_conflict_do_update(
+                index_elements=["client", "path", "key"],
+                set_={
+                    "request_hash": record.request_hash,
+                    "status_code": None,
+                    "content_type": None,
+                    "body": None,
+                    "expires_at": record.expires_at,
+                    "locked_until": record.locked_until,
+                },
+                where=or_(
+                    table.c.expires_at < func.now(),
+                    and_(
+                        table.c.status_code.is_(None),
+                        table.c.locked_until < func.now(),
+                    ),
+                ),
+            )
+            .returning(table.c.key)
+        ).first()
+        if claimed is not None:
+            conn.commit()
+            return None
+        stored = conn.execute(
+            select(
+                col(IdempotencyKey.request_hash),
+                col(IdempotencyKey.status_code),
+                col(IdempotencyKey.content_type),
+                col(IdempotencyKey.body),
+            ).where(_key_matches(record))
+        ).first()
+        # Otherwise the claim was released since, try again
+        if stored is not None:
+            conn.commit()
+            return stored
+
+
+def store_response(
+    conn: Connection,
+    record: IdempotencyKey,
+    status_code: int,
+    content_type: str | None,
+    body: bytes,
+) -> None:
+    conn.execute(
+        IdempotencyKey.__table__.update()  # type: ignore[attr-defined]
+        .where(_key_matches(record))
+        .values(
+            status_code=status_code,
+            content_type=content_type,
+            body=body,
+            locked_until=None,
+        )
+    )
+    conn.commit()
+
+
+def release_key(conn: Connection, record: IdempotencyKey) -> None:
+    """
+    Delete a claim without a response, so the request can be retried.
+    """
+    conn.execute(
+        delete(IdempotencyKey).where(
+            _key_matches(record),
+            IdempotencyKey.status_code.is_(None),  # type: ignore[union-attr]
+        )
+    )
+    conn.commit()
+
+
+def get_client(headers: Headers) -> str | None:
+    """
+    Return the user id from the access token, so a new token after logging in
+    again keeps the same keys. Empty without a token, None if it's invalid.
+    """
+    scheme, token = get_authorization_scheme_param(headers.get("authorization"))
+    if not token or scheme.lower() != "bearer":
+        return ""
+    try:
+        payload = jwt.decode(
+            token, settings.SECRET_KEY, algorithms=[security.ALGORITHM]
+        )
+    except jwt.InvalidTokenError:
+        return None
+    return str(payload.get("sub", ""))
+
+
+def delete_expired_keys(db_engine: Engine) -> int:
+    with db_engine.begin() as conn:
+        result = conn.execute(
+            delete(IdempotencyKey).where(col(IdempotencyKey.expires_at) < func.now())
+        )
+    return result.rowcount
+
+
+async def run_cleanup(db_engine: Engine, interval: float) -> None:
+    """
+    Delete the expired keys every interval seconds, until cancelled.
+    """
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            deleted = await to_thread.run_sync(delete_expired_keys, db_engine)
+        except Exception:
+            logger.exception("Failed to delete expired idempotency keys")
+        else:
+            if deleted:
+                logger.info("Deleted %d expired idempotency keys", deleted)
+
+
+class IdempotencyMiddleware:
+    """
+    Run POST requests with an Idempotency-Key header once, and replay the
+    stored response to later requests with the same key and body.
+
+    The key is claimed in a committed row before the request runs, so no
+    connection or lock is held meanwhile. A concurrent duplicate polls it
+    until the response is stored, and gets a 409 if it isn't before its own
+    deadline. Responses with a 5xx status aren't stored, those requests can
+    be retried.
+    """
+
+    def __init__(
+        self, app: ASGIApp, *, paths: list[str], ttl: timedelta, db_engine: Engine
+    ) -> None:
+        self.app = app
+        self.paths = set(paths)
+        self.ttl = ttl
+        self.db_engine = db_engine
+
+    def claim(self, record: IdempotencyKey) -> Row[Any] | None:
+        with self.db_engine.connect() as conn:
+            return claim_key(conn, record)
+
+    def store(
+        self,
+        record: IdempotencyKey,
+        status_code: int,
+        content_type: str | None,
+        body: bytes,
+    ) -> None:
+        with self.db_engine.connect() as conn:
+            store_response(conn, record, status_code, content_type, body)
+
+    def release(self, record: IdempotencyKey) -> None:
+        with self.db_engine.connect() as conn:
+            release_key(conn, record)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if (
+            scope["type"] != "http"
+            or scope["method"] != "POST"
+            or scope["path"] not in self.paths
+        ):
+            await self.app(scope, receive, send)
+            return
+        headers = Headers(scope=scope)
+        client = get_client(headers)
+        # Invalid tokens are rejected by the app
+        if IDEMPOTENCY_KEY_HEADER not in headers or client is None:
+            await self.app(scope, receive, send)
+            return
+
+        key = headers[IDEMPOTENCY_KEY_HEADER]
+        if not key or len(key) > MAX_KEY_LENGTH:
+            response: Response = JSONResponse(
+                {"detail": f"Invalid {IDEMPOTENCY_KEY_HEADER} header"},
+                status_code=400,
+            )
+            await response(scope, receive, send)
+            return
+
+        # The whole body is hashed, to tell a retry from a reused key
+        body = b""
+        while True:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                return
+            body += message.get("body", b"")
+            if not message.get("more_body", False):
+                break
+
+        # Claimed until the request's deadline, past it the request can't use
+        # the database anymore and a retry takes the key over
+        deadline = deadline_var.get()
+        wait = deadline.remaining() if deadline else 0.0
+        now = get_datetime_utc()
+        record = IdempotencyKey(
+            client=client,
+            path=scope["path"],
+            key=key,
+            request_hash=hashlib.sha256(body).hexdigest(),
+            expires_at=now + self.ttl,
+            locked_until=now
+            + timedelta(seconds=wait or settings.REQUEST_TIMEOUT_SECONDS),
+        )
+        loop = asyncio.get_running_loop()
+        wait_until = loop.time() + wait
+        while True:
+            try:
+                stored = await to_thread.run_sync(self.claim, record)
+            except OperationalError as e:
+                # Another request is claiming it, checked again on the next poll
+                if not isinstance(e.orig, errors.LockNotAvailable):
+                    raise
+            else:
+                if stored is None:
+                    await self.run_once(scope, body, receive, send, record)
+                    return
+                if stored.request_hash != record.request_hash:
+                    response = JSONResponse(
+                        {
+                            "detail": f"{IDEMPOTENCY_KEY_HEADER} already used for "
+                            "another request"
+                        },
+                        status_code=422,
+                    )
+                    break
+                if stored.status_code is not None:
+                    response_headers = {"Idempotent-Replayed": "true"}
+                    if stored.content_type:
+                        response_headers["Content-Type"] = stored.content_type
+                    response = Response(
+                        stored.body,
+                        status_code=stored.status_code,
+                        headers=response_headers,
+                    )
+                    break
+            if loop.time() + POLL_INTERVAL_SECONDS > wait_until:
+                response = JSONResponse(
+                    {
+                        "detail": f"A request with this {IDEMPOTENCY_KEY_HEADER} "
+                        "is in progress"
+                    },
+                    status_code=409,
+                    headers={"Retry-After": "1"},
+                )
+                break
+            await asyncio.sleep(POLL_INTERVAL_SECONDS)
+        await response(scope, receive, send)
+
+    async def run_once(
+        self,
+        scope: Scope,
+        body: bytes,
+        receive: Receive,
+        send: Send,
+        record: IdempotencyKey,
+    ) -> None:
+        body_sent = False
+        status_code = 500
+        content_type = None
+        chunks: list[bytes] = []
+
+        async def receive_body() -> Message:
+            nonlocal body_sent
+            if not body_sent:
+                body_sent = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            return await receive()
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code, content_type
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                content_type = Headers(raw=message["headers"]).get("content-type")
+            elif message["type"] == "http.response.body":
+                chunks.append(message.get("body", b""))
+            await send(message)
+
+        stored = False
+        try:
+            await self.app(scope, receive_body, send_wrapper)
+            if status_code < 500:
+                await to_thread.run_sync(
+                    self.store, record, status_code, content_type, b"".join(chunks)
+                )
+                stored = True
+        finally:
+            if not stored:
+                # Also when cancelled by a client disconnect, or the key stays
+                # claimed until locked_until
+                with CancelScope(shield=True):
+                    await to_thread.run_sync(self.release, record)
@@ -0,0 +1,151 @@
+import asyncio
+import heapq
+import itertools
+import math
+import time
+from collections import Counter
+from enum import IntEnum
+
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+# The recent queueing delay is forgotten after this long without a dequeue
+RECENT_DELAY_SECONDS = 1.0
+
+
+class Priority(IntEnum):
+    # Lower values are served first
+    CRITICAL = 0
+    HIGH = 1
+    NORMAL = 2
+    LOW = 3
+
+
+class LoadSheddingMiddleware:
+    """
+    Reject requests with a 503 when the worker is overloaded, instead of
+    letting them wait in the threadpool until the client has given up.
+
+    Up to max_in_flight requests run at once, the next ones wait in a queue
+    served by priority. A request is rejected when the queue is full of
+    requests of its priority or higher, after waiting max_queue_delay, or
+    right away if it's low priority and the recent queueing delay is over
+    target_queue_delay. Critical requests, like health checks, are never
+    queued or rejected.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        *,
+        max_in_flight: int,
+        queue_size: int,
+        max_queue_delay: float,
+        target_queue_delay: float,
+        priorities: dict[str, Priority],
+    ) -> None:
+        self.app = app
+        self.max_in_flight = max_in_flight
+        self.queue_size = queue_size
+        self.max_queue_delay = max_queue_delay
+        self.target_queue_delay = target_queue_delay
+        # Longest prefix first, so the most specific one matches
+        self.priorities = sorted(
+            priorities.items(), key=lambda item: len(item[0]), reverse=True
+        )
+        self.in_flight = 0
+        self.queue: list[tuple[Priority, int, asyncio.Future[bool]]] = []
+        self.sequence = itertools.count()
+        self.queue_delay = 0.0
+        self.queue_delay_at = 0.0
+        self.shed: Counter[Priority] = Counter()
+
+    def get_priority(self, path: str) -> Priority:
+        for prefix, priority in self.priorities:
+            if path.startswith(prefix):
+                return priority
+        return Priority.NORMAL
+
+    def recent_queue_delay(self) -> float:
+        if time.monotonic() - self.queue_delay_at > RECENT_DELAY_SECONDS:
+            return 0.0
+        return self.queue_delay
+
+    async def admit(self, priority: Priority) -> bool:
+        if self.in_flight < self.max_in_flight and not self.queue:
+            self.in_flight += 1
+            return True
+        if (
+            priority >= Priority.LOW
+            and self.recent_queue_delay() > self.target_queue_delay
+        ):
+            return False
+        if len(self.queue) >= self.queue_size:
+            # Make room by rejecting the newest of the lowest priority waiters
+            lowest = max(self.queue, default=None)
+            if lowest is None or lowest[0] <= priority:
+                return False
+            self.queue.remove(lowest)
+            heapq.heapify(self.queue)
+            lowest[2].set_result(False)
+
+        future: asyncio.Future[bool] = asyncio.get_running_loop().create_future()
+        entry = (priority, next(self.sequence), future)
+        heapq.heappush(self.queue, entry)
+        start = time.monotonic()
+        try:
+            async with asyncio.timeout(self.max_queue_delay):
+                admitted = await future
+        except TimeoutError:
+            self.abandon(entry)
+            return False
+        except asyncio.CancelledError:
+            self.abandon(entry)
+            raise
+        if admitted:
+            self.queue_delay = time.monotonic() - start
+            self.queue_delay_at = time.monotonic()
+        return admitted
+
+    def abandon(self, entry: tuple[Priority, int, asyncio.Future[bool]]) -> None:
+        # The waiter timed out or its request was cancelled
+        future = entry[2]
+        if entry in self.queue:
+            self.queue.remove(entry)
+            heapq.heapify(self.queue)
+        elif future.done() and not future.cancelled() and future.result():
+            # It was handed a slot at the same time
+            self.release()
+
+    def release(self) -> None:
+        # Hand the slot over to the next waiter, unless critical requests took
+        # the worker over the limit
+        while self.queue and self.in_flight <= self.max_in_flight:
+            _, _, future = heapq.heappop(self.queue)
+            if not future.done():
+                future.set_result(True)
+                return
+        self.in_flight -= 1
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        priority = self.get_priority(scope["path"])
+        if priority is Priority.CRITICAL:
+            self.in_flight += 1
+        elif not await self.admit(priority):
+            self.shed[priority] += 1
+            retry_after = max(1, math.ceil(self.recent_queue_delay()))
+            response = JSONResponse(
+                {"detail": "The server is overloaded, retry later"},
+                status_code=503,
+                headers={"Retry-After": str(retry_after)},
+            )
+            await response(scope, receive, send)
+            return
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.release()
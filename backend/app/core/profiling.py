@@ -0,0 +1,278 @@
+import asyncio
+import itertools
+import json
+import logging
+import re
+import sys
+import threading
+import time
+import uuid
+from contextvars import Context, ContextVar
+from datetime import UTC, datetime
+from types import CodeType
+from typing import Any
+
+import jwt
+from sqlmodel import Session
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import Headers, QueryParams
+from starlette.responses import Response
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core import security
+from app.core.config import settings
+from app.core.db import engine
+from app.models import User
+
+logger = logging.getLogger(__name__)
+
+PROFILE_HEADER = "X-Profile"
+PROFILE_QUERY_PARAM = "profile"
+
+
+class SamplingProfiler:
+    """
+    Wall-clock sampling profiler producing speedscope files.
+
+    A background thread records the stack of every thread at each interval.
+    Only the profiled request is kept: the event loop while it runs the task
+    that started the profiler, and threadpool workers while they run a call
+    made from that task, so concurrent requests don't show up.
+    """
+
+    def __init__(self, interval: float = 0.001) -> None:
+        self.interval = interval
+        self._frames: dict[tuple[str, int, str], int] = {}
+        self._samples: dict[int, list[list[int]]] = {}
+        self._weights: dict[int, list[float]] = {}
+        self._stop_event = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._owner_thread_id = 0
+        self._owner_loop: asyncio.AbstractEventLoop | None = None
+        self._owner_task: asyncio.Task[Any] | None = None
+        self._duration = 0.0
+
+    def start(self) -> None:
+        self._owner_thread_id = threading.get_ident()
+        try:
+            self._owner_loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self._owner_loop = None
+        else:
+            self._owner_task = asyncio.current_task()
+        self._context_token = _active_profiler.set(self)
+        self._start_time = time.perf_counter()
+        self._thread = threading.Thread(
+            target=self._run, name="sampling-profiler", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join()
+        _active_profiler.reset(self._context_token)
+        self._duration = time.perf_counter() - self._start_time
+
+    def _run(self) -> None:
+        last_sample = time.perf_counter()
+        while not self._stop_event.wait(self.interval):
+            now = time.perf_counter()
+            self._sample(now - last_sample)
+            last_sample = now
+
+    def _frame_index(self, code: CodeType) -> int:
+        key = (code.co_filename, code.co_firstlineno, code.co_qualname)
+        index = self._frames.get(key)
+        if index is None:
+            index = self._frames[key] = len(self._frames)
+        return index
+
+    def _sample(self, weight: float) -> None:
+        sampler_thread_id = threading.get_ident()
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == sampler_thread_id:
+                continue
+            if thread_id == self._owner_thread_id:
+                if not self._runs_owner_task():
+                    continue
+            elif not self._runs_in_owner_context(frame):
+                continue
+            stack: list[int] = []
+            current: Any = frame
+            while current is not None:
+                stack.append(self._frame_index(current.f_code))
+                current = current.f_back
+            stack.reverse()
+            self._samples.setdefault(thread_id, []).append(stack)
+            self._weights.setdefault(thread_id, []).append(weight)
+
+    def _runs_owner_task(self) -> bool:
+        if self._owner_loop is None:
+            return True
+        return asyncio.current_task(self._owner_loop) is self._owner_task
+
+    def _runs_in_owner_context(self, frame: Any) -> bool:
+        # Threadpool workers run each call with context.run() on a copy of
+        # the caller's context, look for it at the bottom of the stack
+        while frame is not None:
+            if "context" in frame.f_code.co_varnames:
+                context = frame.f_locals.get("context")
+                if isinstance(context, Context):
+                    return context.get(_active_profiler) is self
+            frame = frame.f_back
+        return False
+
+    def to_speedscope(self, name: str) -> dict[str, Any]:
+        thread_names = {thread.ident: thread.name for thread in threading.enumerate()}
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "name": name,
+            "exporter": settings.PROJECT_NAME,
+            "shared": {
+                "frames": [
+                    {"name": qualname, "file": filename, "line": line}
+                    for filename, line, qualname in self._frames
+                ]
+            },
+            "profiles": [
+                {
+                    "type": "sampled",
+                    "name": thread_names.get(thread_id, f"Thread {thread_id}"),
+                    "unit": "seconds",
+                    "startValue": 0,
+                    "endValue": self._duration,
+                    "samples": samples,
+                    "weights": self._weights[thread_id],
+                }
+                for thread_id, samples in self._samples.items()
+            ],
+        }
+
+
+_active_profiler: ContextVar[SamplingProfiler | None] = ContextVar(
+    "active_profiler", default=None
+)
+
+
+def _get_bearer_token(headers: Headers) -> str | None:
+    scheme, _, token = headers.get("authorization", "").partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return None
+    return token
+
+
+def _get_token_user_id(token: str) -> uuid.UUID | None:
+    try:
+        payload = jwt.decode(
+            token, settings.SECRET_KEY, algorithms=[security.ALGORITHM]
+        )
+        return uuid.UUID(payload["sub"])
+    except jwt.InvalidTokenError, KeyError, TypeError, ValueError:
+        return None
+
+
+def _is_superuser(user_id: uuid.UUID) -> bool:
+    with Session(engine) as session:
+        user = session.get(User, user_id)
+        return user is not None and user.is_active and user.is_superuser
+
+
+class ProfilingMiddleware:
+    """
+    Profile single requests on demand, or a sample of requests in background.
+
+    A superuser can send the X-Profile header or the profile query parameter
+    to get the speedscope profile of the request instead of its body. With
+    PROFILING_SAMPLE_RATE set to N, 1 in N requests to PROFILING_ROUTES are
+    profiled and the profiles are written to PROFILING_DIR.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+        self._request_counter = itertools.count(1)
+        self._background_profile_running = False
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = Headers(scope=scope)
+        if PROFILE_HEADER in headers or (
+            PROFILE_QUERY_PARAM in QueryParams(scope["query_string"])
+        ):
+            # The token is checked before the database so that invalid
+            # tokens don't cost a query
+            token = _get_bearer_token(headers)
+            user_id = _get_token_user_id(token) if token else None
+            if user_id is not None and await run_in_threadpool(_is_superuser, user_id):
+                await self._profile_on_demand(scope, receive, send)
+                return
+
+        if self._should_profile_in_background(scope):
+            await self._profile_in_background(scope, receive, send)
+            return
+
+        await self.app(scope, receive, send)
+
+    async def _profile_on_demand(
+        self, scope: Scope, receive: Receive, send: Send
+    ) -> None:
+        status_code = 500
+
+        async def discard_response(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+
+        profiler = SamplingProfiler()
+        profiler.start()
+        try:
+            await self.app(scope, receive, discard_response)
+        finally:
+            profiler.stop()
+        profile = profiler.to_speedscope(f"{scope['method']} {scope['path']}")
+        response = Response(
+            content=json.dumps(profile),
+            media_type="application/json",
+            headers={
+                "Content-Disposition": 'attachment; filename="profile.speedscope.json"',
+                "X-Profile-Status": str(status_code),
+            },
+        )
+        await response(scope, receive, send)
+
+    def _should_profile_in_background(self, scope: Scope) -> bool:
+        if not settings.PROFILING_SAMPLE_RATE or self._background_profile_running:
+            return False
+        path: str = scope["path"]
+        if not any(path.startswith(route) for route in settings.PROFILING_ROUTES):
+            return False
+        return next(self._request_counter) % settings.PROFILING_SAMPLE_RATE == 0
+
+    async def _profile_in_background(
+        self, scope: Scope, receive: Receive, send: Send
+    ) -> None:
+        # Only one request is profiled at a time to bound the overhead
+        self._background_profile_running = True
+        profiler = SamplingProfiler()
+        profiler.start()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            profiler.stop()
+            self._background_profile_running = False
+        name = f"{scope['method']} {scope['path']}"
+        await run_in_threadpool(_write_profile, name, profiler.to_speedscope(name))
+
+
+def _write_profile(name: str, profile: dict[str, Any]) -> None:
+    timestamp = datetime.now(UTC).strftime("%Y%m%dT%H%M%S%f")
+    slug = re.sub(r"[^a-zA-Z0-9]+", "-", name).strip("-")
+    path = settings.PROFILING_DIR / f"{timestamp}-{slug}.speedscope.json"
+    try:
+        settings.PROFILING_DIR.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(profile))
+    except OSError as e:
+        logger.error("Could not write profile %s: %s", path, e)
@@ -0,0 +1,127 @@
+import logging
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Any
+
+from sqlalchemy import Engine, event
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+QUERY_COUNT_HEADER = "X-DB-Query-Count"
+QUERY_TIME_HEADER = "X-DB-Query-Time"
+
+
+@dataclass
+class QueryStats:
+    count: int = 0
+    # Total time spent in the database, in seconds
+    duration: float = 0.0
+
+
+_current_stats: ContextVar[QueryStats | None] = ContextVar("query_stats", default=None)
+
+
+def get_query_stats() -> QueryStats | None:
+    """
+    Return the statistics of the request being handled, if any.
+    """
+    return _current_stats.get()
+
+
+def _before_cursor_execute(
+    _conn: Any,
+    _cursor: Any,
+    _statement: str,
+    _parameters: Any,
+    context: Any,
+    _executemany: bool,
+) -> None:
+    if _current_stats.get() is None or context is None:
+        return
+    # Kept on the execution context rather than the connection, so a failing
+    # statement leaves nothing behind
+    context.query_start_time = time.perf_counter()
+
+
+def _after_cursor_execute(
+    _conn: Any,
+    _cursor: Any,
+    _statement: str,
+    _parameters: Any,
+    context: Any,
+    _executemany: bool,
+) -> None:
+    stats = _current_stats.get()
+    start_time = getattr(context, "query_start_time", None)
+    if stats is None or start_time is None:
+        return
+    stats.count += 1
+    stats.duration += time.perf_counter() - start_time
+
+
+def instrument_engine(engine: Engine) -> None:
+    """
+    Count statements and database time of each request executed on the engine.
+
+    The listeners are no-ops outside of a request handled by
+    QueryStatsMiddleware, so scripts and tests pay almost nothing for them.
+    """
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+class QueryStatsMiddleware:
+    """
+    Collect per-request query statistics and log requests over the budget.
+
+    With expose_headers the numbers are also sent back in the
+    X-DB-Query-Count and X-DB-Query-Time (milliseconds) response headers.
+    """
+
+    def __init__(self, app: ASGIApp, *, expose_headers: bool = False) -> None:
+        self.app = app
+        self.expose_headers = expose_headers
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = QueryStats()
+        token = _current_stats.set(stats)
+
+        async def send_with_stats(message: Message) -> None:
+            if message["type"] == "http.response.start" and self.expose_headers:
+                headers = MutableHeaders(scope=message)
+                headers[QUERY_COUNT_HEADER] = str(stats.count)
+                headers[QUERY_TIME_HEADER] = f"{stats.duration * 1000:.2f}"
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_stats)
+        finally:
+            _current_stats.reset(token)
+            _log_over_budget(scope, stats)
+
+
+def _log_over_budget(scope: Scope, stats: QueryStats) -> None:
+    duration_ms = stats.duration * 1000
+    if (
+        stats.count <= settings.QUERY_COUNT_WARNING_THRESHOLD
+        and duration_ms <= settings.QUERY_TIME_WARNING_THRESHOLD_MS
+    ):
+        return
+    route = scope.get("route")
+    path = getattr(route, "path", scope["path"])
+    logger.warning(
+        "Database budget exceeded: %s %s ran %d queries in %.2f ms",
+        scope["method"],
+        path,
+        stats.count,
+        duration_ms,
+    )
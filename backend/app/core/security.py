@@ -1,19 +1,29 @@
+import functools
 from datetime import UTC, datetime, timedelta
-from typing import Any
+from typing import TYPE_CHECKING, Any
 
 import jwt
-from pwdlib import PasswordHash
-from pwdlib.hashers.argon2 import Argon2Hasher
-from pwdlib.hashers.bcrypt import BcryptHasher
 
 from app.core.config import settings
+from app.core.tracing import trace_span
 
-password_hash = PasswordHash(
-    (
-        Argon2Hasher(),
-        BcryptHasher(),
+if TYPE_CHECKING:
+    from pwdlib import PasswordHash
+
+
+@functools.cache
+def get_password_hasher() -> PasswordHash:
+    # Imported on first use, argon2 and bcrypt are slow to import
+    from pwdlib import PasswordHash
+    from pwdlib.hashers.argon2 import Argon2Hasher
+    from pwdlib.hashers.bcrypt import BcryptHasher
+
+    return PasswordHash(
+        (
+            Argon2Hasher(),
+            BcryptHasher(),
+        )
     )
-)
 
 
 ALGORITHM = "HS256"
@@ -29,8 +39,10 @@ def create_access_token(subject: str | Any, expires_delta: timedelta) -> str:
 def verify_password(
     plain_password: str, hashed_password: str
 ) -> tuple[bool, str | None]:
-    return password_hash.verify_and_update(plain_password, hashed_password)
+    with trace_span(op="password.verify", name="verify password"):
+        return get_password_hasher().verify_and_update(plain_password, hashed_password)
 
 
 def get_password_hash(password: str) -> str:
-    return password_hash.hash(password)
+    with trace_span(op="password.hash", name="hash password"):
+        return get_password_hasher().hash(password)
@@ -0,0 +1,145 @@
+import functools
+import inspect
+import time
+from collections.abc import Callable, Coroutine
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Any
+
+from fastapi import Request, Response
+from fastapi.routing import APIRoute
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.config import settings
+from app.core.query_stats import get_query_stats
+
+
+@dataclass
+class ServerTiming:
+    start: float
+    route_start: float | None = None
+    endpoint_start: float | None = None
+    endpoint_end: float | None = None
+    route_end: float | None = None
+
+    def header_value(self, end: float) -> str:
+        # Each phase is only reported if the request got that far
+        metrics: list[tuple[str, float, str | None]] = []
+        if self.route_start is not None and self.endpoint_start is not None:
+            metrics.append(("deps", self.endpoint_start - self.route_start, None))
+        if self.endpoint_start is not None and self.endpoint_end is not None:
+            metrics.append(("handler", self.endpoint_end - self.endpoint_start, None))
+        if self.endpoint_end is not None and self.route_end is not None:
+            metrics.append(("serialize", self.route_end - self.endpoint_end, None))
+        query_stats = get_query_stats()
+        if query_stats is not None:
+            metrics.append(("db", query_stats.duration, f"{query_stats.count} queries"))
+        metrics.append(("total", end - self.start, None))
+        return ", ".join(
+            f"{name};dur={duration * 1000:.2f}" + (f';desc="{desc}"' if desc else "")
+            for name, duration, desc in metrics
+        )
+
+
+_current_timing: ContextVar[ServerTiming | None] = ContextVar(
+    "server_timing", default=None
+)
+
+
+class ServerTimingMiddleware:
+    """
+    Add a W3C Server-Timing header with the time spent in each phase.
+
+    The phases are set by ServerTimingRoute, the database time comes from
+    app.core.query_stats, so this has to run inside QueryStatsMiddleware.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        timing = ServerTiming(start=time.perf_counter())
+        token = _current_timing.set(timing)
+
+        async def send_with_timing(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(scope=message)
+                headers.append(
+                    "Server-Timing", timing.header_value(time.perf_counter())
+                )
+                # Let the frontend read the timings of cross-origin requests
+                headers["Timing-Allow-Origin"] = settings.FRONTEND_HOST
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current_timing.reset(token)
+
+
+def _measure_endpoint(endpoint: Callable[..., Any]) -> Callable[..., Any]:
+    if inspect.iscoroutinefunction(endpoint):
+
+        @functools.wraps(endpoint)
+        async def async_measured_endpoint(*args: Any, **kwargs: Any) -> Any:
+            timing = _current_timing.get()
+            if timing is None:
+                return await endpoint(*args, **kwargs)
+            timing.endpoint_start = time.perf_counter()
+            try:
+                return await endpoint(*args, **kwargs)
+            finally:
+                timing.endpoint_end = time.perf_counter()
+
+        return async_measured_endpoint
+
+    @functools.wraps(endpoint)
+    def measured_endpoint(*args: Any, **kwargs: Any) -> Any:
+        timing = _current_timing.get()
+        if timing is None:
+            return endpoint(*args, **kwargs)
+        timing.endpoint_start = time.perf_counter()
+        try:
+            return endpoint(*args, **kwargs)
+        finally:
+            timing.endpoint_end = time.perf_counter()
+
+    return measured_endpoint
+
+
+class ServerTimingRoute(APIRoute):
+    """
+    Route that records when dependencies, the endpoint and serialization ran.
+
+    Everything before the endpoint is called (body parsing and dependencies)
+    is reported as deps, everything after it returns as serialize.
+    """
+
+    def __init__(self, path: str, endpoint: Callable[..., Any], **kwargs: Any) -> None:
+        super().__init__(path, _measure_endpoint(endpoint), **kwargs)
+
+    def get_route_handler(self) -> Callable[[Request], Coroutine[Any, Any, Response]]:
+        route_handler = super().get_route_handler()
+
+        async def measured_route_handler(request: Request) -> Response:
+            timing = _current_timing.get()
+            if timing is None:
+                return await route_handler(request)
+            timing.route_start = time.perf_counter()
+            try:
+                return await route_handler(request)
+            finally:
+                timing.route_end = time.perf_counter()
+
+        return measured_route_handler
+
+
+# Plain APIRoute when disabled, so there's no overhead at all
+TimedRoute: type[APIRoute] = (
+    ServerTimingRoute if settings.SERVER_TIMING_ENABLED else APIRoute
+)
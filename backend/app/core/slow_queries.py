@@ -0,0 +1,128 @@
+import logging
+import re
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any
+
+from sqlalchemy import Engine, event
+
+from app.core.config import settings
+from app.models import SlowQuery, get_datetime_utc
+
+logger = logging.getLogger(__name__)
+
+# Execution option set on the connection running EXPLAIN, so it isn't logged
+_SKIP_OPTION = "skip_slow_query_log"
+
+slow_queries: deque[SlowQuery] = deque(maxlen=settings.SLOW_QUERY_LOG_SIZE)
+
+# A single worker, so at most one EXPLAIN runs at a time
+_explain_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="explain")
+_explain_lock = threading.Lock()
+_last_explain_time = float("-inf")
+# SELECTs that take locks or change state, explained without ANALYZE so they
+# don't run again
+_SIDE_EFFECTS = re.compile(
+    r"\bFOR\s+(UPDATE|NO\s+KEY\s+UPDATE|SHARE|KEY\s+SHARE)\b"
+    r"|\b(pg_(try_)?advisory_\w+|nextval|setval|set_config|pg_notify)\s*\(",
+    re.IGNORECASE,
+)
+# Give up instead of waiting behind the locks of other transactions
+_EXPLAIN_LOCK_TIMEOUT_MS = 100
+
+
+def get_slow_queries() -> list[SlowQuery]:
+    """
+    Return the recorded slow queries, most recent first.
+    """
+    return list(reversed(slow_queries))
+
+
+def _before_cursor_execute(
+    _conn: Any,
+    _cursor: Any,
+    _statement: str,
+    _parameters: Any,
+    context: Any,
+    _executemany: bool,
+) -> None:
+    if context is None:
+        return
+    # Kept on the execution context rather than the connection, so a failing
+    # statement leaves nothing behind
+    context.slow_query_start_time = time.perf_counter()
+
+
+def _after_cursor_execute(
+    conn: Any,
+    _cursor: Any,
+    statement: str,
+    parameters: Any,
+    context: Any,
+    executemany: bool,
+) -> None:
+    start_time = getattr(context, "slow_query_start_time", None)
+    if start_time is None:
+        return
+    duration_ms = (time.perf_counter() - start_time) * 1000
+    if duration_ms < settings.SLOW_QUERY_THRESHOLD_MS:
+        return
+    if context.execution_options.get(_SKIP_OPTION):
+        return
+    slow_query = SlowQuery(
+        statement=statement, duration_ms=duration_ms, created_at=get_datetime_utc()
+    )
+    slow_queries.append(slow_query)
+    logger.warning("Slow query (%.1f ms): %s", duration_ms, statement)
+    if not executemany and _acquire_explain_slot():
+        # The parameters are only kept until the EXPLAIN has run
+        _explain_executor.submit(_capture_explain, conn.engine, slow_query, parameters)
+
+
+def _acquire_explain_slot() -> bool:
+    global _last_explain_time
+    with _explain_lock:
+        now = time.monotonic()
+        if now - _last_explain_time < settings.SLOW_QUERY_EXPLAIN_INTERVAL_SECONDS:
+            return False
+        _last_explain_time = now
+        return True
+
+
+def _capture_explain(
+    engine: Engine, slow_query: SlowQuery, parameters: Any = None
+) -> None:
+    # EXPLAIN ANALYZE executes the statement, never re-run writes
+    if not slow_query.statement.lstrip().upper().startswith("SELECT"):
+        return
+    options = "FORMAT JSON"
+    if not _SIDE_EFFECTS.search(slow_query.statement):
+        options = f"ANALYZE, BUFFERS, {options}"
+    timeout_ms = max(int(slow_query.duration_ms * 10), 1000)
+    try:
+        with engine.connect() as conn:
+            conn = conn.execution_options(**{_SKIP_OPTION: True})
+            conn.exec_driver_sql(f"SET LOCAL statement_timeout = {timeout_ms}")
+            conn.exec_driver_sql(f"SET LOCAL lock_timeout = {_EXPLAIN_LOCK_TIMEOUT_MS}")
+            result = conn.exec_driver_sql(
+                f"EXPLAIN ({options}) {slow_query.statement}",
+                parameters or (),
+            )
+            slow_query.plan = result.scalar_one()
+            # The connection is closed without commit, so this is rolled back
+    except Exception as e:
+        logger.error("Could not EXPLAIN slow query: %s", e)
+        return
+    logger.info("EXPLAIN of slow query %s: %s", slow_query.statement, slow_query.plan)
+
+
+def instrument_engine(engine: Engine) -> None:
+    """
+    Record statements slower than SLOW_QUERY_THRESHOLD_MS and their plans.
+    """
+    if not settings.SLOW_QUERY_THRESHOLD_MS:
+        return
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
@@ -0,0 +1,106 @@
+import sys
+from collections.abc import Generator
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, Any
+
+from app.core.config import settings
+
+if TYPE_CHECKING:
+    from sentry_sdk._types import Event
+    from sentry_sdk.tracing import Span
+    from sentry_sdk.transport import Transport
+
+# Spans kept in a transaction sampled because of an error
+MAX_SPANS = 1000
+
+
+def get_sample_rate(path: str) -> float:
+    # The longest matching route prefix wins
+    for prefix in sorted(settings.TRACES_SAMPLE_RATES, key=len, reverse=True):
+        if path.startswith(prefix):
+            return settings.TRACES_SAMPLE_RATES[prefix]
+    return settings.TRACES_SAMPLE_RATE
+
+
+def traces_sampler(sampling_context: dict[str, Any]) -> float:
+    # Keep the decision of the caller so distributed traces are complete
+    parent_sampled = sampling_context.get("parent_sampled")
+    if parent_sampled is not None:
+        return float(parent_sampled)
+    asgi_scope = sampling_context.get("asgi_scope") or {}
+    return get_sample_rate(asgi_scope.get("path", ""))
+
+
+def sample_on_error(event: Event, hint: dict[str, Any]) -> Event:  # noqa: ARG001
+    """
+    Keep the transaction of the request that raised the error, as a
+    before_send callback.
+
+    Head sampling drops most transactions before they have errors. An error
+    turns the current one into a sampled transaction, with the spans started
+    from then on, so it's sent with the error event when it finishes.
+    """
+    import sentry_sdk
+
+    transaction = sentry_sdk.get_current_scope().transaction
+    if transaction is not None and not transaction.sampled:
+        transaction.sampled = True
+        transaction.init_span_recorder(maxlen=MAX_SPANS)
+    return event
+
+
+def init_tracing(transport: Transport | None = None) -> None:
+    """
+    Set up Sentry with head sampling of traces.
+
+    Transactions are sampled with TRACES_SAMPLE_RATE, or the rate of the
+    matching prefix in TRACES_SAMPLE_RATES. Error events are not sampled,
+    and the transaction of a request with an error is always kept too, see
+    sample_on_error().
+    With TRACES_FILE set, events are written there instead of sent to Sentry.
+
+    sentry_sdk is only imported here, when tracing is enabled, as it's slow
+    to import.
+    """
+    if transport is None and settings.TRACES_FILE:
+        from app.core.tracing_transports import FileTransport
+
+        transport = FileTransport(settings.TRACES_FILE)
+    if transport is None and (
+        not settings.SENTRY_DSN or settings.FASTAPI_ENV == "development"
+    ):
+        return
+    import sentry_sdk
+
+    sentry_sdk.init(
+        dsn=str(settings.SENTRY_DSN) if settings.SENTRY_DSN else None,
+        traces_sampler=traces_sampler,
+        sample_rate=1.0,
+        before_send=sample_on_error,
+        transport=transport,
+    )
+
+
+def get_current_span() -> Span | None:
+    # Without sentry_sdk imported there can't be a span
+    sentry_sdk = sys.modules.get("sentry_sdk")
+    if sentry_sdk is None:
+        return None
+    span: Span | None = sentry_sdk.get_current_span()
+    return span
+
+
+@contextmanager
+def trace_span(*, op: str, name: str) -> Generator[None]:
+    """
+    Record a span in the current transaction, if it's sampled.
+
+    Database statements get their spans from the Sentry SQLAlchemy
+    integration, use this for other expensive work.
+    """
+    parent = get_current_span()
+    if parent is None or not parent.sampled:
+        yield
+        return
+    with parent.start_child(op=op, name=name):
+        yield
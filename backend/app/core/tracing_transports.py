@@ -0,0 +1,44 @@
+import json
+import threading
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+from sentry_sdk.envelope import Envelope
+from sentry_sdk.transport import Transport
+
+if TYPE_CHECKING:
+    from sentry_sdk._types import Event
+
+
+class InMemoryTransport(Transport):
+    """
+    Keep transactions and error events in memory, for tests and benchmarks.
+    """
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.events: list[Event] = []
+
+    def capture_envelope(self, envelope: Envelope) -> None:
+        for item in envelope.items:
+            event = item.get_transaction_event() or item.get_event()
+            if event is not None:
+                self.events.append(event)
+
+
+class FileTransport(InMemoryTransport):
+    """
+    Append transactions and error events to a file, one JSON object per line.
+    """
+
+    def __init__(self, path: Path) -> None:
+        super().__init__()
+        self.path = path
+        self._lock = threading.Lock()
+
+    def capture_envelope(self, envelope: Envelope) -> None:
+        super().capture_envelope(envelope)
+        events, self.events = self.events, []
+        with self._lock, self.path.open("a") as f:
+            for event in events:
+                f.write(json.dumps(event, default=str) + "\n")
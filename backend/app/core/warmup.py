@@ -0,0 +1,72 @@
+import asyncio
+import logging
+import time
+from collections.abc import Callable
+from contextlib import ExitStack
+from typing import Any
+
+from anyio import to_thread
+from sqlalchemy import text
+
+from app.core.config import settings
+from app.core.db import engine
+from app.core.security import verify_password
+from app.crud import DUMMY_HASH
+from app.utils import EMAIL_TEMPLATES_DIR, get_email_template
+
+logger = logging.getLogger(__name__)
+
+_warmed_up = False
+# Between attempts when the database was down at startup
+RETRY_INTERVAL_SECONDS = 5.0
+
+
+def is_warmed_up() -> bool:
+    return _warmed_up
+
+
+def _open_pool_connections() -> None:
+    # Check out all of them at once, so each one is a new connection
+    with ExitStack() as stack:
+        for _ in range(settings.DATABASE_POOL_SIZE):
+            connection = stack.enter_context(engine.connect())
+            connection.execute(text("SELECT 1"))
+
+
+def warm_up(openapi: Callable[[], Any] | None = None) -> None:
+    """
+    Do the slow first-time work of a worker before it serves requests.
+
+    Opens the pool connections, runs one password verification to load the
+    hashers and allocate Argon2 memory, compiles the email templates and,
+    when given, generates the OpenAPI schema. A database error is logged
+    and leaves the worker not warmed up, it still starts and
+    retry_warm_up() tries again.
+    """
+    global _warmed_up
+    start = time.perf_counter()
+    try:
+        _open_pool_connections()
+    except Exception:
+        logger.exception("Could not open the database connections")
+        return
+    verify_password("warm-up", DUMMY_HASH)
+    for template in EMAIL_TEMPLATES_DIR.glob("*.html"):
+        get_email_template(template.name)
+    if openapi is not None:
+        openapi()
+    _warmed_up = True
+    logger.info("Warmed up in %.0f ms", (time.perf_counter() - start) * 1000)
+
+
+async def retry_warm_up(
+    openapi: Callable[[], Any] | None = None,
+    interval: float = RETRY_INTERVAL_SECONDS,
+) -> None:
+    """
+    Run the warm-up every interval seconds until it succeeds, so the worker
+    becomes ready once the database is back.
+    """
+    while not _warmed_up:
+        await asyncio.sleep(interval)
+        await to_thread.run_sync(warm_up, openapi)
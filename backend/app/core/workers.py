@@ -0,0 +1,69 @@
+import math
+import os
+import resource
+from pathlib import Path
+
+from app.core.config import settings
+from app.models import WorkerMetrics
+
+CGROUP_DIR = Path("/sys/fs/cgroup")
+
+
+def get_cpu_limit(cgroup_dir: Path = CGROUP_DIR) -> float:
+    """
+    Return the CPUs the process can use, the cgroup quota when it has one.
+    """
+    cpus = float(os.process_cpu_count() or 1)
+    # cgroup v2 has "max 100000" without a quota, v1 has -1 in cfs_quota_us
+    cpu_max = cgroup_dir / "cpu.max"
+    cfs_quota = cgroup_dir / "cpu" / "cpu.cfs_quota_us"
+    if cpu_max.exists():
+        quota, period = cpu_max.read_text().split()
+        if quota != "max":
+            cpus = min(cpus, int(quota) / int(period))
+    elif cfs_quota.exists():
+        quota = cfs_quota.read_text().strip()
+        period = (cgroup_dir / "cpu" / "cpu.cfs_period_us").read_text().strip()
+        if int(quota) > 0:
+            cpus = min(cpus, int(quota) / int(period))
+    return cpus
+
+
+def get_worker_count(cgroup_dir: Path = CGROUP_DIR) -> int:
+    if settings.WEB_CONCURRENCY:
+        return settings.WEB_CONCURRENCY
+    return max(1, math.ceil(get_cpu_limit(cgroup_dir)))
+
+
+def get_rss_bytes() -> int:
+    try:
+        # The second field is the resident set size, in pages
+        pages = int(Path("/proc/self/statm").read_text().split()[1])
+    except FileNotFoundError:
+        # Not on Linux, fall back to the peak RSS, which macOS reports in bytes
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return pages * os.sysconf("SC_PAGE_SIZE")
+
+
+def write_worker_metrics(metrics: WorkerMetrics) -> None:
+    # Replaced in one step, so workers never read a partial file
+    path = settings.WORKER_METRICS_FILE
+    tmp_path = path.with_name(f".{path.name}.{os.getpid()}")
+    tmp_path.write_text(metrics.model_dump_json())
+    tmp_path.replace(path)
+
+
+def read_worker_metrics() -> WorkerMetrics | None:
+    """
+    Return the metrics of the supervisor of this worker, if there is one.
+    """
+    try:
+        metrics = WorkerMetrics.model_validate_json(
+            settings.WORKER_METRICS_FILE.read_bytes()
+        )
+    except FileNotFoundError:
+        return None
+    # Left over by another supervisor
+    if metrics.supervisor_pid != os.getppid():
+        return None
+    return metrics
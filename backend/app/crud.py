@@ -1,7 +1,10 @@
 import uuid
 from typing import Any
 
-from sqlmodel import Session, select
+from sqlalchemy import cast, literal, tuple_
+from sqlalchemy.dialects.postgresql import REAL, REGCONFIG
+from sqlalchemy.orm import aliased
+from sqlmodel import Session, func, select
 
 from app.core.security import get_password_hash, verify_password
 from app.models import Item, ItemCreate, User, UserCreate, UserUpdate
@@ -66,3 +69,39 @@ def create_item(*, session: Session, item_in: ItemCreate, owner_id: uuid.UUID) -
     session.commit()
     session.refresh(db_item)
     return db_item
+
+
+def search_items(
+    *,
+    session: Session,
+    query: str,
+    owner_id: uuid.UUID | None,
+    limit: int,
+    max_matches: int,
+    after: tuple[float, uuid.UUID] | None = None,
+) -> list[tuple[Item, float]]:
+    """
+    Return the items matching a web search style query, with their rank.
+
+    Only the max_matches most recent matches are ranked, so common words don't
+    rank all the items. Items are ordered by rank and then id, both descending.
+    With after, the results continue after that (rank, id).
+    """
+    table = Item.__table__  # type: ignore[attr-defined]
+    tsquery = func.websearch_to_tsquery(cast(literal("english"), REGCONFIG), query)
+    matches = select(table).where(table.c.search_vector.op("@@")(tsquery))
+    if owner_id is not None:
+        matches = matches.where(table.c.owner_id == owner_id)
+    matches = matches.order_by(table.c.created_at.desc()).limit(max_matches)
+    candidates = matches.subquery()
+    rank = func.ts_rank(candidates.c.search_vector, tsquery)
+    statement = select(aliased(Item, candidates), rank)
+    if after is not None:
+        # ts_rank() is a real, compared as a double it wouldn't match exactly
+        after_rank, after_id = after
+        statement = statement.where(
+            tuple_(rank, candidates.c.id)
+            < tuple_(cast(after_rank, REAL), literal(after_id))
+        )
+    statement = statement.order_by(rank.desc(), candidates.c.id.desc()).limit(limit)
+    return [(item, item_rank) for item, item_rank in session.exec(statement)]
@@ -0,0 +1,35 @@
+"""
+Write the OpenAPI schema of the app to a file.
+
+Run at image build time, the app then serves the file instead of
+generating the schema in each worker:
+
+    python -m app.generate_openapi --output app/openapi.json
+"""
+
+import argparse
+import logging
+from pathlib import Path
+
+from app.core.openapi import render_openapi
+from app.main import OPENAPI_FILE, app
+
+logger = logging.getLogger(__name__)
+
+
+def write_openapi(output: Path) -> None:
+    output.write_bytes(render_openapi(app.openapi()))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--output", type=Path, default=OPENAPI_FILE)
+    args = parser.parse_args()
+    write_openapi(args.output)
+    logger.info("OpenAPI schema written to %s", args.output)
+
+
+if __name__ == "__main__":
+    main()
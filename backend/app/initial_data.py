@@ -3,8 +3,8 @@ import logging
 from sqlmodel import Session
 
 from app.core.db import engine, init_db
+from app.core.logs import setup_logging
 
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
@@ -14,6 +14,7 @@ def init() -> None:
 
 
 def main() -> None:
+    setup_logging()
     logger.info("Creating initial data")
     init()
     logger.info("Initial data created")
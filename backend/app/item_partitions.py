@@ -0,0 +1,174 @@
+"""
+Maintain the monthly partitions of the item table:
+
+    python -m app.item_partitions
+
+Partitions are created ITEM_PARTITIONS_AHEAD_MONTHS ahead, so inserts never
+miss one. With ITEM_PARTITION_RETENTION_MONTHS set, partitions that ended
+longer ago are detached and moved to the ITEM_ARCHIVE_SCHEMA schema, where
+they can be dumped and dropped.
+
+It also runs in app.prestart and, one worker at a time, every
+ITEM_PARTITION_MAINTENANCE_INTERVAL_SECONDS in the app.
+"""
+
+import asyncio
+import logging
+from datetime import UTC, datetime
+
+from anyio import to_thread
+from sqlalchemy import Connection, Engine, text
+
+from app.core.config import settings
+from app.core.db import engine
+from app.core.logs import setup_logging
+from app.models import get_datetime_utc
+
+logger = logging.getLogger(__name__)
+
+# Taken by the transaction of a maintenance run, so workers take turns
+MAINTENANCE_LOCK_KEY = 7_352_103
+# Don't queue behind long queries on item, the next run retries
+LOCK_TIMEOUT_MS = 5000
+
+
+def month_start(value: datetime) -> datetime:
+    return datetime(value.year, value.month, 1, tzinfo=UTC)
+
+
+def add_months(month: datetime, months: int) -> datetime:
+    index = month.year * 12 + month.month - 1 + months
+    return datetime(index // 12, index % 12 + 1, 1, tzinfo=UTC)
+
+
+def partition_name(month: datetime) -> str:
+    return f"item_{month:%Y_%m}"
+
+
+def get_partitions(conn: Connection) -> dict[str, datetime]:
+    """
+    Return the start month of each partition attached to item, by name.
+    """
+    names = conn.execute(
+        text(
+            "SELECT child.relname FROM pg_inherits "
+            "JOIN pg_class child ON child.oid = pg_inherits.inhrelid "
+            "WHERE pg_inherits.inhparent = 'item'::regclass"
+        )
+    ).scalars()
+    return {
+        name: datetime.strptime(name, "item_%Y_%m").replace(tzinfo=UTC)
+        for name in names
+    }
+
+
+def create_partitions(conn: Connection, start: datetime, end: datetime) -> list[str]:
+    """
+    Create the missing partitions for the months from start to end, included.
+    """
+    existing = get_partitions(conn)
+    created = []
+    month = month_start(start)
+    while month <= end:
+        name = partition_name(month)
+        if name not in existing:
+            # Attaching takes a weaker lock on item than CREATE TABLE PARTITION OF
+            conn.execute(
+                text(
+                    f"CREATE TABLE {name} (LIKE item INCLUDING DEFAULTS "
+                    "INCLUDING CONSTRAINTS INCLUDING GENERATED)"
+                )
+            )
+            conn.execute(
+                text(
+                    f"ALTER TABLE item ATTACH PARTITION {name} FOR VALUES "
+                    f"FROM ('{month.isoformat()}') "
+                    f"TO ('{add_months(month, 1).isoformat()}')"
+                )
+            )
+            created.append(name)
+        month = add_months(month, 1)
+    return created
+
+
+def detach_partitions(
+    conn: Connection, before: datetime, archive_schema: str
+) -> list[str]:
+    """
+    Detach the partitions that end before the given month, into archive_schema.
+    """
+    detached = []
+    for name, month in sorted(get_partitions(conn).items()):
+        if add_months(month, 1) > before:
+            continue
+        # Detaching doesn't run the delete triggers that keep user.item_count
+        conn.execute(
+            text(
+                'UPDATE "user" SET item_count = item_count - counts.items '
+                "FROM (SELECT owner_id, count(*) AS items "
+                f"FROM {name} GROUP BY owner_id) AS counts "
+                'WHERE "user".id = counts.owner_id'
+            )
+        )
+        conn.execute(text(f"ALTER TABLE item DETACH PARTITION {name}"))
+        conn.execute(text(f"CREATE SCHEMA IF NOT EXISTS {archive_schema}"))
+        conn.execute(text(f"ALTER TABLE {name} SET SCHEMA {archive_schema}"))
+        detached.append(name)
+    return detached
+
+
+def maintain_item_partitions(
+    db_engine: Engine = engine, now: datetime | None = None
+) -> None:
+    now = now or get_datetime_utc()
+    with db_engine.begin() as conn:
+        locked = conn.execute(
+            text("SELECT pg_try_advisory_xact_lock(:key)"),
+            {"key": MAINTENANCE_LOCK_KEY},
+        ).scalar()
+        if not locked:
+            logger.info("Item partitions maintained by another process")
+            return
+        conn.execute(text(f"SET LOCAL lock_timeout = {LOCK_TIMEOUT_MS}"))
+        current_month = month_start(now)
+        created = create_partitions(
+            conn,
+            current_month,
+            add_months(current_month, settings.ITEM_PARTITIONS_AHEAD_MONTHS),
+        )
+        detached = []
+        if settings.ITEM_PARTITION_RETENTION_MONTHS is not None:
+            detached = detach_partitions(
+                conn,
+                add_months(current_month, -settings.ITEM_PARTITION_RETENTION_MONTHS),
+                settings.ITEM_ARCHIVE_SCHEMA,
+            )
+    if created:
+        logger.info("Created item partitions %s", ", ".join(created))
+    if detached:
+        logger.info(
+            "Detached item partitions %s into schema %s",
+            ", ".join(detached),
+            settings.ITEM_ARCHIVE_SCHEMA,
+        )
+
+
+async def run_maintenance(db_engine: Engine, interval: float) -> None:
+    """
+    Maintain the partitions every interval seconds, until cancelled.
+    """
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await to_thread.run_sync(maintain_item_partitions, db_engine)
+        except Exception:
+            logger.exception("Failed to maintain the item partitions")
+
+
+def main() -> None:
+    setup_logging()
+    maintain_item_partitions()
+
+
+if __name__ == "__main__":
+    main()
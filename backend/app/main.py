@@ -1,29 +1,120 @@
+import asyncio
+from collections.abc import AsyncGenerator
+from contextlib import asynccontextmanager
+from datetime import timedelta
 from pathlib import Path
 
-import sentry_sdk
 from fastapi import FastAPI
 from fastapi.routing import APIRoute
+from starlette.concurrency import run_in_threadpool
 from starlette.middleware.cors import CORSMiddleware
 
 from app.api.main import api_router
+from app.core.bulkheads import set_threadpool_size
 from app.core.config import settings
+from app.core.db import engine
+from app.core.deadlines import (
+    DeadlineExceeded,
+    DeadlineMiddleware,
+    deadline_exceeded_handler,
+)
+from app.core.idempotency import IdempotencyMiddleware, run_cleanup
+from app.core.load_shedding import LoadSheddingMiddleware, Priority
+from app.core.logs import RequestIdMiddleware, setup_logging
+from app.core.openapi import OpenAPIMiddleware
+from app.core.profiling import ProfilingMiddleware
+from app.core.query_stats import QueryStatsMiddleware
+from app.core.server_timing import ServerTimingMiddleware
+from app.core.tracing import init_tracing
+from app.core.warmup import retry_warm_up, warm_up
+from app.item_partitions import run_maintenance
 
 FRONTEND_DIR = Path(__file__).parent / "frontend"
+# Written by app.generate_openapi when the image is built
+OPENAPI_FILE = Path(__file__).parent / "openapi.json"
 
 
 def custom_generate_unique_id(route: APIRoute) -> str:
     return f"{route.tags[0]}-{route.name}"
 
 
-if settings.SENTRY_DSN and settings.FASTAPI_ENV != "development":
-    sentry_sdk.init(dsn=str(settings.SENTRY_DSN), enable_tracing=True)
+setup_logging()
+init_tracing()
+
+serve_openapi_file = settings.FASTAPI_ENV != "development" and OPENAPI_FILE.exists()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncGenerator[None]:
+    set_threadpool_size()
+    # The server only accepts requests once startup, with the warm-up, is done
+    openapi = None if serve_openapi_file else app.openapi
+    await run_in_threadpool(warm_up, openapi)
+    # Finished in the background if the database was down
+    warm_up_retries = asyncio.create_task(retry_warm_up(openapi))
+    cleanup = asyncio.create_task(
+        run_cleanup(engine, settings.IDEMPOTENCY_CLEANUP_INTERVAL_SECONDS)
+    )
+    partitions = asyncio.create_task(
+        run_maintenance(engine, settings.ITEM_PARTITION_MAINTENANCE_INTERVAL_SECONDS)
+    )
+    yield
+    warm_up_retries.cancel()
+    cleanup.cancel()
+    partitions.cancel()
+    # In-flight requests are drained by the server before shutdown
+    engine.dispose()
+
 
 app = FastAPI(
     title=settings.PROJECT_NAME,
     openapi_url=f"{settings.API_V1_STR}/openapi.json",
     generate_unique_id_function=custom_generate_unique_id,
+    lifespan=lifespan,
 )
 
+if serve_openapi_file:
+    app.add_middleware(
+        OpenAPIMiddleware,
+        openapi_url=f"{settings.API_V1_STR}/openapi.json",
+        schema_file=OPENAPI_FILE,
+    )
+if settings.SERVER_TIMING_ENABLED:
+    # Added before QueryStatsMiddleware so it runs inside it and sees the DB time
+    app.add_middleware(ServerTimingMiddleware)
+app.add_middleware(
+    QueryStatsMiddleware, expose_headers=settings.FASTAPI_ENV == "development"
+)
+app.add_middleware(ProfilingMiddleware)
+if settings.IDEMPOTENT_PATHS:
+    app.add_middleware(
+        IdempotencyMiddleware,
+        paths=settings.IDEMPOTENT_PATHS,
+        ttl=timedelta(hours=settings.IDEMPOTENCY_KEY_TTL_HOURS),
+        db_engine=engine,
+    )
+if settings.LOAD_SHEDDING_MAX_IN_FLIGHT:
+    # Outside of the others, rejecting a request costs as little as possible
+    app.add_middleware(
+        LoadSheddingMiddleware,
+        max_in_flight=settings.LOAD_SHEDDING_MAX_IN_FLIGHT,
+        queue_size=settings.LOAD_SHEDDING_QUEUE_SIZE,
+        max_queue_delay=settings.LOAD_SHEDDING_MAX_QUEUE_DELAY_MS / 1000,
+        target_queue_delay=settings.LOAD_SHEDDING_TARGET_QUEUE_DELAY_MS / 1000,
+        priorities={
+            prefix: Priority[priority.upper()]
+            for prefix, priority in settings.LOAD_SHEDDING_PRIORITIES.items()
+        },
+    )
+# Outside of load shedding, so the time waiting in its queue counts
+app.add_middleware(
+    DeadlineMiddleware,
+    default_timeout=settings.REQUEST_TIMEOUT_SECONDS,
+    timeouts=settings.REQUEST_TIMEOUTS,
+)
+app.add_middleware(RequestIdMiddleware)
+# Outermost, so the responses of the other middlewares get the CORS headers
+# too, and preflight requests are answered before load shedding
 app.add_middleware(
     CORSMiddleware,
     allow_origins=[settings.FRONTEND_HOST],
@@ -31,6 +122,7 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_exception_handler(DeadlineExceeded, deadline_exceeded_handler)
 
 app.include_router(api_router, prefix=settings.API_V1_STR)
 app.frontend("/", directory=FRONTEND_DIR)
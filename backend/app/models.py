@@ -1,8 +1,10 @@
 import uuid
 from datetime import UTC, datetime
+from typing import Any
 
 from pydantic import EmailStr
-from sqlalchemy import DateTime
+from sqlalchemy import Column, Computed, DateTime, Index, LargeBinary, text
+from sqlalchemy.dialects.postgresql import TSVECTOR
 from sqlmodel import Field, Relationship, SQLModel
 
 
@@ -50,12 +52,42 @@ class UpdatePassword(SQLModel):
 
 # Database model, database table inferred from class name
 class User(UserBase, table=True):
-    id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
+    __table_args__ = (
+        # For the q filter of the admin listing, substrings need pg_trgm
+        Index(
+            "ix_user_email_trgm",
+            "email",
+            postgresql_using="gin",
+            postgresql_ops={"email": "gin_trgm_ops"},
+        ),
+        Index(
+            "ix_user_full_name_trgm",
+            "full_name",
+            postgresql_using="gin",
+            postgresql_ops={"full_name": "gin_trgm_ops"},
+        ),
+        # The listing filtered on the few superusers or inactive users
+        Index(
+            "ix_user_created_at_superuser",
+            "created_at",
+            postgresql_where=text("is_superuser IS TRUE"),
+        ),
+        Index(
+            "ix_user_created_at_inactive",
+            "created_at",
+            postgresql_where=text("is_active IS FALSE"),
+        ),
+    )
+
+    id: uuid.UUID = Field(default_factory=uuid.uuid7, primary_key=True)
     hashed_password: str
     created_at: datetime | None = Field(
         default_factory=get_datetime_utc,
         sa_type=DateTime(timezone=True),  # type: ignore
+        index=True,
     )
+    # Kept up to date by triggers on item, fixed by app.repair_item_counts
+    item_count: int = Field(default=0, sa_column_kwargs={"server_default": "0"})
     items: list[Item] = Relationship(back_populates="owner", cascade_delete=True)
 
 
@@ -88,11 +120,31 @@ class ItemUpdate(SQLModel):
 
 
 # Database model, database table inferred from class name
+# Partitioned by month of created_at in the migrations, see app.item_partitions.
+# The primary key has to include created_at, ids alone identify items in the ORM
 class Item(ItemBase, table=True):
-    id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
+    __table_args__ = (
+        Index("ix_item_owner_id_created_at", "owner_id", "created_at"),
+        # Searched by /items/search, not loaded with the items
+        Column(
+            "search_vector",
+            TSVECTOR,
+            Computed(
+                "setweight(to_tsvector('english', title), 'A') || "
+                "setweight(to_tsvector('english', coalesce(description, '')), 'B')",
+                persisted=True,
+            ),
+        ),
+        Index("ix_item_search_vector", "search_vector", postgresql_using="gin"),
+    )
+    __mapper_args__ = {"primary_key": ["id"], "exclude_properties": ["search_vector"]}
+
+    id: uuid.UUID = Field(default_factory=uuid.uuid7, primary_key=True)
     created_at: datetime | None = Field(
         default_factory=get_datetime_utc,
         sa_type=DateTime(timezone=True),  # type: ignore
+        primary_key=True,
+        index=True,
     )
     owner_id: uuid.UUID = Field(
         foreign_key="user.id", nullable=False, ondelete="CASCADE"
@@ -112,6 +164,83 @@ class ItemsPublic(SQLModel):
     count: int
 
 
+# A page of search results, next_cursor is passed back to get the next one
+class ItemsSearchPublic(SQLModel):
+    data: list[ItemPublic]
+    next_cursor: str | None = None
+
+
+# Response stored for an Idempotency-Key, status_code is None while in progress,
+# until locked_until. client is the user id from the access token, so clients'
+# keys don't clash, empty without one
+class IdempotencyKey(SQLModel, table=True):
+    __tablename__ = "idempotency_key"
+
+    client: str = Field(primary_key=True, max_length=64)
+    path: str = Field(primary_key=True, max_length=255)
+    key: str = Field(primary_key=True, max_length=255)
+    request_hash: str = Field(max_length=64)
+    status_code: int | None = None
+    content_type: str | None = Field(default=None, max_length=255)
+    body: bytes | None = Field(default=None, sa_type=LargeBinary)  # type: ignore
+    expires_at: datetime = Field(
+        sa_type=DateTime(timezone=True),  # type: ignore
+        index=True,
+    )
+    locked_until: datetime | None = Field(
+        default=None,
+        sa_type=DateTime(timezone=True),  # type: ignore
+    )
+
+
+# Statement slower than SLOW_QUERY_THRESHOLD_MS, plan is its EXPLAIN once captured.
+# Its parameters aren't kept, they can hold password hashes and emails.
+class SlowQuery(SQLModel):
+    statement: str
+    duration_ms: float
+    created_at: datetime
+    plan: Any = None
+
+
+class SlowQueriesPublic(SQLModel):
+    data: list[SlowQuery]
+    count: int
+
+
+class HealthCheck(SQLModel):
+    name: str
+    healthy: bool
+    detail: str | None = None
+
+
+class Readiness(SQLModel):
+    ready: bool
+    checks: list[HealthCheck]
+
+
+# Written by the app.server supervisor, exits counts replaced workers by reason
+class WorkerMetrics(SQLModel):
+    supervisor_pid: int
+    workers: int
+    pids: list[int]
+    started: int = 0
+    exits: dict[str, int] = {}
+    updated_at: datetime
+
+
+class BulkheadStats(SQLModel):
+    name: str
+    limit: int
+    in_use: int
+    waiting: int
+    rejected: int
+
+
+class BulkheadsPublic(SQLModel):
+    data: list[BulkheadStats]
+    count: int
+
+
 # Generic message
 class Message(SQLModel):
     message: str
@@ -0,0 +1,74 @@
+"""
+Prepare the database before the app starts, in a single process: wait for
+it, run the migrations, create the initial data and the item partitions.
+
+Replicas starting at the same time take turns on an advisory lock, and a
+database already at the Alembic head is checked with a single query:
+
+    python -m app.prestart
+"""
+
+import logging
+
+from sqlalchemy import Connection, Engine, text
+from sqlmodel import Session
+
+from app.backend_pre_start import init as wait_for_database
+from app.core.db import engine, init_db
+from app.core.health import ALEMBIC_DIR, get_alembic_head, get_database_revision
+from app.core.logs import setup_logging
+from app.item_partitions import maintain_item_partitions
+
+logger = logging.getLogger(__name__)
+
+# Serializes prestart across the replicas of the app
+PRESTART_LOCK_KEY = 7_352_102
+
+
+def run_migrations(conn: Connection) -> None:
+    # Imported here, most starts don't need to migrate
+    from alembic import command
+    from alembic.config import Config
+
+    config = Config()
+    config.set_main_option("script_location", str(ALEMBIC_DIR))
+    config.attributes["connection"] = conn
+    command.upgrade(config, "head")
+
+
+def prestart(db_engine: Engine) -> None:
+    with db_engine.connect() as conn:
+        # A session level lock, held across the transactions below
+        conn.execute(text("SELECT pg_advisory_lock(:key)"), {"key": PRESTART_LOCK_KEY})
+        conn.commit()
+        try:
+            revision = get_database_revision(conn)
+            head = get_alembic_head()
+            if revision == head:
+                logger.info("Database already at revision %s", head)
+            else:
+                logger.info("Migrating database from %s to %s", revision, head)
+                run_migrations(conn)
+            conn.commit()
+            with Session(conn) as session:
+                init_db(session)
+            maintain_item_partitions(db_engine)
+        finally:
+            # A failed migration leaves the transaction aborted
+            conn.rollback()
+            conn.execute(
+                text("SELECT pg_advisory_unlock(:key)"), {"key": PRESTART_LOCK_KEY}
+            )
+            conn.commit()
+
+
+def main() -> None:
+    setup_logging()
+    logger.info("Waiting for the database")
+    wait_for_database(engine)
+    prestart(engine)
+    logger.info("Database ready")
+
+
+if __name__ == "__main__":
+    main()
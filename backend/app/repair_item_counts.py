@@ -0,0 +1,49 @@
+"""
+Recount the items of each user and fix user.item_count where it's off:
+
+    python -m app.repair_item_counts
+
+The counts are kept up to date by triggers on item, this is for after they
+were disabled, for example during a manual bulk load. Writes to item wait
+until the repair is done.
+"""
+
+import logging
+
+from sqlalchemy import Engine, text
+
+from app.core.db import engine
+from app.core.logs import setup_logging
+
+logger = logging.getLogger(__name__)
+
+
+def repair_item_counts(db_engine: Engine = engine) -> int:
+    """
+    Set the item_count of every user to its number of items, and return the
+    number of users that had a wrong count.
+    """
+    with db_engine.begin() as conn:
+        # Without concurrent writes, the counts can't change under the repair
+        conn.execute(text("LOCK TABLE item IN SHARE MODE"))
+        result = conn.execute(
+            text(
+                'UPDATE "user" SET item_count = counts.item_count '
+                'FROM (SELECT "user".id, count(item.id) AS item_count FROM "user" '
+                'LEFT JOIN item ON item.owner_id = "user".id GROUP BY "user".id) '
+                "AS counts "
+                'WHERE "user".id = counts.id '
+                'AND "user".item_count <> counts.item_count'
+            )
+        )
+    return result.rowcount
+
+
+def main() -> None:
+    setup_logging()
+    repaired = repair_item_counts()
+    logger.info("Repaired the item count of %d users", repaired)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,208 @@
+"""
+Generate synthetic users and items, for benchmarks and query plans.
+
+Run from the backend directory:
+
+    python -m app.seed --users 100000 --items 10000000
+
+Item ownership is skewed: a few whale users own --whale-share of the items
+and the rest are spread with a long tail. All users have the password
+SEED_PASSWORD. The same --seed always generates the same data.
+
+Ids are UUIDv7 with the time of the row's created_at, like the ones the app
+generates, so they sort by creation time.
+"""
+
+import argparse
+import logging
+import random
+import uuid
+from collections.abc import Iterator
+from datetime import UTC, datetime, timedelta
+from typing import Any
+
+from sqlalchemy import Connection, text
+from sqlmodel import col, delete
+
+from app.core.db import engine
+from app.core.logs import setup_logging
+from app.core.security import get_password_hash
+from app.item_partitions import create_partitions
+from app.models import User
+
+logger = logging.getLogger(__name__)
+
+SEED_EMAIL_DOMAIN = "seed.example.com"
+SEED_PASSWORD = "seed-password"
+
+# Non-whale owners are picked as int(n * random() ** SKEW), a higher value
+# concentrates more items on fewer users
+SKEW = 3
+# Fixed, so the same seed gives the same time-ordered ids
+CREATED_BEFORE = datetime(2026, 1, 1, tzinfo=UTC)
+CREATED_AT_RANGE = timedelta(days=365)
+LOG_INTERVAL = 1_000_000
+# Titles and descriptions are made of these words, the first ones are picked
+# far more often, so searches match from most items to very few
+WORDS = (
+    "blue red green black white large small light heavy round square metal "
+    "wooden plastic glass paper cotton leather steel copper silver golden "
+    "vintage modern classic portable compact outdoor indoor kitchen garden "
+    "office travel winter summer desk lamp chair table shelf box bag bottle "
+    "cup plate bowl knife clock mirror frame rug pillow blanket curtain "
+    "basket bucket ladder hammer wrench drill saw tent lantern compass "
+    "telescope microscope violin trumpet harmonica accordion typewriter "
+    "gramophone sextant astrolabe"
+).split()
+
+
+def seed_email(index: int) -> str:
+    return f"user-{index}@{SEED_EMAIL_DOMAIN}"
+
+
+def _random_created_at(rng: random.Random) -> datetime:
+    return CREATED_BEFORE - CREATED_AT_RANGE * rng.random()
+
+
+def _uuid7(rng: random.Random, created_at: datetime) -> uuid.UUID:
+    # Like uuid.uuid7(), but at created_at and with the random bits from rng
+    unix_ts_ms = int(created_at.timestamp() * 1000)
+    return uuid.UUID(int=unix_ts_ms << 80 | rng.getrandbits(80), version=7)
+
+
+def _uuid7_time(value: uuid.UUID) -> datetime:
+    return datetime.fromtimestamp((value.int >> 80) / 1000, UTC)
+
+
+def _words(rng: random.Random, count: int) -> str:
+    return " ".join(WORDS[int(len(WORDS) * rng.random() ** SKEW)] for _ in range(count))
+
+
+def _user_rows(
+    user_ids: list[uuid.UUID], hashed_password: str
+) -> Iterator[tuple[Any, ...]]:
+    for index, user_id in enumerate(user_ids):
+        yield (
+            user_id,
+            seed_email(index),
+            True,
+            False,
+            f"Seed User {index}",
+            hashed_password,
+            _uuid7_time(user_id),
+        )
+
+
+def _item_rows(
+    rng: random.Random,
+    user_ids: list[uuid.UUID],
+    *,
+    items: int,
+    whales: int,
+    whale_share: float,
+) -> Iterator[tuple[Any, ...]]:
+    whales = min(whales, len(user_ids))
+    others = len(user_ids) - whales
+    for index in range(items):
+        if others == 0 or rng.random() < whale_share:
+            owner_id = user_ids[rng.randrange(whales)]
+        else:
+            owner_id = user_ids[whales + int(others * rng.random() ** SKEW)]
+        created_at = _random_created_at(rng)
+        yield (
+            _uuid7(rng, created_at),
+            _words(rng, 3),
+            _words(rng, 8),
+            owner_id,
+            created_at,
+        )
+        if index and index % LOG_INTERVAL == 0:
+            logger.info("Copied %d items", index)
+
+
+def _copy(conn: Connection, statement: str, rows: Iterator[tuple[Any, ...]]) -> None:
+    dbapi_connection: Any = conn.connection.driver_connection
+    with dbapi_connection.cursor() as cursor, cursor.copy(statement) as copy:
+        for row in rows:
+            copy.write_row(row)
+
+
+def seed(
+    *,
+    users: int,
+    items: int,
+    whales: int = 3,
+    whale_share: float = 0.2,
+    random_seed: int = 0,
+    reset: bool = False,
+) -> None:
+    """
+    Bulk load users and items with COPY, in a single transaction.
+
+    With reset, the users of a previous run and their items are deleted first.
+    """
+    rng = random.Random(random_seed)
+    # Hashing is slow on purpose, so all users share a single hash
+    hashed_password = get_password_hash(SEED_PASSWORD)
+    user_ids = [_uuid7(rng, _random_created_at(rng)) for _ in range(users)]
+    with engine.begin() as conn:
+        if reset:
+            conn.execute(
+                delete(User).where(col(User.email).endswith(f"@{SEED_EMAIL_DOMAIN}"))
+            )
+        _copy(
+            conn,
+            'COPY "user" (id, email, is_active, is_superuser, full_name, '
+            "hashed_password, created_at) FROM STDIN",
+            _user_rows(user_ids, hashed_password),
+        )
+        logger.info("Copied %d users", users)
+        if items and user_ids:
+            create_partitions(conn, CREATED_BEFORE - CREATED_AT_RANGE, CREATED_BEFORE)
+            _copy(
+                conn,
+                "COPY item (id, title, description, owner_id, created_at) FROM STDIN",
+                _item_rows(
+                    rng,
+                    user_ids,
+                    items=items,
+                    whales=whales,
+                    whale_share=whale_share,
+                ),
+            )
+        logger.info("Copied %d items", items)
+    with engine.connect() as conn:
+        # So the planner has statistics for the new rows right away
+        conn.execute(text('ANALYZE "user", item'))
+        conn.commit()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--users", type=int, default=10_000)
+    parser.add_argument("--items", type=int, default=1_000_000)
+    parser.add_argument("--whales", type=int, default=3)
+    parser.add_argument("--whale-share", type=float, default=0.2)
+    parser.add_argument("--seed", type=int, default=0, help="Random seed")
+    parser.add_argument(
+        "--reset", action="store_true", help="Delete previously seeded data first"
+    )
+    args = parser.parse_args()
+
+    setup_logging()
+    logger.info("Seeding %d users and %d items", args.users, args.items)
+    seed(
+        users=args.users,
+        items=args.items,
+        whales=args.whales,
+        whale_share=args.whale_share,
+        random_seed=args.seed,
+        reset=args.reset,
+    )
+    logger.info("Seed data created")
+
+
+if __name__ == "__main__":
+    main()
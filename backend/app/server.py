@@ -0,0 +1,178 @@
+"""
+Run the app with Uvicorn, in worker processes watched by a supervisor:
+
+    python -m app.server
+
+There is one worker per CPU of the container's cgroup quota, unless
+WEB_CONCURRENCY is set. A worker stops accepting connections and drains its
+in-flight requests after WORKER_MAX_REQUESTS, or once its RSS passes
+WORKER_MAX_RSS_MB, each with jitter so the workers don't all restart
+together. The supervisor then starts a new one, and keeps count of the
+workers started and why they exited in WORKER_METRICS_FILE.
+"""
+
+import argparse
+import functools
+import logging
+import os
+import random
+import socket
+import sys
+from collections import Counter
+from collections.abc import Callable
+
+import uvicorn
+from uvicorn.supervisors.multiprocess import Multiprocess, Process
+
+from app.core.config import settings
+from app.core.logs import setup_logging
+from app.core.workers import get_rss_bytes, get_worker_count, write_worker_metrics
+from app.models import WorkerMetrics, get_datetime_utc
+
+logger = logging.getLogger(__name__)
+
+# Worker exit codes, uvicorn already uses 3 for a failed startup
+EXIT_MAX_REQUESTS = 10
+EXIT_MAX_RSS = 11
+EXIT_REASONS = {EXIT_MAX_REQUESTS: "max_requests", EXIT_MAX_RSS: "max_rss"}
+
+
+class RecyclingServer(uvicorn.Server):
+    exit_code = 0
+
+    @functools.cached_property
+    def max_rss_bytes(self) -> int | None:
+        # Computed in the worker process, so each worker gets its own jitter
+        if not settings.WORKER_MAX_RSS_MB:
+            return None
+        jitter = random.uniform(0, settings.WORKER_MAX_RSS_JITTER)
+        return int(settings.WORKER_MAX_RSS_MB * (1 - jitter) * 1024 * 1024)
+
+    async def on_tick(self, counter: int) -> bool:
+        if await super().on_tick(counter):
+            if not self.should_exit:
+                # Uvicorn stops after limit_max_requests, with its own jitter
+                self.exit_code = EXIT_MAX_REQUESTS
+            return True
+        # Every second, ticks are 0.1 seconds apart
+        if counter % 10 == 0 and self.max_rss_bytes is not None:
+            rss = get_rss_bytes()
+            if rss > self.max_rss_bytes:
+                logger.info(
+                    "RSS of %d MB over the limit of %d MB, terminating process",
+                    rss // 2**20,
+                    self.max_rss_bytes // 2**20,
+                )
+                self.exit_code = EXIT_MAX_RSS
+                return True
+        return False
+
+    def run(self, sockets: list[socket.socket] | None = None) -> None:
+        # Shutdown, once on_tick returns True, drains the in-flight requests
+        super().run(sockets)
+        if self.exit_code:
+            sys.exit(self.exit_code)
+
+
+class WorkerSupervisor(Multiprocess):
+    """
+    Uvicorn's supervisor, counting the workers it starts and why they exited.
+
+    keep_subprocess_alive() is a copy of uvicorn's with the counting added,
+    uvicorn is pinned to a minor version in pyproject.toml for it.
+    """
+
+    def __init__(
+        self,
+        config: uvicorn.Config,
+        target: Callable[[list[socket.socket] | None], None],
+        sockets: list[socket.socket],
+    ) -> None:
+        super().__init__(config, target, sockets)
+        self.started = 0
+        self.exits: Counter[str] = Counter()
+        self.written_pids: list[int | None] = []
+
+    def init_processes(self) -> None:
+        super().init_processes()
+        self.started += len(self.processes)
+        self.write_metrics()
+
+    def keep_subprocess_alive(self) -> None:
+        if self.should_exit.is_set():
+            return
+
+        for idx, process in enumerate(self.processes):
+            if process.is_alive(timeout=self.config.timeout_worker_healthcheck):
+                continue
+
+            exitcode = process.process.exitcode
+            if process.process.is_alive():
+                reason = "unresponsive"
+            elif exitcode is None:
+                reason = "exited"
+            else:
+                reason = EXIT_REASONS.get(exitcode, "exited")
+            process.kill()
+            process.join()
+
+            if self.should_exit.is_set():
+                return
+
+            logger.info(
+                "Worker process [%s] stopped (%s), starting a new one",
+                process.pid,
+                reason,
+            )
+            self.exits[reason] += 1
+            self.started += 1
+            process = Process(self.config, self.target, self.sockets)
+            process.start()
+            self.processes[idx] = process
+
+        # Also after the number of workers is changed with SIGTTIN or SIGTTOU
+        if [process.pid for process in self.processes] != self.written_pids:
+            self.write_metrics()
+
+    def write_metrics(self) -> None:
+        self.written_pids = [process.pid for process in self.processes]
+        write_worker_metrics(
+            WorkerMetrics(
+                supervisor_pid=os.getpid(),
+                workers=len(self.processes),
+                pids=[pid for pid in self.written_pids if pid is not None],
+                started=self.started,
+                exits=dict(self.exits),
+                updated_at=get_datetime_utc(),
+            )
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    args = parser.parse_args()
+
+    setup_logging()
+    config = uvicorn.Config(
+        "app.main:app",
+        host=args.host,
+        port=args.port,
+        workers=get_worker_count(),
+        limit_max_requests=settings.WORKER_MAX_REQUESTS or None,
+        limit_max_requests_jitter=settings.WORKER_MAX_REQUESTS_JITTER,
+        timeout_graceful_shutdown=settings.WORKER_GRACEFUL_TIMEOUT_SECONDS,
+        # Keep the logging set up by the app
+        log_config=None,
+    )
+    logger.info("Starting %d workers", config.workers)
+    server = RecyclingServer(config)
+    sock = config.bind_socket()
+    WorkerSupervisor(config, target=server.run, sockets=[sock]).run()
+
+
+if __name__ == "__main__":
+    main()
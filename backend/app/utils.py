@@ -1,20 +1,24 @@
+import functools
 import logging
 from dataclasses import dataclass
 from datetime import UTC, datetime, timedelta
 from pathlib import Path
-from typing import Any
+from typing import TYPE_CHECKING, Any
 
-import emails
 import jwt
-from jinja2 import Template
 from jwt.exceptions import InvalidTokenError
 
 from app.core import security
 from app.core.config import settings
+from app.core.tracing import trace_span
+
+if TYPE_CHECKING:
+    from jinja2 import Template
 
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+EMAIL_TEMPLATES_DIR = Path(__file__).parent / "email-templates"
+
 
 @dataclass
 class EmailData:
@@ -22,11 +26,16 @@ class EmailData:
     subject: str
 
 
+@functools.cache
+def get_email_template(template_name: str) -> Template:
+    # Imported on first use, like emails below, to keep the app startup fast
+    from jinja2 import Template
+
+    return Template((EMAIL_TEMPLATES_DIR / template_name).read_text())
+
+
 def render_email_template(*, template_name: str, context: dict[str, Any]) -> str:
-    template_str = (
-        Path(__file__).parent / "email-templates" / template_name
-    ).read_text()
-    html_content = Template(template_str).render(context)
+    html_content = get_email_template(template_name).render(context)
     return html_content
 
 
@@ -38,6 +47,8 @@ def send_email(
 ) -> None:
     assert settings.emails_enabled, "no provided configuration for email variables"
     assert settings.EMAILS_FROM_EMAIL  # For type checker
+    import emails
+
     message = emails.message.Message(
         subject=subject,
         html=html_content,
@@ -52,8 +63,9 @@ def send_email(
         smtp_options["user"] = settings.SMTP_USER
     if settings.SMTP_PASSWORD:
         smtp_options["password"] = settings.SMTP_PASSWORD
-    response = message.send(to=email_to, smtp=smtp_options)
-    logger.info(f"send email result: {response}")
+    with trace_span(op="smtp.send", name="send email"):
+        response = message.send(to=email_to, smtp=smtp_options)
+    logger.info("send email result: %s", response)
 
 
 def generate_test_email(email_to: str) -> EmailData:
@@ -0,0 +1,84 @@
+"""
+Report the modules that take the most time to import with app.main.
+
+Run from the backend directory:
+
+    python -m benchmarks.import_time --top 20
+"""
+
+import argparse
+import subprocess
+import sys
+from dataclasses import dataclass
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).parent.parent
+
+
+@dataclass
+class ImportTime:
+    module: str
+    # Microseconds, without and with the imports of the module
+    self_us: int
+    cumulative_us: int
+
+
+def measure_import_time(module: str = "app.main", runs: int = 3) -> list[ImportTime]:
+    """
+    Import module in fresh interpreters and return the fastest run.
+
+    A first run, not measured, compiles the bytecode caches.
+    """
+    best: list[ImportTime] = []
+    for run in range(runs + 1):
+        stderr = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+            cwd=BACKEND_DIR,
+            check=True,
+            capture_output=True,
+            text=True,
+        ).stderr
+        times = []
+        for line in stderr.splitlines():
+            if not line.startswith("import time:") or "|" not in line:
+                continue
+            self_us, cumulative_us, name = line.removeprefix("import time:").split("|")
+            if not self_us.strip().isdigit():
+                continue  # The header line
+            times.append(ImportTime(name.strip(), int(self_us), int(cumulative_us)))
+        if run and (not best or total_import_time(times) < total_import_time(best)):
+            best = times
+    return best
+
+
+def total_import_time(times: list[ImportTime]) -> int:
+    # -X importtime prints a module after its imports, so the top level is last
+    return times[-1].cumulative_us if times else 0
+
+
+def format_report(times: list[ImportTime], top: int) -> str:
+    lines = [
+        f"Total: {total_import_time(times) / 1000:.1f} ms",
+        f"{'self ms':>9} {'cumulative ms':>14}  module",
+    ]
+    for time in sorted(times, key=lambda time: time.self_us, reverse=True)[:top]:
+        lines.append(
+            f"{time.self_us / 1000:>9.1f} {time.cumulative_us / 1000:>14.1f}  "
+            f"{time.module}"
+        )
+    return "\n".join(lines)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--module", default="app.main")
+    parser.add_argument("--top", type=int, default=20)
+    args = parser.parse_args()
+    times = measure_import_time(args.module)
+    sys.stdout.write(format_report(times, args.top) + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""
+Measure the latency of the item search, against a scan with ILIKE.
+
+Run from the backend directory, with the database up:
+
+    python -m benchmarks.item_search --users 100000 --items 10000000
+
+The dataset is seeded first with app.seed, whose titles and descriptions are
+made of words picked with a skewed frequency. Each query is run --repeat
+times with the crud.search_items() used by /items/search, for the first page
+of results, as a superuser and as the owners with the most and the median
+number of items. The same words are also searched with ILIKE, the way a
+filter without the index would. p50/p95 latencies are written as JSON.
+
+Only the ITEM_SEARCH_MAX_MATCHES most recent matches are ranked, pass it in
+the environment to compare other values.
+"""
+
+import argparse
+import json
+import statistics
+import sys
+import time
+import uuid
+from collections.abc import Callable
+from typing import Any
+
+from sqlmodel import Session, col, or_, select
+
+from app import crud
+from app.core.config import settings
+from app.core.db import engine
+from app.models import Item, User
+from app.seed import SEED_EMAIL_DOMAIN, WORDS, seed
+
+PAGE_SIZE = 20
+# A word that matches most items, one that matches some, a rare one, a phrase
+# and one that matches none, that ILIKE has to scan all the items for
+QUERIES = [
+    WORDS[0],
+    WORDS[len(WORDS) // 8],
+    WORDS[-1],
+    f'"{WORDS[1]} {WORDS[2]}"',
+    "zeppelin",
+]
+
+
+def search(session: Session, query: str, owner_id: uuid.UUID | None) -> int:
+    return len(
+        crud.search_items(
+            session=session,
+            query=query,
+            owner_id=owner_id,
+            limit=PAGE_SIZE + 1,
+            max_matches=settings.ITEM_SEARCH_MAX_MATCHES,
+        )
+    )
+
+
+def scan(session: Session, query: str, owner_id: uuid.UUID | None) -> int:
+    pattern = f"%{query.strip('"')}%"
+    statement = select(Item).where(
+        or_(col(Item.title).ilike(pattern), col(Item.description).ilike(pattern))
+    )
+    if owner_id is not None:
+        statement = statement.where(Item.owner_id == owner_id)
+    statement = statement.order_by(col(Item.created_at).desc()).limit(PAGE_SIZE + 1)
+    return len(session.exec(statement).all())
+
+
+def measure(
+    session: Session,
+    method: Callable[[Session, str, uuid.UUID | None], int],
+    query: str,
+    owner_id: uuid.UUID | None,
+    repeat: int,
+) -> dict[str, Any]:
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        rows = method(session, query, owner_id)
+        durations.append((time.perf_counter() - start) * 1000)
+        # Don't keep the loaded items in the identity map between runs
+        session.expunge_all()
+    quantiles = statistics.quantiles(durations, n=20) if repeat > 1 else durations
+    return {
+        "rows": rows,
+        "p50_ms": round(statistics.median(durations), 2),
+        "p95_ms": round(quantiles[-1], 2),
+    }
+
+
+def get_owners(session: Session) -> dict[str, uuid.UUID | None]:
+    seeded = select(User.id).where(col(User.email).endswith(f"@{SEED_EMAIL_DOMAIN}"))
+    users = session.exec(seeded.order_by(col(User.item_count).desc())).all()
+    return {
+        "superuser": None,
+        "largest_owner": users[0],
+        "median_owner": users[len(users) // 2],
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--users", type=int, default=10_000)
+    parser.add_argument("--items", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0, help="Random seed")
+    parser.add_argument(
+        "--skip-seed", action="store_true", help="Use the already seeded data"
+    )
+    args = parser.parse_args()
+
+    if not args.skip_seed:
+        seed(users=args.users, items=args.items, random_seed=args.seed, reset=True)
+
+    results = []
+    with Session(engine) as session:
+        for scope, owner_id in get_owners(session).items():
+            for query in QUERIES:
+                for name, method in (("search", search), ("ilike", scan)):
+                    result = measure(session, method, query, owner_id, args.repeat)
+                    results.append(
+                        {"scope": scope, "query": query, "method": name, **result}
+                    )
+    sys.stdout.write(json.dumps(results, indent=2) + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,332 @@
+"""
+Load test the API over HTTP and report throughput and latency per route.
+
+Run from the backend directory, with the database up:
+
+    python -m benchmarks.load_test --workers 4 --concurrency 64 --duration 30 \\
+        --output results.json
+
+The dataset is seeded first with app.seed, then the app is started with
+`python -m app.server` and a mix of logins, item reads and writes, reads of
+the current user and admin listings is sent with an async client. RPS,
+p50/p95/p99 latencies, requests shed with a 503 and goodput, the rate of
+successful responses within --slo-ms, per route are written as JSON. Run it
+with increasing --concurrency to check that goodput stays flat past
+saturation.
+
+With --baseline, the results are compared to a previous output and the
+command exits with status 1 if a route's p95 went up, or its RPS went down,
+by more than --tolerance.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any
+
+import httpx
+
+from app.core.config import settings
+from app.seed import SEED_PASSWORD, seed, seed_email
+
+# Relative weight of each scenario in the mix
+SCENARIOS = {
+    "login": 5,
+    "read_items": 45,
+    "create_item": 15,
+    "read_user_me": 25,
+    "read_users": 10,
+}
+
+
+@dataclass
+class RouteStats:
+    latencies: list[float] = field(default_factory=list)
+    errors: int = 0
+    # Rejected by the load shedding with a 503, not counted in errors
+    shed: int = 0
+
+
+@dataclass
+class LoadTest:
+    client: httpx.AsyncClient
+    users: int
+    deadline: float
+    rng: random.Random
+    stats: dict[str, RouteStats] = field(default_factory=dict)
+
+    async def request(
+        self, name: str, method: str, url: str, **kwargs: Any
+    ) -> httpx.Response | None:
+        start = time.perf_counter()
+        try:
+            response = await self.client.request(method, url, **kwargs)
+        except httpx.HTTPError:
+            response = None
+        latency = time.perf_counter() - start
+        route_stats = self.stats.setdefault(name, RouteStats())
+        if response is not None and response.status_code == 503:
+            route_stats.shed += 1
+            # Back off like a well behaved client
+            await asyncio.sleep(float(response.headers.get("Retry-After", 1)))
+            return None
+        if response is None or response.is_error:
+            route_stats.errors += 1
+            return None
+        route_stats.latencies.append(latency)
+        return response
+
+    async def login(self, email: str, password: str) -> dict[str, str] | None:
+        r = await self.request(
+            "login",
+            "POST",
+            f"{settings.API_V1_STR}/login/access-token",
+            data={"username": email, "password": password},
+        )
+        if r is None:
+            return None
+        return {"Authorization": f"Bearer {r.json()['access_token']}"}
+
+    async def run_virtual_user(self) -> None:
+        email = seed_email(self.rng.randrange(self.users))
+        headers = superuser_headers = None
+        # Logins can be shed under overload, retry them like a client would
+        while headers is None or superuser_headers is None:
+            if time.monotonic() >= self.deadline:
+                return
+            headers = headers or await self.login(email, SEED_PASSWORD)
+            superuser_headers = superuser_headers or await self.login(
+                settings.FIRST_SUPERUSER, settings.FIRST_SUPERUSER_PASSWORD
+            )
+        names = list(SCENARIOS)
+        weights = list(SCENARIOS.values())
+        while time.monotonic() < self.deadline:
+            match self.rng.choices(names, weights)[0]:
+                case "login":
+                    await self.login(email, SEED_PASSWORD)
+                case "read_items":
+                    await self.request(
+                        "read_items",
+                        "GET",
+                        f"{settings.API_V1_STR}/items/",
+                        headers=headers,
+                    )
+                case "create_item":
+                    await self.request(
+                        "create_item",
+                        "POST",
+                        f"{settings.API_V1_STR}/items/",
+                        headers=headers,
+                        json={"title": "Load test", "description": "Created"},
+                    )
+                case "read_user_me":
+                    await self.request(
+                        "read_user_me",
+                        "GET",
+                        f"{settings.API_V1_STR}/users/me",
+                        headers=headers,
+                    )
+                case "read_users":
+                    await self.request(
+                        "read_users",
+                        "GET",
+                        f"{settings.API_V1_STR}/users/",
+                        headers=superuser_headers,
+                    )
+
+
+def summarize(
+    stats: dict[str, RouteStats], duration: float, slo: float
+) -> dict[str, Any]:
+    routes = {}
+    for name, route_stats in sorted(stats.items()):
+        latencies = route_stats.latencies
+        quantiles = (
+            statistics.quantiles(latencies, n=100) if len(latencies) > 1 else None
+        )
+        routes[name] = {
+            "requests": len(latencies),
+            "errors": route_stats.errors,
+            "shed": route_stats.shed,
+            "rps": len(latencies) / duration,
+            "goodput_rps": sum(latency <= slo for latency in latencies) / duration,
+            "p50_ms": quantiles[49] * 1000 if quantiles else None,
+            "p95_ms": quantiles[94] * 1000 if quantiles else None,
+            "p99_ms": quantiles[98] * 1000 if quantiles else None,
+        }
+    return routes
+
+
+async def run_load(
+    *,
+    base_url: str,
+    users: int,
+    concurrency: int,
+    duration: float,
+    slo: float,
+    random_seed: int,
+) -> dict[str, Any]:
+    limits = httpx.Limits(max_connections=concurrency)
+    async with httpx.AsyncClient(
+        base_url=base_url, limits=limits, timeout=30
+    ) as client:
+        load_test = LoadTest(
+            client=client,
+            users=users,
+            deadline=time.monotonic() + duration,
+            rng=random.Random(random_seed),
+        )
+        start = time.monotonic()
+        await asyncio.gather(
+            *(load_test.run_virtual_user() for _ in range(concurrency))
+        )
+        elapsed = time.monotonic() - start
+    return summarize(load_test.stats, elapsed, slo)
+
+
+def wait_until_ready(base_url: str, server: subprocess.Popen[bytes]) -> None:
+    url = f"{base_url}{settings.API_V1_STR}/utils/health-check/"
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError("The server exited before it was ready")
+        try:
+            if httpx.get(url).is_success:
+                return
+        except httpx.TransportError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError("The server didn't become ready in 60 seconds")
+
+
+def compare(
+    results: dict[str, Any], baseline: dict[str, Any], tolerance: float
+) -> list[str]:
+    """
+    Return a description of each route that regressed against the baseline.
+    """
+    regressions = []
+    for name, base in baseline["routes"].items():
+        current = results["routes"].get(name)
+        if current is None:
+            regressions.append(f"{name}: missing from the results")
+            continue
+        if base["p95_ms"] and current["p95_ms"]:
+            change = current["p95_ms"] / base["p95_ms"] - 1
+            if change > tolerance:
+                regressions.append(
+                    f"{name}: p95 {base['p95_ms']:.1f} ms -> "
+                    f"{current['p95_ms']:.1f} ms (+{change:.0%})"
+                )
+        if base["rps"]:
+            change = current["rps"] / base["rps"] - 1
+            if change < -tolerance:
+                regressions.append(
+                    f"{name}: {base['rps']:.1f} rps -> "
+                    f"{current['rps']:.1f} rps ({change:.0%})"
+                )
+        if current["errors"] > base["errors"]:
+            regressions.append(
+                f"{name}: {current['errors']} errors, {base['errors']} in baseline"
+            )
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--items", type=int, default=10_000)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=30, help="In seconds")
+    parser.add_argument(
+        "--slo-ms",
+        type=float,
+        default=1000,
+        help="Responses slower than this don't count in the goodput",
+    )
+    parser.add_argument("--port", type=int, default=8123)
+    parser.add_argument("--seed", type=int, default=0, help="Random seed")
+    parser.add_argument(
+        "--base-url", help="Test a running server instead of starting one"
+    )
+    parser.add_argument("--skip-seed", action="store_true")
+    parser.add_argument("--output", type=Path, help="Write the results here")
+    parser.add_argument("--baseline", type=Path, help="Results to compare with")
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.1,
+        help="Allowed relative change before flagging a regression",
+    )
+    args = parser.parse_args()
+
+    if not args.skip_seed:
+        seed(users=args.users, items=args.items, random_seed=args.seed, reset=True)
+
+    server = None
+    base_url = args.base_url
+    if base_url is None:
+        base_url = f"http://127.0.0.1:{args.port}"
+        server = subprocess.Popen(
+            [sys.executable, "-m", "app.server", "--port", str(args.port)],
+            env={
+                **os.environ,
+                "LOG_LEVEL": "WARNING",
+                "WEB_CONCURRENCY": str(args.workers),
+            },
+            stdout=subprocess.DEVNULL,
+        )
+    try:
+        if server is not None:
+            wait_until_ready(base_url, server)
+        routes = asyncio.run(
+            run_load(
+                base_url=base_url,
+                users=args.users,
+                concurrency=args.concurrency,
+                duration=args.duration,
+                slo=args.slo_ms / 1000,
+                random_seed=args.seed,
+            )
+        )
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+    results: dict[str, Any] = {
+        "config": {
+            "users": args.users,
+            "items": args.items,
+            "workers": args.workers,
+            "concurrency": args.concurrency,
+            "duration": args.duration,
+            "slo_ms": args.slo_ms,
+        },
+        "goodput_rps": sum(route["goodput_rps"] for route in routes.values()),
+        "routes": routes,
+    }
+    if args.baseline:
+        baseline = json.loads(args.baseline.read_text())
+        results["regressions"] = compare(results, baseline, args.tolerance)
+    output = json.dumps(results, indent=2)
+    if args.output:
+        args.output.write_text(output + "\n")
+    sys.stdout.write(output + "\n")
+    if results.get("regressions"):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+Measure the per-request overhead of tracing at 0%, 1% and 100% sampling.
+
+Run from the backend directory, with the database up:
+
+    FASTAPI_ENV=development python -m benchmarks.tracing_overhead --requests 2000
+
+Each sample rate runs in its own process because sentry_sdk.init() is
+process-wide. Traces go to an in-memory transport, so the numbers include
+creating and serializing spans but not the network.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+SAMPLE_RATES = [0.0, 0.01, 1.0]
+
+
+def run(sample_rate: float, requests: int) -> dict[str, float]:
+    os.environ["TRACES_SAMPLE_RATE"] = str(sample_rate)
+    os.environ.pop("TRACES_SAMPLE_RATES", None)
+
+    from fastapi.testclient import TestClient
+
+    from app.core.tracing import init_tracing
+    from app.core.tracing_transports import InMemoryTransport
+
+    transport = InMemoryTransport()
+    init_tracing(transport=transport)
+
+    from app.core.config import settings
+    from app.main import app
+
+    with TestClient(app) as client:
+        r = client.post(
+            f"{settings.API_V1_STR}/login/access-token",
+            data={
+                "username": settings.FIRST_SUPERUSER,
+                "password": settings.FIRST_SUPERUSER_PASSWORD,
+            },
+        )
+        headers = {"Authorization": f"Bearer {r.json()['access_token']}"}
+        durations = []
+        for _ in range(requests):
+            start = time.perf_counter()
+            client.get(f"{settings.API_V1_STR}/items/", headers=headers)
+            durations.append((time.perf_counter() - start) * 1000)
+
+    quantiles = statistics.quantiles(durations, n=100)
+    return {
+        "sample_rate": sample_rate,
+        "mean_ms": statistics.fmean(durations),
+        "p50_ms": quantiles[49],
+        "p99_ms": quantiles[98],
+        "transactions": len(transport.events),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--sample-rate", type=float, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.sample_rate is not None:
+        sys.stdout.write(json.dumps(run(args.sample_rate, args.requests)) + "\n")
+        return
+
+    results = []
+    for sample_rate in SAMPLE_RATES:
+        output = subprocess.run(
+            [
+                sys.executable,
+                "-m",
+                "benchmarks.tracing_overhead",
+                "--requests",
+                str(args.requests),
+                "--sample-rate",
+                str(sample_rate),
+            ],
+            check=True,
+            capture_output=True,
+            text=True,
+        ).stdout
+        results.append(json.loads(output.splitlines()[-1]))
+    sys.stdout.write(json.dumps(results, indent=2) + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""
+Measure the latency of the filters of the admin user listing.
+
+Run from the backend directory, with the database up:
+
+    FASTAPI_ENV=development python -m benchmarks.user_search --users 5000000
+
+Users are seeded first with app.seed, without items. Each request is sent
+--repeat times to GET /users/ as the first superuser, through the ASGI app
+without a server, and p50/p95 latencies and the number of matching users are
+written as JSON. The substring searches need the pg_trgm indexes, without them
+they scan the table.
+"""
+
+import argparse
+import json
+import logging
+import statistics
+import sys
+import time
+from typing import Any
+
+from fastapi.testclient import TestClient
+
+from app.core.config import settings
+from app.main import app
+from app.seed import SEED_EMAIL_DOMAIN, seed, seed_email
+
+REQUESTS: dict[str, dict[str, Any]] = {
+    "email": {"q": seed_email(123_456)},
+    "email_part": {"q": "er-98765@"},
+    "full_name": {"q": "User 4242"},
+    "domain": {"q": SEED_EMAIL_DOMAIN, "limit": 20},
+    "no_match": {"q": "zeppelin"},
+    "superusers": {"is_superuser": True},
+    "inactive": {"is_active": False},
+    "active_page": {"is_active": True, "limit": 20},
+}
+
+
+def measure(
+    client: TestClient, headers: dict[str, str], params: dict[str, Any], repeat: int
+) -> dict[str, Any]:
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        r = client.get(f"{settings.API_V1_STR}/users/", headers=headers, params=params)
+        durations.append((time.perf_counter() - start) * 1000)
+        r.raise_for_status()
+    quantiles = statistics.quantiles(durations, n=20) if repeat > 1 else durations
+    return {
+        "count": r.json()["count"],
+        "p50_ms": round(statistics.median(durations), 2),
+        "p95_ms": round(quantiles[-1], 2),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--users", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0, help="Random seed")
+    parser.add_argument(
+        "--skip-seed", action="store_true", help="Use the already seeded users"
+    )
+    args = parser.parse_args()
+
+    if not args.skip_seed:
+        seed(users=args.users, items=0, random_seed=args.seed, reset=True)
+
+    # Not a log line per request in the output
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    results = {}
+    with TestClient(app) as client:
+        r = client.post(
+            f"{settings.API_V1_STR}/login/access-token",
+            data={
+                "username": settings.FIRST_SUPERUSER,
+                "password": settings.FIRST_SUPERUSER_PASSWORD,
+            },
+        )
+        headers = {"Authorization": f"Bearer {r.json()['access_token']}"}
+        for name, params in REQUESTS.items():
+            results[name] = measure(client, headers, params, args.repeat)
+    sys.stdout.write(json.dumps(results, indent=2) + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+Compare inserting rows with UUIDv4 and UUIDv7 primary keys.
+
+Run from the backend directory, with the database up:
+
+    python -m benchmarks.uuid_keys --rows 10000000
+
+For each version, rows shaped like item's are inserted into a scratch table
+in batches, each one with COPY in its own transaction, like many small
+inserts would be. It reports the insert throughput, the WAL written, and the
+size of the primary key index. The scratch tables are dropped at the end.
+"""
+
+import argparse
+import json
+import sys
+import time
+import uuid
+from collections.abc import Callable
+from typing import Any
+
+from sqlalchemy import text
+
+from app.core.db import engine
+from app.models import get_datetime_utc
+
+VERSIONS: dict[str, Callable[[], uuid.UUID]] = {
+    "uuid4": uuid.uuid4,
+    "uuid7": uuid.uuid7,
+}
+
+
+def run(version: str, rows: int, batch_size: int) -> dict[str, Any]:
+    new_id = VERSIONS[version]
+    table = f"benchmark_{version}"
+    owner_id = uuid.uuid4()
+    with engine.connect() as conn:
+        conn.execute(text(f"DROP TABLE IF EXISTS {table}"))
+        conn.execute(
+            text(
+                f"CREATE TABLE {table} (id uuid PRIMARY KEY, title varchar(255), "
+                "owner_id uuid, created_at timestamptz)"
+            )
+        )
+        conn.commit()
+        wal_start = conn.execute(text("SELECT pg_current_wal_lsn()")).scalar()
+        conn.commit()
+
+        dbapi_connection: Any = conn.connection.driver_connection
+        start = time.perf_counter()
+        for offset in range(0, rows, batch_size):
+            with (
+                dbapi_connection.cursor() as cursor,
+                cursor.copy(
+                    f"COPY {table} (id, title, owner_id, created_at) FROM STDIN"
+                ) as copy,
+            ):
+                for index in range(offset, min(offset + batch_size, rows)):
+                    copy.write_row(
+                        (new_id(), f"Item {index}", owner_id, get_datetime_utc())
+                    )
+            dbapi_connection.commit()
+        elapsed = time.perf_counter() - start
+
+        wal_bytes = conn.execute(
+            text("SELECT pg_current_wal_lsn() - CAST(:start AS pg_lsn)"),
+            {"start": wal_start},
+        ).scalar()
+        index_bytes = conn.execute(
+            text(f"SELECT pg_relation_size('{table}_pkey')")
+        ).scalar()
+        table_bytes = conn.execute(text(f"SELECT pg_relation_size('{table}')")).scalar()
+        conn.execute(text(f"DROP TABLE {table}"))
+        conn.commit()
+
+    return {
+        "version": version,
+        "rows": rows,
+        "seconds": round(elapsed, 2),
+        "rows_per_second": round(rows / elapsed),
+        "wal_mb": round(int(wal_bytes) / 2**20, 1),
+        "index_mb": round(index_bytes / 2**20, 1),
+        "table_mb": round(table_bytes / 2**20, 1),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--batch-size", type=int, default=1_000)
+    args = parser.parse_args()
+
+    results = [run(version, args.rows, args.batch_size) for version in VERSIONS]
+    sys.stdout.write(json.dumps(results, indent=2) + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+from unittest.mock import patch
+
+import anyio
+from anyio import to_thread
+from fastapi.testclient import TestClient
+from sqlmodel import create_engine
+
+from app.core import health
+from app.core.config import settings
+from app.core.db import engine
+
+
+def test_liveness(client: TestClient) -> None:
+    r = client.get(f"{settings.API_V1_STR}/health/live")
+    assert r.status_code == 200
+    assert r.json() is True
+
+
+def test_readiness(client: TestClient) -> None:
+    with (
+        patch("app.core.health._cached_readiness", None),
+        patch("app.core.health.is_warmed_up", return_value=True),
+    ):
+        r = client.get(f"{settings.API_V1_STR}/health/ready")
+    assert r.status_code == 200
+    result = r.json()
+    assert result["ready"] is True
+    checks = {check["name"]: check for check in result["checks"]}
+    assert set(checks) == {"database", "migrations", "pool", "warm_up"}
+    assert checks["migrations"]["healthy"]
+
+
+def test_readiness_database_down(client: TestClient) -> None:
+    with (
+        patch("app.core.health._cached_readiness", None),
+        patch(
+            "app.core.health.check_database_connection",
+            side_effect=ConnectionError("Database down"),
+        ),
+    ):
+        r = client.get(f"{settings.API_V1_STR}/health/ready")
+    assert r.status_code == 503
+    result = r.json()
+    assert result["ready"] is False
+    assert result["checks"][0] == {
+        "name": "database",
+        "healthy": False,
+        "detail": "Database down",
+    }
+
+
+def test_readiness_is_cached() -> None:
+    with patch("app.core.health._cached_readiness", None):
+        first = anyio.run(health.get_readiness)
+        with patch(
+            "app.core.health.check_database_connection",
+            side_effect=ConnectionError("Database down"),
+        ):
+            assert anyio.run(health.get_readiness) is first
+        with patch("app.core.config.settings.HEALTH_CHECK_CACHE_SECONDS", 0):
+            assert anyio.run(health.get_readiness) is not first
+
+
+def test_readiness_pool_exhausted() -> None:
+    small_engine = create_engine(engine.url, pool_size=1, max_overflow=0)
+    with (
+        patch("app.core.health._cached_readiness", None),
+        patch("app.core.health._pool_saturated_since", None),
+        patch("app.core.health.is_warmed_up", return_value=True),
+        patch("app.core.config.settings.DATABASE_MAX_OVERFLOW", 0),
+        patch("app.core.config.settings.HEALTH_CHECK_CACHE_SECONDS", 0),
+        small_engine.connect(),
+    ):
+        # Returns without waiting for a connection, and stays ready while
+        # the saturation may be a burst of requests
+        readiness = anyio.run(health.get_readiness, small_engine)
+        assert readiness.ready is True
+        assert [check.name for check in readiness.checks] == ["pool", "warm_up"]
+        with patch("app.core.config.settings.HEALTH_POOL_SATURATION_SECONDS", 0):
+            readiness = anyio.run(health.get_readiness, small_engine)
+        assert readiness.ready is False
+        assert readiness.checks[0].healthy is False
+    small_engine.dispose()
+
+
+def test_readiness_threadpool_full(client: TestClient) -> None:
+    assert client.portal
+    threadpool = client.portal.call(to_thread.current_default_thread_limiter)
+    borrowers = [object() for _ in range(int(threadpool.total_tokens))]
+    for borrower in borrowers:
+        client.portal.call(threadpool.acquire_on_behalf_of_nowait, borrower)
+    try:
+        with (
+            patch("app.core.health._cached_readiness", None),
+            patch("app.core.health.is_warmed_up", return_value=True),
+        ):
+            r = client.get(f"{settings.API_V1_STR}/health/ready")
+    finally:
+        for borrower in borrowers:
+            client.portal.call(threadpool.release_on_behalf_of, borrower)
+    assert r.status_code == 200
+    assert r.json()["ready"] is True
@@ -1,10 +1,20 @@
 import uuid
+from collections.abc import Callable
+from contextlib import AbstractContextManager
+from unittest.mock import patch
 
+import anyio
 from fastapi.testclient import TestClient
 from sqlmodel import Session
 
+from app import crud
+from app.core.bulkheads import bulkheads
 from app.core.config import settings
+from app.core.query_stats import QUERY_COUNT_HEADER, QueryStats
+from app.models import ItemCreate
 from tests.utils.item import create_random_item
+from tests.utils.user import create_random_user
+from tests.utils.utils import random_lower_string
 
 
 def test_create_item(
@@ -20,7 +30,7 @@ def test_create_item(
     content = response.json()
     assert content["title"] == data["title"]
     assert content["description"] == data["description"]
-    assert "id" in content
+    assert uuid.UUID(content["id"]).version == 7
     assert "owner_id" in content
 
 
@@ -79,6 +89,113 @@ def test_read_items(
     assert len(content["data"]) >= 2
 
 
+def test_read_items_query_budget(
+    client: TestClient,
+    normal_user_token_headers: dict[str, str],
+    assert_max_queries: Callable[[int], AbstractContextManager[QueryStats]],
+) -> None:
+    # Current user, with its item_count, and page, no lazy loading of Item.owner
+    with assert_max_queries(2):
+        response = client.get(
+            f"{settings.API_V1_STR}/items/",
+            headers=normal_user_token_headers,
+        )
+    assert response.status_code == 200
+    # The header also counts the SAVEPOINT of the test transaction
+    assert response.headers[QUERY_COUNT_HEADER] == "3"
+
+
+def test_search_items(
+    client: TestClient, normal_user_token_headers: dict[str, str], db: Session
+) -> None:
+    word = random_lower_string()
+    user = crud.get_user_by_email(session=db, email=settings.EMAIL_TEST_USER)
+    assert user
+    in_description = crud.create_item(
+        session=db,
+        item_in=ItemCreate(title="Other", description=f"About {word}"),
+        owner_id=user.id,
+    )
+    in_title = crud.create_item(
+        session=db, item_in=ItemCreate(title=f"The {word}"), owner_id=user.id
+    )
+    other_user = create_random_user(db)
+    crud.create_item(session=db, item_in=ItemCreate(title=word), owner_id=other_user.id)
+    response = client.get(
+        f"{settings.API_V1_STR}/items/search",
+        headers=normal_user_token_headers,
+        params={"q": word},
+    )
+    assert response.status_code == 200
+    content = response.json()
+    # Matches in the title rank first, other users' items aren't searched
+    assert [item["id"] for item in content["data"]] == [
+        str(in_title.id),
+        str(in_description.id),
+    ]
+    assert content["next_cursor"] is None
+
+
+def test_search_items_superuser(
+    client: TestClient, superuser_token_headers: dict[str, str], db: Session
+) -> None:
+    word = random_lower_string()
+    user = create_random_user(db)
+    item = crud.create_item(
+        session=db, item_in=ItemCreate(title=word), owner_id=user.id
+    )
+    response = client.get(
+        f"{settings.API_V1_STR}/items/search",
+        headers=superuser_token_headers,
+        params={"q": word},
+    )
+    assert response.status_code == 200
+    assert [item["id"] for item in response.json()["data"]] == [str(item.id)]
+
+
+def test_search_items_cursor(
+    client: TestClient, superuser_token_headers: dict[str, str], db: Session
+) -> None:
+    word = random_lower_string()
+    user = create_random_user(db)
+    ids = {
+        str(
+            crud.create_item(
+                session=db, item_in=ItemCreate(title=word), owner_id=user.id
+            ).id
+        )
+        for _ in range(5)
+    }
+    pages = []
+    params = {"q": word, "limit": 2}
+    for _ in range(5):
+        response = client.get(
+            f"{settings.API_V1_STR}/items/search",
+            headers=superuser_token_headers,
+            params=params,
+        )
+        assert response.status_code == 200
+        content = response.json()
+        pages.append([item["id"] for item in content["data"]])
+        if content["next_cursor"] is None:
+            break
+        params["cursor"] = content["next_cursor"]
+    assert [len(page) for page in pages] == [2, 2, 1]
+    assert {id for page in pages for id in page} == ids
+
+
+def test_search_items_invalid_cursor(
+    client: TestClient, normal_user_token_headers: dict[str, str]
+) -> None:
+    response = client.get(
+        f"{settings.API_V1_STR}/items/search",
+        headers=normal_user_token_headers,
+        params={"q": "foo", "cursor": "not-a-cursor"},
+    )
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Invalid cursor"
+
+
 def test_update_item(
     client: TestClient, superuser_token_headers: dict[str, str], db: Session
 ) -> None:
@@ -162,3 +279,28 @@ def test_delete_item_not_enough_permissions(
     assert response.status_code == 403
     content = response.json()
     assert content["detail"] == "Not enough permissions"
+
+
+def test_items_bulkhead_full(
+    client: TestClient, normal_user_token_headers: dict[str, str]
+) -> None:
+    assert client.portal
+    full = anyio.CapacityLimiter(1)
+    client.portal.call(full.acquire_on_behalf_of_nowait, object())
+    with (
+        patch.object(bulkheads["items"], "limiter", full),
+        patch.object(bulkheads["items"], "queue_timeout", 0.01),
+    ):
+        r = client.get(
+            f"{settings.API_V1_STR}/items/", headers=normal_user_token_headers
+        )
+        assert r.status_code == 503
+        assert r.headers["retry-after"] == "1"
+        # Unauthenticated requests are rejected before waiting for a slot
+        r = client.get(f"{settings.API_V1_STR}/items/")
+        assert r.status_code == 401
+        # Routes outside the bulkhead are not affected
+        r = client.get(
+            f"{settings.API_V1_STR}/users/me", headers=normal_user_token_headers
+        )
+        assert r.status_code == 200
@@ -1,11 +1,16 @@
 import uuid
+from collections.abc import Callable
+from contextlib import AbstractContextManager
 from unittest.mock import patch
 
+import anyio
 from fastapi.testclient import TestClient
 from sqlmodel import Session, select
 
 from app import crud
+from app.core.bulkheads import bulkheads
 from app.core.config import settings
+from app.core.query_stats import QueryStats
 from app.core.security import verify_password
 from app.models import User, UserCreate
 from tests.utils.user import create_random_user
@@ -34,6 +39,18 @@ def test_get_users_normal_user_me(
     assert current_user["email"] == settings.EMAIL_TEST_USER
 
 
+def test_get_users_me_query_budget(
+    client: TestClient,
+    normal_user_token_headers: dict[str, str],
+    assert_max_queries: Callable[[int], AbstractContextManager[QueryStats]],
+) -> None:
+    with assert_max_queries(1):
+        r = client.get(
+            f"{settings.API_V1_STR}/users/me", headers=normal_user_token_headers
+        )
+    assert r.status_code == 200
+
+
 def test_create_user_new_email(
     client: TestClient, superuser_token_headers: dict[str, str], db: Session
 ) -> None:
@@ -198,6 +215,111 @@ def test_retrieve_users(
         assert "email" in item
 
 
+def test_retrieve_users_admin_bulkhead_full(
+    client: TestClient,
+    superuser_token_headers: dict[str, str],
+    normal_user_token_headers: dict[str, str],
+) -> None:
+    assert client.portal
+    full = anyio.CapacityLimiter(1)
+    client.portal.call(full.acquire_on_behalf_of_nowait, object())
+    with (
+        patch.object(bulkheads["admin"], "limiter", full),
+        patch.object(bulkheads["admin"], "queue_timeout", 0.01),
+    ):
+        r = client.get(f"{settings.API_V1_STR}/users/", headers=superuser_token_headers)
+        assert r.status_code == 503
+        # Normal users are rejected before waiting for an admin slot
+        r = client.get(
+            f"{settings.API_V1_STR}/users/", headers=normal_user_token_headers
+        )
+        assert r.status_code == 403
+
+
+def test_retrieve_users_search(
+    client: TestClient, superuser_token_headers: dict[str, str], db: Session
+) -> None:
+    name = random_lower_string()
+    by_email = crud.create_user(
+        session=db,
+        user_create=UserCreate(
+            email=f"{name}@example.com", password=random_lower_string()
+        ),
+    )
+    by_name = crud.create_user(
+        session=db,
+        user_create=UserCreate(
+            email=random_email(),
+            password=random_lower_string(),
+            full_name=f"Ms {name.upper()}",
+        ),
+    )
+    create_random_user(db)
+
+    r = client.get(
+        f"{settings.API_V1_STR}/users/",
+        headers=superuser_token_headers,
+        params={"q": name[4:12]},
+    )
+    assert r.status_code == 200
+    content = r.json()
+    assert {user["id"] for user in content["data"]} == {
+        str(by_email.id),
+        str(by_name.id),
+    }
+    assert content["count"] == 2
+
+    # Wildcards are matched literally
+    r = client.get(
+        f"{settings.API_V1_STR}/users/",
+        headers=superuser_token_headers,
+        params={"q": f"{name[:4]}%"},
+    )
+    assert r.json()["data"] == []
+
+
+def test_retrieve_users_search_too_short(
+    client: TestClient, superuser_token_headers: dict[str, str]
+) -> None:
+    r = client.get(
+        f"{settings.API_V1_STR}/users/",
+        headers=superuser_token_headers,
+        params={"q": "ab"},
+    )
+    assert r.status_code == 422
+
+
+def test_retrieve_users_filters(
+    client: TestClient, superuser_token_headers: dict[str, str], db: Session
+) -> None:
+    inactive = crud.create_user(
+        session=db,
+        user_create=UserCreate(
+            email=random_email(), password=random_lower_string(), is_active=False
+        ),
+    )
+    r = client.get(
+        f"{settings.API_V1_STR}/users/",
+        headers=superuser_token_headers,
+        params={"is_active": False},
+    )
+    assert r.status_code == 200
+    users = r.json()["data"]
+    assert str(inactive.id) in {user["id"] for user in users}
+    assert all(not user["is_active"] for user in users)
+
+    r = client.get(
+        f"{settings.API_V1_STR}/users/",
+        headers=superuser_token_headers,
+        params={"is_superuser": True, "is_active": True},
+    )
+    assert r.status_code == 200
+    users = r.json()["data"]
+    assert settings.FIRST_SUPERUSER in {user["email"] for user in users}
+    assert all(user["is_superuser"] and user["is_active"] for user in users)
+    assert r.json()["count"] == len(users)
+
+
 def test_update_user_me(
     client: TestClient, normal_user_token_headers: dict[str, str], db: Session
 ) -> None:
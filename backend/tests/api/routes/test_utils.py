@@ -0,0 +1,98 @@
+import os
+import time
+from pathlib import Path
+from unittest.mock import patch
+
+from fastapi.testclient import TestClient
+from sqlmodel import Session, text
+
+from app.core.config import settings
+from app.core.workers import write_worker_metrics
+from app.models import WorkerMetrics, get_datetime_utc
+
+
+def test_read_slow_queries(
+    client: TestClient, superuser_token_headers: dict[str, str], db: Session
+) -> None:
+    with (
+        patch("app.core.config.settings.SLOW_QUERY_THRESHOLD_MS", 50),
+        patch("app.core.config.settings.SLOW_QUERY_EXPLAIN_INTERVAL_SECONDS", 0),
+    ):
+        db.execute(text("SELECT pg_sleep(0.1), :marker"), {"marker": "slow-test"})
+
+    for _ in range(50):
+        r = client.get(
+            f"{settings.API_V1_STR}/utils/slow-queries/",
+            headers=superuser_token_headers,
+        )
+        assert r.status_code == 200
+        slow_query = r.json()["data"][0]
+        if slow_query["plan"]:
+            break
+        time.sleep(0.1)
+    assert "pg_sleep" in slow_query["statement"]
+    assert slow_query["duration_ms"] >= 50
+    # The parameters are only used for the EXPLAIN, never exposed
+    assert "parameters" not in slow_query
+    assert "slow-test" not in str(slow_query)
+    assert slow_query["plan"][0]["Plan"]["Actual Total Time"] >= 50
+
+
+def test_read_slow_queries_normal_user(
+    client: TestClient, normal_user_token_headers: dict[str, str]
+) -> None:
+    r = client.get(
+        f"{settings.API_V1_STR}/utils/slow-queries/",
+        headers=normal_user_token_headers,
+    )
+    assert r.status_code == 403
+
+
+def test_read_bulkheads(
+    client: TestClient, superuser_token_headers: dict[str, str]
+) -> None:
+    r = client.get(
+        f"{settings.API_V1_STR}/utils/bulkheads/", headers=superuser_token_headers
+    )
+    assert r.status_code == 200
+    stats = {bulkhead["name"]: bulkhead for bulkhead in r.json()["data"]}
+    assert set(stats) == {"threadpool", *settings.BULKHEAD_LIMITS}
+    assert stats["threadpool"]["limit"] == settings.THREADPOOL_SIZE
+    assert stats["items"]["limit"] == settings.BULKHEAD_LIMITS["items"]
+    assert stats["items"]["in_use"] == 0
+
+
+def test_read_workers(
+    client: TestClient, superuser_token_headers: dict[str, str], tmp_path: Path
+) -> None:
+    with patch(
+        "app.core.config.settings.WORKER_METRICS_FILE", tmp_path / "workers.json"
+    ):
+        r = client.get(
+            f"{settings.API_V1_STR}/utils/workers/", headers=superuser_token_headers
+        )
+        assert r.status_code == 404
+
+        write_worker_metrics(
+            WorkerMetrics(
+                supervisor_pid=os.getppid(),
+                workers=2,
+                pids=[101, 102],
+                started=3,
+                exits={"max_rss": 1},
+                updated_at=get_datetime_utc(),
+            )
+        )
+        r = client.get(
+            f"{settings.API_V1_STR}/utils/workers/", headers=superuser_token_headers
+        )
+    assert r.status_code == 200
+    metrics = r.json()
+    assert metrics["pids"] == [101, 102]
+    assert metrics["exits"] == {"max_rss": 1}
+
+
+def test_health_check(client: TestClient) -> None:
+    r = client.get(f"{settings.API_V1_STR}/utils/health-check/")
+    assert r.status_code == 200
+    assert r.json() is True
@@ -0,0 +1,104 @@
+import gc
+import statistics
+import time
+import tracemalloc
+from collections.abc import Callable
+from dataclasses import dataclass
+from typing import Any
+
+import pytest
+
+# Each round runs the function enough times to take at least this long
+MIN_ROUND_TIME = 0.05
+ROUNDS = 15
+
+
+@dataclass
+class BenchmarkResult:
+    name: str
+    iterations: int
+    # Seconds per call, one per round
+    timings: list[float]
+    memory_peak: int
+    memory_retained: int
+
+    @property
+    def median(self) -> float:
+        return statistics.median(self.timings)
+
+    @property
+    def iqr(self) -> float:
+        quartiles = statistics.quantiles(self.timings, n=4)
+        return quartiles[2] - quartiles[0]
+
+
+Benchmark = Callable[[Callable[[], Any]], BenchmarkResult]
+
+results: list[BenchmarkResult] = []
+
+
+def measure(name: str, func: Callable[[], Any]) -> BenchmarkResult:
+    """
+    Time func over several rounds, then trace its allocations in one call.
+
+    The first call is a warm-up and sets the number of iterations per round.
+    The garbage collector is disabled while timing so collections triggered
+    by earlier rounds don't add noise.
+    """
+    start = time.perf_counter()
+    func()
+    iterations = max(1, int(MIN_ROUND_TIME / (time.perf_counter() - start)))
+
+    timings = []
+    gc.collect()
+    gc.disable()
+    try:
+        for _ in range(ROUNDS):
+            start = time.perf_counter()
+            for _ in range(iterations):
+                func()
+            timings.append((time.perf_counter() - start) / iterations)
+    finally:
+        gc.enable()
+
+    tracemalloc.start()
+    try:
+        before, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        func()
+        after, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return BenchmarkResult(
+        name=name,
+        iterations=iterations,
+        timings=timings,
+        memory_peak=peak - before,
+        memory_retained=after - before,
+    )
+
+
+@pytest.fixture
+def benchmark(request: pytest.FixtureRequest) -> Benchmark:
+    def run(func: Callable[[], Any]) -> BenchmarkResult:
+        result = measure(request.node.name, func)
+        results.append(result)
+        return result
+
+    return run
+
+
+def pytest_terminal_summary(terminalreporter: Any) -> None:
+    if not results:
+        return
+    terminalreporter.section("benchmarks")
+    terminalreporter.write_line(
+        f"{'name':<50} {'median':>12} {'iqr':>12} {'ops/s':>10} "
+        f"{'peak KiB':>10} {'kept KiB':>10}"
+    )
+    for result in results:
+        terminalreporter.write_line(
+            f"{result.name:<50} {result.median * 1e6:>9.1f} us "
+            f"{result.iqr * 1e6:>9.1f} us {1 / result.median:>10.1f} "
+            f"{result.memory_peak / 1024:>10.1f} {result.memory_retained / 1024:>10.1f}"
+        )
@@ -0,0 +1,39 @@
+import pytest
+from sqlmodel import Session
+
+from app import crud
+from app.models import ItemCreate, UserCreate
+from tests.benchmarks.conftest import Benchmark
+from tests.utils.user import create_random_user
+from tests.utils.utils import random_email, random_lower_string
+
+pytestmark = pytest.mark.benchmark
+
+
+def test_create_user(db: Session, benchmark: Benchmark) -> None:
+    password = random_lower_string()
+    benchmark(
+        lambda: crud.create_user(
+            session=db,
+            user_create=UserCreate(email=random_email(), password=password),
+        )
+    )
+
+
+def test_authenticate_found(db: Session, benchmark: Benchmark) -> None:
+    email = random_email()
+    password = random_lower_string()
+    crud.create_user(session=db, user_create=UserCreate(email=email, password=password))
+    benchmark(lambda: crud.authenticate(session=db, email=email, password=password))
+
+
+def test_authenticate_not_found(db: Session, benchmark: Benchmark) -> None:
+    email = random_email()
+    password = random_lower_string()
+    benchmark(lambda: crud.authenticate(session=db, email=email, password=password))
+
+
+def test_create_item(db: Session, benchmark: Benchmark) -> None:
+    user = create_random_user(db)
+    item_in = ItemCreate(title=random_lower_string(), description="Benchmark")
+    benchmark(lambda: crud.create_item(session=db, item_in=item_in, owner_id=user.id))
@@ -0,0 +1,22 @@
+from datetime import timedelta
+
+import jwt
+import pytest
+
+from app.core import security
+from app.core.config import settings
+from tests.benchmarks.conftest import Benchmark
+
+pytestmark = pytest.mark.benchmark
+
+
+def test_create_access_token(benchmark: Benchmark) -> None:
+    benchmark(lambda: security.create_access_token("user-id", timedelta(minutes=5)))
+
+
+def test_decode_access_token(benchmark: Benchmark) -> None:
+    # The decoding done by get_current_user on every authenticated request
+    token = security.create_access_token("user-id", timedelta(minutes=5))
+    benchmark(
+        lambda: jwt.decode(token, settings.SECRET_KEY, algorithms=[security.ALGORITHM])
+    )
@@ -0,0 +1,42 @@
+import uuid
+
+import pytest
+
+from app.models import Item, ItemPublic, User, UserPublic
+from app.utils import render_email_template
+from tests.benchmarks.conftest import Benchmark
+from tests.utils.utils import random_email, random_lower_string
+
+pytestmark = pytest.mark.benchmark
+
+
+@pytest.mark.parametrize("rows", [1, 100, 10_000])
+def test_validate_item_public(benchmark: Benchmark, rows: int) -> None:
+    owner_id = uuid.uuid4()
+    items = [
+        Item(title=random_lower_string(), description="Benchmark", owner_id=owner_id)
+        for _ in range(rows)
+    ]
+    benchmark(lambda: [ItemPublic.model_validate(item) for item in items])
+
+
+@pytest.mark.parametrize("rows", [1, 100, 10_000])
+def test_validate_user_public(benchmark: Benchmark, rows: int) -> None:
+    users = [
+        User(email=random_email(), hashed_password="hash", full_name="Benchmark")
+        for _ in range(rows)
+    ]
+    benchmark(lambda: [UserPublic.model_validate(user) for user in users])
+
+
+def test_render_email_template(benchmark: Benchmark) -> None:
+    context = {
+        "project_name": "Benchmark",
+        "username": random_email(),
+        "password": random_lower_string(),
+        "email": random_email(),
+        "link": "http://localhost:5173",
+    }
+    benchmark(
+        lambda: render_email_template(template_name="new_account.html", context=context)
+    )
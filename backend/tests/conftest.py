@@ -1,42 +1,133 @@
-from collections.abc import Generator
+import os
+from collections.abc import Callable, Generator
+from contextlib import AbstractContextManager, contextmanager
+from typing import Any
 
 import pytest
 from fastapi.testclient import TestClient
+from sqlalchemy import event
 from sqlmodel import Session, delete
 
+from app.api.deps import get_db
 from app.core.config import settings
 from app.core.db import engine, init_db
+from app.core.query_stats import QueryStats
 from app.main import app
 from app.models import Item, User
+from tests.utils.database import create_worker_database, drop_database
 from tests.utils.user import authentication_token_from_email
 from tests.utils.utils import get_superuser_token_headers
 
+SAVEPOINT_STATEMENTS = ("SAVEPOINT", "RELEASE SAVEPOINT", "ROLLBACK TO SAVEPOINT")
+
 
 @pytest.fixture(scope="session", autouse=True)
-def db() -> Generator[Session]:
+def test_database() -> Generator[None]:
+    """
+    Give each pytest-xdist worker its own database.
+
+    Without xdist, the tests use the configured database.
+    """
+    worker_id = os.environ.get("PYTEST_XDIST_WORKER")
+    if worker_id is None:
+        yield
+        return
+
+    database = create_worker_database(engine.url, worker_id)
+
+    def use_worker_database(*args: Any) -> None:
+        cparams = args[-1]
+        cparams["dbname"] = database
+
+    event.listen(engine, "do_connect", use_worker_database)
+    engine.dispose()
+    yield
+    event.remove(engine, "do_connect", use_worker_database)
+    engine.dispose()
+    drop_database(engine.url, database)
+
+
+@pytest.fixture(scope="session", autouse=True)
+def initial_data(test_database: None) -> Generator[None]:  # noqa: ARG001
     with Session(engine) as session:
         init_db(session)
-        yield session
-        statement = delete(Item)
-        session.execute(statement)
-        statement = delete(User)
-        session.execute(statement)
+    # Without a transaction left open, so tests can lock the tables for DDL
+    yield
+    with Session(engine) as session:
+        session.execute(delete(Item))
+        session.execute(delete(User))
         session.commit()
 
 
-@pytest.fixture(scope="module")
-def client() -> Generator[TestClient]:
+@pytest.fixture(autouse=True)
+def db(initial_data: None) -> Generator[Session]:  # noqa: ARG001
+    """
+    Run each test in a transaction that is rolled back at the end.
+
+    Commits in the test and in the app, through the overridden get_db, only
+    release a SAVEPOINT, so tests don't see each other's data.
+    """
+    with engine.connect() as connection:
+        transaction = connection.begin()
+
+        def get_test_db() -> Generator[Session]:
+            with Session(
+                bind=connection, join_transaction_mode="create_savepoint"
+            ) as session:
+                yield session
+
+        app.dependency_overrides[get_db] = get_test_db
+        with Session(
+            bind=connection, join_transaction_mode="create_savepoint"
+        ) as session:
+            yield session
+        del app.dependency_overrides[get_db]
+        transaction.rollback()
+
+
+@pytest.fixture(scope="session")
+def client(initial_data: None) -> Generator[TestClient]:  # noqa: ARG001
     with TestClient(app) as c:
         yield c
 
 
-@pytest.fixture(scope="module")
+@pytest.fixture(scope="session")
 def superuser_token_headers(client: TestClient) -> dict[str, str]:
     return get_superuser_token_headers(client)
 
 
-@pytest.fixture(scope="module")
-def normal_user_token_headers(client: TestClient, db: Session) -> dict[str, str]:
-    return authentication_token_from_email(
-        client=client, email=settings.EMAIL_TEST_USER, db=db
-    )
+@pytest.fixture(scope="session")
+def normal_user_token_headers(client: TestClient) -> dict[str, str]:
+    # Created outside of the test transactions, so it's kept for all tests
+    with Session(engine) as session:
+        return authentication_token_from_email(
+            client=client, email=settings.EMAIL_TEST_USER, db=session
+        )
+
+
+@pytest.fixture
+def assert_max_queries() -> Callable[[int], AbstractContextManager[QueryStats]]:
+    """
+    Fail the test if the block runs more than n statements on the engine.
+
+    Statements are counted in any thread, so this also covers requests made
+    through the TestClient.
+    """
+
+    @contextmanager
+    def _assert_max_queries(n: int) -> Generator[QueryStats]:
+        stats = QueryStats()
+
+        def count(_conn: Any, _cursor: Any, statement: str, *_args: Any) -> None:
+            # The test transaction adds a SAVEPOINT around each session
+            if not statement.startswith(SAVEPOINT_STATEMENTS):
+                stats.count += 1
+
+        event.listen(engine, "after_cursor_execute", count)
+        try:
+            yield stats
+        finally:
+            event.remove(engine, "after_cursor_execute", count)
+        assert stats.count <= n, f"Expected at most {n} queries, got {stats.count}"
+
+    return _assert_max_queries
@@ -0,0 +1,49 @@
+import anyio
+import pytest
+from fastapi import HTTPException
+
+from app.core.bulkheads import Bulkhead
+
+
+async def hold(bulkhead: Bulkhead, release: anyio.Event) -> None:
+    async for _ in bulkhead():
+        await release.wait()
+
+
+def test_bulkhead_queues_until_a_slot_is_free() -> None:
+    async def main() -> None:
+        bulkhead = Bulkhead("test", limit=1, queue_timeout=5)
+        release = anyio.Event()
+        async with anyio.create_task_group() as tg:
+            tg.start_soon(hold, bulkhead, release)
+            await anyio.wait_all_tasks_blocked()
+            waiter = bulkhead()
+            tg.start_soon(anext, waiter)
+            await anyio.wait_all_tasks_blocked()
+            stats = bulkhead.stats()
+            assert (stats.in_use, stats.waiting) == (1, 1)
+            release.set()
+        assert bulkhead.stats().in_use == 1
+        await waiter.aclose()
+        assert bulkhead.stats().in_use == 0
+        assert bulkhead.rejected == 0
+
+    anyio.run(main)
+
+
+def test_bulkhead_rejects_after_queue_timeout() -> None:
+    async def main() -> None:
+        bulkhead = Bulkhead("test", limit=1, queue_timeout=0.1)
+        release = anyio.Event()
+        async with anyio.create_task_group() as tg:
+            tg.start_soon(hold, bulkhead, release)
+            await anyio.wait_all_tasks_blocked()
+            with pytest.raises(HTTPException) as exc_info:
+                await anext(bulkhead())
+            release.set()
+        assert exc_info.value.status_code == 503
+        assert exc_info.value.headers == {"Retry-After": "1"}
+        stats = bulkhead.stats()
+        assert (stats.in_use, stats.waiting, stats.rejected) == (0, 0, 1)
+
+    anyio.run(main)
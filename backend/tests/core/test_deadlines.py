@@ -0,0 +1,242 @@
+import asyncio
+import threading
+import time
+from typing import Any
+from unittest.mock import patch
+
+import pytest
+from fastapi.testclient import TestClient
+from psycopg import errors
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+from sqlmodel import Session
+from starlette.types import Message, Receive, Scope, Send
+
+from app.core.config import settings
+from app.core.db import engine
+from app.core.deadlines import (
+    Deadline,
+    DeadlineExceeded,
+    DeadlineMiddleware,
+    deadline_var,
+    session_deadline,
+)
+from app.main import app
+
+
+def run_with_deadline(deadline: Deadline, statement: str) -> None:
+    token = deadline_var.set(deadline)
+    try:
+        with Session(engine) as session, session_deadline(session):
+            session.exec(text(statement))  # type: ignore[call-overload]
+    finally:
+        deadline_var.reset(token)
+
+
+STATEMENT_TIMEOUT = "SELECT setting FROM pg_settings WHERE name = 'statement_timeout'"
+
+
+def test_session_deadline_sets_statement_timeout() -> None:
+    token = deadline_var.set(Deadline(5.0))
+    try:
+        with Session(engine) as session, session_deadline(session):
+            timeout = session.exec(text(STATEMENT_TIMEOUT)).one()[0]  # type: ignore[call-overload]
+            session.commit()
+            # Set again in the next transaction
+            next_timeout = session.exec(text(STATEMENT_TIMEOUT)).one()[0]  # type: ignore[call-overload]
+    finally:
+        deadline_var.reset(token)
+    # In milliseconds
+    assert 4000 < int(timeout) <= 5000
+    assert 0 < int(next_timeout) <= int(timeout)
+
+
+def test_connection_removed_after_commit() -> None:
+    deadline = Deadline(5.0)
+    token = deadline_var.set(deadline)
+    try:
+        with Session(engine) as session, session_deadline(session):
+            session.exec(text("SELECT 1"))  # type: ignore[call-overload]
+            assert len(deadline.connections) == 1
+            # Back in the pool, cancelling the deadline must not cancel it
+            session.commit()
+            assert not deadline.connections
+    finally:
+        deadline_var.reset(token)
+
+
+def test_statement_timeout_exceeded() -> None:
+    start = time.monotonic()
+    with pytest.raises(DeadlineExceeded) as exc_info:
+        run_with_deadline(Deadline(0.2), "SELECT pg_sleep(5)")
+    assert isinstance(exc_info.value.__cause__, OperationalError)
+    assert isinstance(exc_info.value.__cause__.orig, errors.QueryCanceled)
+    assert time.monotonic() - start < 2
+
+
+def test_expired_deadline() -> None:
+    with pytest.raises(DeadlineExceeded):
+        run_with_deadline(Deadline(0.0), "SELECT 1")
+
+
+def test_cancel_running_statement() -> None:
+    deadline = Deadline(30.0)
+    raised: list[BaseException] = []
+
+    def run() -> None:
+        try:
+            run_with_deadline(deadline, "SELECT pg_sleep(5)")
+        except DeadlineExceeded as e:
+            raised.append(e)
+
+    thread = threading.Thread(target=run)
+    start = time.monotonic()
+    thread.start()
+    while not deadline.connections:
+        time.sleep(0.01)
+    time.sleep(0.1)
+    deadline.cancel()
+    thread.join(timeout=5)
+    assert time.monotonic() - start < 2
+    assert isinstance(raised[0].__cause__.orig, errors.QueryCanceled)  # type: ignore[union-attr]
+    assert not deadline.connections
+
+
+def test_get_timeout() -> None:
+    middleware = DeadlineMiddleware(
+        app, default_timeout=30.0, timeouts={"/items": 10.0, "/items/slow": 20.0}
+    )
+
+    def get_timeout(path: str, header: str | None = None) -> float:
+        headers = [] if header is None else [(b"x-request-timeout", header.encode())]
+        return middleware.get_timeout(
+            {"type": "http", "path": path, "headers": headers}
+        )
+
+    assert get_timeout("/other") == 30.0
+    assert get_timeout("/items/1") == 10.0
+    assert get_timeout("/items/slow") == 20.0
+    # The header can lower the deadline, but not raise it
+    assert get_timeout("/items/1", "2.5") == 2.5
+    assert get_timeout("/items/1", "60") == 10.0
+    assert get_timeout("/items/1", "0") == 10.0
+    assert get_timeout("/items/1", "soon") == 10.0
+
+
+def test_disconnect_cancels_deadline() -> None:
+    deadlines: list[Deadline] = []
+
+    async def slow_app(scope: Scope, receive: Receive, send: Send) -> None:  # noqa: ARG001
+        deadline = deadline_var.get()
+        assert deadline is not None
+        deadlines.append(deadline)
+        while not deadline.cancelled:
+            await asyncio.sleep(0.01)
+
+    async def main() -> None:
+        disconnect = asyncio.Event()
+
+        async def receive() -> Message:
+            if not disconnect.is_set():
+                disconnect.set()
+                return {"type": "http.request", "body": b"", "more_body": False}
+            await asyncio.sleep(0.1)
+            return {"type": "http.disconnect"}
+
+        async def send(message: Message) -> None:  # noqa: ARG001
+            pass
+
+        middleware = DeadlineMiddleware(slow_app, default_timeout=30.0, timeouts={})
+        scope = {"type": "http", "path": "/", "headers": []}
+        await asyncio.wait_for(middleware(scope, receive, send), timeout=5)
+
+    asyncio.run(main())
+    assert deadlines[0].cancelled
+
+
+def test_disconnect_with_unread_body() -> None:
+    deadlines: list[Deadline] = []
+
+    async def slow_app(scope: Scope, receive: Receive, send: Send) -> None:  # noqa: ARG001
+        # Never reads the body
+        deadline = deadline_var.get()
+        assert deadline is not None
+        deadlines.append(deadline)
+        while not deadline.cancelled:
+            await asyncio.sleep(0.01)
+
+    async def main() -> None:
+        messages: list[Message] = [
+            {"type": "http.request", "body": b"chunk", "more_body": True},
+            {"type": "http.request", "body": b"chunk", "more_body": True},
+            {"type": "http.request", "body": b"chunk", "more_body": False},
+        ]
+
+        async def receive() -> Message:
+            if messages:
+                return messages.pop(0)
+            await asyncio.sleep(0.1)
+            return {"type": "http.disconnect"}
+
+        async def send(message: Message) -> None:  # noqa: ARG001
+            pass
+
+        middleware = DeadlineMiddleware(slow_app, default_timeout=30.0, timeouts={})
+        scope = {"type": "http", "path": "/", "headers": []}
+        await asyncio.wait_for(middleware(scope, receive, send), timeout=5)
+
+    asyncio.run(main())
+    assert deadlines[0].cancelled
+
+
+def test_request_deadline_exceeded(
+    client: TestClient, superuser_token_headers: dict[str, str]
+) -> None:
+    # Through the app's get_db, with committed data
+    with patch.dict(app.dependency_overrides, clear=True):
+        r = client.get(
+            f"{settings.API_V1_STR}/items/",
+            headers={**superuser_token_headers, "X-Request-Timeout": "0.000001"},
+        )
+    assert r.status_code == 504
+    assert r.json() == {"detail": "Request deadline exceeded"}
+
+
+def test_request_statement_cancelled(
+    client: TestClient, superuser_token_headers: dict[str, str]
+) -> None:
+    def slow_search(*, session: Session, **kwargs: Any) -> Any:  # noqa: ARG001
+        return session.exec(text("SELECT pg_sleep(5)")).all()  # type: ignore[call-overload]
+
+    start = time.monotonic()
+    with (
+        patch.dict(app.dependency_overrides, clear=True),
+        patch("app.crud.search_items", slow_search),
+    ):
+        r = client.get(
+            f"{settings.API_V1_STR}/items/search",
+            headers={**superuser_token_headers, "X-Request-Timeout": "0.5"},
+            params={"q": "anything"},
+        )
+    assert r.status_code == 504
+    assert time.monotonic() - start < 3
+
+
+def test_request_deadline_covers_sync_work(
+    client: TestClient, superuser_token_headers: dict[str, str]
+) -> None:
+    def slow_search(**kwargs: Any) -> Any:  # noqa: ARG001
+        # Like sending an email, without the database
+        time.sleep(2)
+        return []
+
+    start = time.monotonic()
+    with patch("app.crud.search_items", slow_search):
+        r = client.get(
+            f"{settings.API_V1_STR}/items/search",
+            headers={**superuser_token_headers, "X-Request-Timeout": "0.3"},
+            params={"q": "anything"},
+        )
+    assert r.status_code == 504
+    assert r.json() == {"detail": "Request deadline exceeded"}
+    assert time.monotonic() - start < 1.5
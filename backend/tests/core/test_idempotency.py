@@ -0,0 +1,264 @@
+import asyncio
+import threading
+import time
+import uuid
+from collections.abc import Generator
+from datetime import timedelta
+from typing import Any
+from unittest.mock import patch
+
+import anyio
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+from sqlmodel import Session, delete, func, select
+from starlette.responses import JSONResponse
+from starlette.types import Message, Receive, Scope, Send
+
+from app import crud
+from app.core import security
+from app.core.config import settings
+from app.core.db import engine
+from app.core.idempotency import IdempotencyMiddleware, delete_expired_keys
+from app.models import IdempotencyKey, Item, get_datetime_utc
+from tests.utils.utils import random_email, random_lower_string
+
+
+@pytest.fixture(autouse=True)
+def clear_keys() -> Generator[None]:
+    # Stored outside of the test transaction
+    yield
+    with Session(engine) as session:
+        session.execute(delete(IdempotencyKey))
+        session.commit()
+
+
+def test_replays_response(
+    client: TestClient, superuser_token_headers: dict[str, str], db: Session
+) -> None:
+    title = random_lower_string()
+    headers = {**superuser_token_headers, "Idempotency-Key": str(uuid.uuid4())}
+    r1 = client.post(
+        f"{settings.API_V1_STR}/items/", headers=headers, json={"title": title}
+    )
+    r2 = client.post(
+        f"{settings.API_V1_STR}/items/", headers=headers, json={"title": title}
+    )
+    assert r1.status_code == r2.status_code == 200
+    assert r2.json() == r1.json()
+    assert "Idempotent-Replayed" not in r1.headers
+    assert r2.headers["Idempotent-Replayed"] == "true"
+    count = db.exec(select(func.count()).where(Item.title == title)).one()
+    assert count == 1
+
+
+def test_replay_has_cors_headers(
+    client: TestClient, superuser_token_headers: dict[str, str]
+) -> None:
+    headers = {
+        **superuser_token_headers,
+        "Idempotency-Key": str(uuid.uuid4()),
+        "Origin": settings.FRONTEND_HOST,
+    }
+    data = {"title": random_lower_string()}
+    client.post(f"{settings.API_V1_STR}/items/", headers=headers, json=data)
+    r = client.post(f"{settings.API_V1_STR}/items/", headers=headers, json=data)
+    assert r.headers["Idempotent-Replayed"] == "true"
+    assert r.headers["Access-Control-Allow-Origin"] == settings.FRONTEND_HOST
+
+
+def test_key_reused_for_another_request(
+    client: TestClient, superuser_token_headers: dict[str, str]
+) -> None:
+    headers = {**superuser_token_headers, "Idempotency-Key": str(uuid.uuid4())}
+    r = client.post(
+        f"{settings.API_V1_STR}/items/", headers=headers, json={"title": "First"}
+    )
+    assert r.status_code == 200
+    r = client.post(
+        f"{settings.API_V1_STR}/items/", headers=headers, json={"title": "Second"}
+    )
+    assert r.status_code == 422
+
+
+def test_keys_of_other_clients_dont_clash(
+    client: TestClient,
+    superuser_token_headers: dict[str, str],
+    normal_user_token_headers: dict[str, str],
+) -> None:
+    key = {"Idempotency-Key": str(uuid.uuid4())}
+    data = {"title": random_lower_string()}
+    r1 = client.post(
+        f"{settings.API_V1_STR}/items/",
+        headers={**superuser_token_headers, **key},
+        json=data,
+    )
+    r2 = client.post(
+        f"{settings.API_V1_STR}/items/",
+        headers={**normal_user_token_headers, **key},
+        json=data,
+    )
+    assert r1.json()["owner_id"] != r2.json()["owner_id"]
+
+
+def test_keys_are_scoped_by_user(
+    client: TestClient, superuser_token_headers: dict[str, str], db: Session
+) -> None:
+    superuser = crud.get_user_by_email(session=db, email=settings.FIRST_SUPERUSER)
+    assert superuser
+    # A new token for the same user, after the first one expired
+    token = security.create_access_token(superuser.id, timedelta(minutes=5))
+    key = {"Idempotency-Key": str(uuid.uuid4())}
+    data = {"title": random_lower_string()}
+    r1 = client.post(
+        f"{settings.API_V1_STR}/items/",
+        headers={**superuser_token_headers, **key},
+        json=data,
+    )
+    r2 = client.post(
+        f"{settings.API_V1_STR}/items/",
+        headers={"Authorization": f"Bearer {token}", **key},
+        json=data,
+    )
+    assert r2.headers["Idempotent-Replayed"] == "true"
+    assert r2.json() == r1.json()
+
+
+def test_concurrent_signups_run_once(client: TestClient) -> None:
+    calls = 0
+    create_user = crud.create_user
+
+    def slow_create_user(**kwargs: Any) -> Any:
+        nonlocal calls
+        calls += 1
+        time.sleep(0.3)
+        return create_user(**kwargs)
+
+    data = {"email": random_email(), "password": random_lower_string()}
+    headers = {"Idempotency-Key": str(uuid.uuid4())}
+    responses: list[httpx.Response] = []
+
+    def signup() -> None:
+        responses.append(
+            client.post(
+                f"{settings.API_V1_STR}/users/signup", headers=headers, json=data
+            )
+        )
+
+    with patch("app.crud.create_user", slow_create_user):
+        threads = [threading.Thread(target=signup) for _ in range(2)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(timeout=10)
+    assert calls == 1
+    assert [r.status_code for r in responses] == [200, 200]
+    assert responses[0].json() == responses[1].json()
+
+
+def test_server_errors_arent_stored() -> None:
+    status_codes = [500, 201]
+
+    async def app(scope: Scope, receive: Receive, send: Send) -> None:
+        await receive()
+        await JSONResponse({}, status_code=status_codes.pop(0))(scope, receive, send)
+
+    async def main() -> list[int]:
+        middleware = IdempotencyMiddleware(
+            app, paths=["/items"], ttl=timedelta(hours=1), db_engine=engine
+        )
+        transport = httpx.ASGITransport(app=middleware)
+        headers = {"Idempotency-Key": str(uuid.uuid4())}
+        async with httpx.AsyncClient(transport=transport, base_url="http://t") as c:
+            return [
+                (await c.post("/items", headers=headers)).status_code for _ in range(3)
+            ]
+
+    assert asyncio.run(main()) == [500, 201, 201]
+
+
+def test_duplicate_of_request_in_progress() -> None:
+    started = asyncio.Event()
+    finish = asyncio.Event()
+    checked_out: list[int] = []
+
+    async def app(scope: Scope, receive: Receive, send: Send) -> None:
+        await receive()
+        checked_out.append(engine.pool.checkedout())  # type: ignore[attr-defined]
+        started.set()
+        await finish.wait()
+        await JSONResponse({}, status_code=201)(scope, receive, send)
+
+    async def main() -> list[int]:
+        middleware = IdempotencyMiddleware(
+            app, paths=["/items"], ttl=timedelta(hours=1), db_engine=engine
+        )
+        transport = httpx.ASGITransport(app=middleware)
+        headers = {"Idempotency-Key": str(uuid.uuid4())}
+        async with httpx.AsyncClient(transport=transport, base_url="http://t") as c:
+            first = asyncio.create_task(c.post("/items", headers=headers))
+            await started.wait()
+            # Without a deadline to wait until, it's rejected right away
+            duplicate = await c.post("/items", headers=headers)
+            assert duplicate.headers["Retry-After"] == "1"
+            finish.set()
+            return [duplicate.status_code, (await first).status_code]
+
+    # Connections held by the test fixtures
+    idle = engine.pool.checkedout()  # type: ignore[attr-defined]
+    assert asyncio.run(main()) == [409, 201]
+    # No connection is held while the request runs
+    assert checked_out == [idle]
+
+
+def test_key_released_when_cancelled() -> None:
+    started = anyio.Event()
+
+    async def app(scope: Scope, receive: Receive, send: Send) -> None:  # noqa: ARG001
+        started.set()
+        await anyio.sleep_forever()
+
+    async def receive() -> Message:
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message: Message) -> None:  # noqa: ARG001
+        pass
+
+    async def main() -> None:
+        middleware = IdempotencyMiddleware(
+            app, paths=["/items"], ttl=timedelta(hours=1), db_engine=engine
+        )
+        scope = {
+            "type": "http",
+            "method": "POST",
+            "path": "/items",
+            "headers": [(b"idempotency-key", b"cancelled")],
+        }
+        async with anyio.create_task_group() as tg:
+            tg.start_soon(middleware, scope, receive, send)
+            await started.wait()
+            # Like a client disconnect cancelling the request
+            tg.cancel_scope.cancel()
+
+    anyio.run(main)
+    with Session(engine) as session:
+        keys = session.exec(select(IdempotencyKey.key)).all()
+    assert keys == []
+
+
+def test_delete_expired_keys() -> None:
+    with Session(engine) as session:
+        for key, expires_in in (("expired", -1), ("valid", 1)):
+            session.add(
+                IdempotencyKey(
+                    client="test",
+                    path="/items",
+                    key=key,
+                    request_hash="hash",
+                    expires_at=get_datetime_utc() + timedelta(hours=expires_in),
+                )
+            )
+        session.commit()
+        assert delete_expired_keys(engine) == 1
+        keys = session.exec(select(IdempotencyKey.key)).all()
+    assert keys == ["valid"]
@@ -0,0 +1,140 @@
+import asyncio
+from typing import Any
+
+import httpx
+from starlette.responses import PlainTextResponse
+from starlette.types import Receive, Scope, Send
+
+from app.core.load_shedding import LoadSheddingMiddleware, Priority
+
+
+class SlowApp:
+    def __init__(self) -> None:
+        self.release = asyncio.Event()
+        self.started: list[str] = []
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        self.started.append(scope["path"])
+        if scope["path"] != "/health":
+            await self.release.wait()
+        await PlainTextResponse("OK")(scope, receive, send)
+
+
+def create_middleware(**kwargs: Any) -> tuple[LoadSheddingMiddleware, SlowApp]:
+    app = SlowApp()
+    options = {
+        "max_in_flight": 1,
+        "queue_size": 2,
+        "max_queue_delay": 5.0,
+        "target_queue_delay": 0.1,
+        "priorities": {
+            "/health": Priority.CRITICAL,
+            "/token": Priority.HIGH,
+            "/items": Priority.LOW,
+        },
+    }
+    middleware = LoadSheddingMiddleware(app, **{**options, **kwargs})
+    return middleware, app
+
+
+async def wait_for_queue(middleware: LoadSheddingMiddleware, size: int) -> None:
+    while len(middleware.queue) < size:
+        await asyncio.sleep(0)
+
+
+def test_serves_queue_by_priority() -> None:
+    async def main() -> None:
+        middleware, app = create_middleware()
+        transport = httpx.ASGITransport(app=middleware)
+        async with httpx.AsyncClient(transport=transport, base_url="http://t") as c:
+            running = asyncio.create_task(c.get("/other"))
+            while not app.started:
+                await asyncio.sleep(0)
+            low = asyncio.create_task(c.get("/items"))
+            await wait_for_queue(middleware, 1)
+            high = asyncio.create_task(c.get("/token"))
+            await wait_for_queue(middleware, 2)
+            # Critical requests skip the queue
+            r = await c.get("/health")
+            assert r.status_code == 200
+            app.release.set()
+            responses = await asyncio.gather(running, low, high)
+        assert [r.status_code for r in responses] == [200, 200, 200]
+        assert app.started == ["/other", "/health", "/token", "/items"]
+        assert middleware.in_flight == 0
+
+    asyncio.run(main())
+
+
+def test_rejects_when_queue_is_full() -> None:
+    async def main() -> None:
+        middleware, app = create_middleware(queue_size=1)
+        transport = httpx.ASGITransport(app=middleware)
+        async with httpx.AsyncClient(transport=transport, base_url="http://t") as c:
+            running = asyncio.create_task(c.get("/other"))
+            while not app.started:
+                await asyncio.sleep(0)
+            low = asyncio.create_task(c.get("/items"))
+            await wait_for_queue(middleware, 1)
+            # A higher priority request takes the place of the low one
+            high = asyncio.create_task(c.get("/token"))
+            r = await low
+            assert r.status_code == 503
+            assert r.headers["retry-after"] == "1"
+            # But not of one of the same priority
+            r = await c.get("/token")
+            assert r.status_code == 503
+            app.release.set()
+            assert (await running).status_code == 200
+            assert (await high).status_code == 200
+        assert middleware.shed == {Priority.LOW: 1, Priority.HIGH: 1}
+        assert middleware.in_flight == 0
+
+    asyncio.run(main())
+
+
+def test_rejects_after_max_queue_delay() -> None:
+    async def main() -> None:
+        middleware, app = create_middleware(max_queue_delay=0.05)
+        transport = httpx.ASGITransport(app=middleware)
+        async with httpx.AsyncClient(transport=transport, base_url="http://t") as c:
+            running = asyncio.create_task(c.get("/other"))
+            while not app.started:
+                await asyncio.sleep(0)
+            r = await c.get("/token")
+            assert r.status_code == 503
+            assert middleware.queue == []
+            app.release.set()
+            assert (await running).status_code == 200
+        assert middleware.in_flight == 0
+
+    asyncio.run(main())
+
+
+def test_rejects_low_priority_over_target_delay() -> None:
+    async def main() -> None:
+        middleware, app = create_middleware(target_queue_delay=0.01)
+        transport = httpx.ASGITransport(app=middleware)
+        async with httpx.AsyncClient(transport=transport, base_url="http://t") as c:
+            running = asyncio.create_task(c.get("/other"))
+            while not app.started:
+                await asyncio.sleep(0)
+            queued = asyncio.create_task(c.get("/token"))
+            await wait_for_queue(middleware, 1)
+            await asyncio.sleep(0.05)
+            app.release.set()
+            assert (await running).status_code == 200
+            assert (await queued).status_code == 200
+            assert middleware.recent_queue_delay() > 0.01
+
+            app.release.clear()
+            running = asyncio.create_task(c.get("/other"))
+            while len(app.started) < 3:
+                await asyncio.sleep(0)
+            # Rejected right away instead of queueing
+            r = await c.get("/items")
+            assert r.status_code == 503
+            app.release.set()
+            await running
+
+    asyncio.run(main())
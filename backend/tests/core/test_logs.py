@@ -0,0 +1,76 @@
+import json
+import logging
+import queue
+
+from fastapi.testclient import TestClient
+
+from app.core.config import settings
+from app.core.logs import (
+    REQUEST_ID_HEADER,
+    ContextFilter,
+    DroppingQueueHandler,
+    JsonFormatter,
+    request_id_var,
+)
+
+
+def make_record(msg: str, *args: object, **extra: object) -> logging.LogRecord:
+    record = logging.makeLogRecord(
+        {"name": "test", "levelno": logging.INFO, "levelname": "INFO"}
+    )
+    record.msg = msg
+    record.args = args
+    record.__dict__.update(extra)
+    return record
+
+
+def test_json_formatter() -> None:
+    record = make_record("Hello %s", "world", user_id=42)
+    token = request_id_var.set("abc")
+    try:
+        ContextFilter().filter(record)
+    finally:
+        request_id_var.reset(token)
+
+    data = json.loads(JsonFormatter().format(record))
+    assert data["level"] == "INFO"
+    assert data["logger"] == "test"
+    assert data["message"] == "Hello world"
+    assert data["request_id"] == "abc"
+    assert data["trace_id"] is None
+    assert data["user_id"] == 42
+    assert "timestamp" in data
+
+
+def test_queue_handler_drops_when_full() -> None:
+    log_queue: queue.Queue[logging.LogRecord] = queue.Queue(1)
+    handler = DroppingQueueHandler(log_queue)
+
+    handler.handle(make_record("Hello %s", "world"))
+    handler.handle(make_record("dropped"))
+    handler.handle(make_record("dropped"))
+    assert handler.dropped == 2
+
+    record = log_queue.get_nowait()
+    assert record.msg == "Hello world"
+    assert record.args is None
+
+    handler.handle(make_record("after"))
+    assert log_queue.get_nowait().getMessage() == (
+        "Dropped 2 log records, the queue was full"
+    )
+    # The queue only fits the warning, so the new record is dropped
+    assert handler.dropped == 1
+
+
+def test_request_id_is_echoed(client: TestClient) -> None:
+    r = client.get(
+        f"{settings.API_V1_STR}/utils/health-check/",
+        headers={REQUEST_ID_HEADER: "my-request-id"},
+    )
+    assert r.headers[REQUEST_ID_HEADER] == "my-request-id"
+
+
+def test_request_id_is_generated(client: TestClient) -> None:
+    r = client.get(f"{settings.API_V1_STR}/utils/health-check/")
+    assert len(r.headers[REQUEST_ID_HEADER]) == 32
@@ -0,0 +1,48 @@
+import json
+from pathlib import Path
+
+import pytest
+from fastapi.routing import APIRoute
+from fastapi.testclient import TestClient
+
+from app.core.config import settings
+from app.core.openapi import OpenAPIMiddleware
+from app.generate_openapi import write_openapi
+from app.main import OPENAPI_FILE, app
+
+OPENAPI_URL = f"{settings.API_V1_STR}/openapi.json"
+
+
+def test_generated_schema_matches_routes(tmp_path: Path) -> None:
+    schema_file = tmp_path / "openapi.json"
+    write_openapi(schema_file)
+    schema = json.loads(schema_file.read_bytes())
+    assert schema == app.openapi()
+    for route in app.routes:
+        if isinstance(route, APIRoute) and route.include_in_schema:
+            assert route.path_format in schema["paths"]
+
+
+def test_serves_schema_file(tmp_path: Path) -> None:
+    schema_file = tmp_path / "openapi.json"
+    write_openapi(schema_file)
+    with TestClient(
+        OpenAPIMiddleware(app, openapi_url=OPENAPI_URL, schema_file=schema_file)
+    ) as client:
+        r = client.get(OPENAPI_URL)
+        assert r.status_code == 200
+        assert r.content == schema_file.read_bytes()
+        assert r.headers["cache-control"] == "no-cache"
+        etag = r.headers["etag"]
+
+        r = client.get(OPENAPI_URL, headers={"If-None-Match": etag})
+        assert r.status_code == 304
+        assert r.content == b""
+
+        r = client.get(f"{settings.API_V1_STR}/utils/health-check/")
+        assert r.status_code == 200
+
+
+@pytest.mark.skipif(not OPENAPI_FILE.exists(), reason="Only built with the image")
+def test_built_schema_file_is_current() -> None:
+    assert json.loads(OPENAPI_FILE.read_bytes()) == app.openapi()
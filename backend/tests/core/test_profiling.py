@@ -0,0 +1,111 @@
+import json
+import time
+from pathlib import Path
+from unittest.mock import patch
+
+import anyio
+from anyio import to_thread
+from fastapi.testclient import TestClient
+
+from app.core.config import settings
+from app.core.profiling import PROFILE_HEADER, SamplingProfiler
+
+
+def busy_wait(seconds: float) -> None:
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+
+def test_sampling_profiler_records_app_code() -> None:
+    profiler = SamplingProfiler()
+    profiler.start()
+    busy_wait(0.05)
+    profiler.stop()
+    profile = profiler.to_speedscope("busy wait")
+    frame_names = [frame["name"] for frame in profile["shared"]["frames"]]
+    assert "busy_wait" in frame_names
+    (thread_profile,) = profile["profiles"]
+    assert thread_profile["type"] == "sampled"
+    assert len(thread_profile["samples"]) == len(thread_profile["weights"]) > 0
+
+
+def busy_wait_elsewhere(seconds: float) -> None:
+    busy_wait(seconds)
+
+
+def test_sampling_profiler_skips_other_requests() -> None:
+    async def profile_request() -> SamplingProfiler:
+        async with anyio.create_task_group() as tg:
+            tg.start_soon(to_thread.run_sync, busy_wait_elsewhere, 0.2)
+            profiler = SamplingProfiler()
+            profiler.start()
+            await to_thread.run_sync(busy_wait, 0.1)
+            profiler.stop()
+        return profiler
+
+    profile = anyio.run(profile_request).to_speedscope("busy wait")
+    frame_names = [frame["name"] for frame in profile["shared"]["frames"]]
+    assert "busy_wait" in frame_names
+    assert "busy_wait_elsewhere" not in frame_names
+
+
+def test_profile_on_demand_superuser(
+    client: TestClient, superuser_token_headers: dict[str, str]
+) -> None:
+    r = client.get(
+        f"{settings.API_V1_STR}/users/me",
+        headers={**superuser_token_headers, PROFILE_HEADER: "1"},
+    )
+    assert r.status_code == 200
+    assert r.headers["X-Profile-Status"] == "200"
+    profile = r.json()
+    assert "email" not in profile
+    assert profile["name"] == f"GET {settings.API_V1_STR}/users/me"
+    assert profile["profiles"]
+
+
+def test_profile_on_demand_normal_user(
+    client: TestClient, normal_user_token_headers: dict[str, str]
+) -> None:
+    r = client.get(
+        f"{settings.API_V1_STR}/users/me",
+        headers=normal_user_token_headers,
+        params={"profile": "1"},
+    )
+    assert r.status_code == 200
+    assert "X-Profile-Status" not in r.headers
+    assert r.json()["email"] == settings.EMAIL_TEST_USER
+
+
+def test_profile_on_demand_invalid_token(client: TestClient) -> None:
+    with patch("app.core.profiling._is_superuser") as is_superuser:
+        r = client.get(
+            f"{settings.API_V1_STR}/users/me",
+            headers={"Authorization": "Bearer invalid", PROFILE_HEADER: "1"},
+        )
+    assert r.status_code == 403
+    assert "X-Profile-Status" not in r.headers
+    is_superuser.assert_not_called()
+
+
+def test_profile_in_background(
+    client: TestClient, normal_user_token_headers: dict[str, str], tmp_path: Path
+) -> None:
+    with (
+        patch("app.core.config.settings.PROFILING_SAMPLE_RATE", 1),
+        patch(
+            "app.core.config.settings.PROFILING_ROUTES",
+            [f"{settings.API_V1_STR}/items"],
+        ),
+        patch("app.core.config.settings.PROFILING_DIR", tmp_path),
+    ):
+        r = client.get(
+            f"{settings.API_V1_STR}/items/", headers=normal_user_token_headers
+        )
+        assert r.status_code == 200
+        client.get(f"{settings.API_V1_STR}/users/me", headers=normal_user_token_headers)
+    (profile_path,) = tmp_path.iterdir()
+    assert profile_path.name.endswith("-GET-api-v1-items.speedscope.json")
+    profile = json.loads(profile_path.read_text())
+    assert profile["name"] == f"GET {settings.API_V1_STR}/items/"
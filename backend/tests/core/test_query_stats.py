@@ -0,0 +1,22 @@
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+
+from app.core import query_stats
+from app.core.db import engine
+from app.core.query_stats import QueryStats
+
+
+def test_failed_statement_leaves_no_start_time() -> None:
+    stats = QueryStats()
+    token = query_stats._current_stats.set(stats)
+    try:
+        with engine.connect() as conn:
+            with pytest.raises(DBAPIError):
+                conn.execute(text("SELECT 1 / 0"))
+            conn.rollback()
+            conn.execute(text("SELECT 1"))
+            assert not conn.info.get("query_start_time")
+    finally:
+        query_stats._current_stats.reset(token)
+    assert stats.count == 1
@@ -0,0 +1,63 @@
+from fastapi import APIRouter, FastAPI
+from fastapi.testclient import TestClient
+
+from app.core.query_stats import QueryStatsMiddleware
+from app.core.server_timing import ServerTimingMiddleware, ServerTimingRoute
+
+
+def create_app(*, with_middleware: bool) -> FastAPI:
+    router = APIRouter(route_class=ServerTimingRoute)
+
+    @router.get("/sync")
+    def sync_endpoint(q: int = 0) -> dict[str, int]:
+        """
+        Sync endpoint.
+        """
+        return {"q": q}
+
+    @router.get("/async")
+    async def async_endpoint() -> dict[str, str]:
+        return {"message": "ok"}
+
+    app = FastAPI()
+    app.include_router(router)
+    if with_middleware:
+        app.add_middleware(ServerTimingMiddleware)
+        app.add_middleware(QueryStatsMiddleware)
+    return app
+
+
+def get_metric_names(server_timing: str) -> list[str]:
+    return [metric.split(";")[0] for metric in server_timing.split(", ")]
+
+
+def test_server_timing_header() -> None:
+    client = TestClient(create_app(with_middleware=True))
+    for path in ["/sync", "/async"]:
+        r = client.get(path)
+        assert r.status_code == 200
+        assert get_metric_names(r.headers["Server-Timing"]) == [
+            "deps",
+            "handler",
+            "serialize",
+            "db",
+            "total",
+        ]
+
+
+def test_server_timing_route_keeps_endpoint_signature() -> None:
+    app = create_app(with_middleware=False)
+    client = TestClient(app)
+    r = client.get("/sync", params={"q": 3})
+    assert r.json() == {"q": 3}
+    assert "Server-Timing" not in r.headers
+    operation = app.openapi()["paths"]["/sync"]["get"]
+    assert operation["description"] == "Sync endpoint."
+    assert operation["parameters"][0]["name"] == "q"
+
+
+def test_server_timing_validation_error() -> None:
+    client = TestClient(create_app(with_middleware=True))
+    r = client.get("/sync", params={"q": "not a number"})
+    assert r.status_code == 422
+    assert get_metric_names(r.headers["Server-Timing"]) == ["db", "total"]
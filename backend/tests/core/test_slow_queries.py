@@ -0,0 +1,50 @@
+import time
+
+import pytest
+from sqlalchemy.exc import DBAPIError
+from sqlmodel import Session, text
+
+from app.core.db import engine
+from app.core.slow_queries import _capture_explain
+from app.models import SlowQuery, get_datetime_utc
+
+
+def explain(statement: str) -> SlowQuery:
+    slow_query = SlowQuery(
+        statement=statement, duration_ms=100, created_at=get_datetime_utc()
+    )
+    _capture_explain(engine, slow_query)
+    return slow_query
+
+
+def test_explain_analyze() -> None:
+    slow_query = explain("SELECT 1")
+    assert "Actual Total Time" in slow_query.plan[0]["Plan"]
+
+
+def test_explain_without_analyze_for_locks() -> None:
+    for statement in (
+        'SELECT id FROM "user" FOR UPDATE',
+        'SELECT id FROM "user" FOR NO KEY UPDATE SKIP LOCKED',
+        "SELECT pg_advisory_lock(42)",
+    ):
+        slow_query = explain(statement)
+        assert "Actual Total Time" not in slow_query.plan[0]["Plan"], statement
+
+
+def test_explain_gives_up_on_locks(db: Session) -> None:
+    # Held by the test transaction
+    db.execute(text("LOCK TABLE item IN ACCESS EXCLUSIVE MODE"))
+    start = time.monotonic()
+    slow_query = explain("SELECT count(*) FROM item")
+    assert slow_query.plan is None
+    # Before its statement_timeout of 1s
+    assert time.monotonic() - start < 0.5
+
+
+def test_failed_statement_leaves_no_start_time() -> None:
+    with engine.connect() as conn:
+        with pytest.raises(DBAPIError):
+            conn.execute(text("SELECT 1 / 0"))
+        conn.rollback()
+        assert not conn.info.get("slow_query_start_time")
@@ -0,0 +1,105 @@
+from pathlib import Path
+from unittest.mock import patch
+
+import sentry_sdk
+
+from app.core.security import get_password_hash
+from app.core.tracing import (
+    get_sample_rate,
+    sample_on_error,
+    trace_span,
+    traces_sampler,
+)
+from app.core.tracing_transports import FileTransport, InMemoryTransport
+
+
+def test_get_sample_rate() -> None:
+    with (
+        patch("app.core.config.settings.TRACES_SAMPLE_RATE", 0.01),
+        patch(
+            "app.core.config.settings.TRACES_SAMPLE_RATES",
+            {"/api/v1/items": 0.5, "/api/v1/items/search": 1.0},
+        ),
+    ):
+        assert get_sample_rate("/api/v1/users/me") == 0.01
+        assert get_sample_rate("/api/v1/items/") == 0.5
+        assert get_sample_rate("/api/v1/items/search") == 1.0
+
+
+def test_traces_sampler_follows_parent() -> None:
+    with patch("app.core.config.settings.TRACES_SAMPLE_RATE", 0.0):
+        assert traces_sampler({"parent_sampled": True}) == 1.0
+        assert traces_sampler({"asgi_scope": {"path": "/"}}) == 0.0
+
+
+def create_client(transport: InMemoryTransport) -> sentry_sdk.Client:
+    return sentry_sdk.Client(
+        transport=transport,
+        traces_sample_rate=1.0,
+        default_integrations=False,
+        auto_enabling_integrations=False,
+    )
+
+
+def test_trace_span_in_sampled_transaction() -> None:
+    transport = InMemoryTransport()
+    with sentry_sdk.isolation_scope() as scope:
+        scope.set_client(create_client(transport))
+        with sentry_sdk.start_transaction(name="signup"):
+            get_password_hash("password")
+            with trace_span(op="custom", name="custom work"):
+                pass
+    (transaction,) = transport.events
+    assert transaction["transaction"] == "signup"
+    assert [span["op"] for span in transaction["spans"]] == [
+        "password.hash",
+        "custom",
+    ]
+
+
+def test_sample_on_error() -> None:
+    transport = InMemoryTransport()
+    client = sentry_sdk.Client(
+        transport=transport,
+        traces_sample_rate=0.0,
+        before_send=sample_on_error,
+        default_integrations=False,
+        auto_enabling_integrations=False,
+    )
+    with sentry_sdk.isolation_scope() as scope:
+        scope.set_client(client)
+        with sentry_sdk.start_transaction(name="dropped"):
+            pass
+        with sentry_sdk.start_transaction(name="failed"):
+            try:
+                raise ValueError("Failed")
+            except ValueError as e:
+                sentry_sdk.capture_exception(e)
+            with trace_span(op="custom", name="after the error"):
+                pass
+    error, transaction = transport.events
+    assert error["exception"]["values"][0]["value"] == "Failed"
+    assert transaction["transaction"] == "failed"
+    assert (
+        transaction["contexts"]["trace"]["trace_id"]
+        == (error["contexts"]["trace"]["trace_id"])
+    )
+    assert [span["op"] for span in transaction["spans"]] == ["custom"]
+
+
+def test_trace_span_without_transaction() -> None:
+    with trace_span(op="custom", name="custom work"):
+        pass
+
+
+def test_file_transport(tmp_path: Path) -> None:
+    path = tmp_path / "traces.jsonl"
+    transport = FileTransport(path)
+    with sentry_sdk.isolation_scope() as scope:
+        scope.set_client(create_client(transport))
+        for name in ["first", "second"]:
+            with sentry_sdk.start_transaction(name=name):
+                pass
+    lines = path.read_text().splitlines()
+    assert len(lines) == 2
+    assert '"transaction": "second"' in lines[1]
@@ -0,0 +1,50 @@
+import asyncio
+from unittest.mock import MagicMock, patch
+
+from sqlalchemy.pool import QueuePool
+
+from app.core import warmup
+from app.core.config import settings
+from app.core.db import engine
+from app.utils import get_email_template
+
+
+def test_warm_up() -> None:
+    openapi = MagicMock()
+    get_email_template.cache_clear()
+    with patch("app.core.warmup._warmed_up", False):
+        warmup.warm_up(openapi)
+        assert warmup.is_warmed_up()
+    openapi.assert_called_once_with()
+    assert isinstance(engine.pool, QueuePool)
+    assert engine.pool.checkedin() >= settings.DATABASE_POOL_SIZE
+    assert get_email_template.cache_info().currsize == 3
+
+
+def test_warm_up_database_error() -> None:
+    with (
+        patch("app.core.warmup._warmed_up", False),
+        patch(
+            "app.core.warmup._open_pool_connections",
+            side_effect=ConnectionError("Database down"),
+        ),
+        patch.object(warmup.logger, "exception") as log_exception,
+    ):
+        warmup.warm_up()
+        assert not warmup.is_warmed_up()
+    log_exception.assert_called_once()
+
+
+def test_retry_warm_up() -> None:
+    # The database is down for the first attempt
+    open_pool_connections = MagicMock(side_effect=[ConnectionError("Down"), None])
+    with (
+        patch("app.core.warmup._warmed_up", False),
+        patch("app.core.warmup._open_pool_connections", open_pool_connections),
+        patch.object(warmup.logger, "exception"),
+    ):
+        warmup.warm_up()
+        assert not warmup.is_warmed_up()
+        asyncio.run(asyncio.wait_for(warmup.retry_warm_up(interval=0.01), 5))
+        assert warmup.is_warmed_up()
+    assert open_pool_connections.call_count == 2
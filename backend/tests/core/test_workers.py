@@ -0,0 +1,50 @@
+import os
+from collections.abc import Generator
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+
+from app.core.workers import get_cpu_limit, get_rss_bytes, get_worker_count
+
+
+@pytest.fixture(autouse=True)
+def cpu_count() -> Generator[None]:
+    with patch("app.core.workers.os.process_cpu_count", return_value=8):
+        yield
+
+
+def test_cpu_limit_cgroup_v2(tmp_path: Path) -> None:
+    (tmp_path / "cpu.max").write_text("150000 100000\n")
+    assert get_cpu_limit(tmp_path) == 1.5
+    assert get_worker_count(tmp_path) == 2
+
+
+def test_cpu_limit_cgroup_v2_without_quota(tmp_path: Path) -> None:
+    (tmp_path / "cpu.max").write_text("max 100000\n")
+    assert get_cpu_limit(tmp_path) == 8
+
+
+def test_cpu_limit_cgroup_v1(tmp_path: Path) -> None:
+    (tmp_path / "cpu").mkdir()
+    (tmp_path / "cpu" / "cpu.cfs_quota_us").write_text("200000\n")
+    (tmp_path / "cpu" / "cpu.cfs_period_us").write_text("100000\n")
+    assert get_cpu_limit(tmp_path) == 2
+
+
+def test_cpu_limit_without_cgroup(tmp_path: Path) -> None:
+    assert get_cpu_limit(tmp_path) == 8
+
+
+def test_worker_count_from_settings(tmp_path: Path) -> None:
+    (tmp_path / "cpu.max").write_text("50000 100000\n")
+    assert get_worker_count(tmp_path) == 1
+    with patch("app.core.config.settings.WEB_CONCURRENCY", 3):
+        assert get_worker_count(tmp_path) == 3
+
+
+def test_rss_bytes() -> None:
+    before = get_rss_bytes()
+    data = os.urandom(64 * 2**20)
+    assert get_rss_bytes() > before + 32 * 2**20
+    del data
@@ -0,0 +1,84 @@
+import threading
+from collections.abc import Generator
+
+import pytest
+from sqlmodel import Session, col, delete, func, select, update
+
+from app import crud
+from app.core.db import engine
+from app.models import Item, ItemCreate, User
+from tests.utils.user import create_random_user
+from tests.utils.utils import random_lower_string
+
+
+def get_item_count(session: Session, user: User) -> int:
+    return session.exec(select(User.item_count).where(User.id == user.id)).one()
+
+
+def test_item_count_follows_inserts_and_deletes(db: Session) -> None:
+    user = create_random_user(db)
+    other_user = create_random_user(db)
+    items = [
+        crud.create_item(
+            session=db,
+            item_in=ItemCreate(title=random_lower_string()),
+            owner_id=user.id,
+        )
+        for _ in range(3)
+    ]
+    assert get_item_count(db, user) == 3
+
+    db.delete(items[0])
+    db.commit()
+    assert get_item_count(db, user) == 2
+
+    db.exec(
+        update(Item).where(col(Item.id) == items[1].id).values(owner_id=other_user.id)
+    )
+    assert get_item_count(db, user) == 1
+    assert get_item_count(db, other_user) == 1
+
+    db.exec(delete(Item).where(col(Item.owner_id).in_([user.id, other_user.id])))
+    assert get_item_count(db, user) == 0
+    assert get_item_count(db, other_user) == 0
+
+
+@pytest.fixture
+def committed_user() -> Generator[User]:
+    # Committed, so concurrent sessions see it
+    with Session(engine) as session:
+        user = create_random_user(session)
+    yield user
+    with Session(engine) as session:
+        session.exec(delete(User).where(col(User.id) == user.id))
+        session.commit()
+
+
+def test_item_count_with_concurrent_writes(committed_user: User) -> None:
+    threads_count = 8
+    items_per_thread = 20
+
+    def write() -> None:
+        with Session(engine) as session:
+            for index in range(items_per_thread):
+                item = crud.create_item(
+                    session=session,
+                    item_in=ItemCreate(title=random_lower_string()),
+                    owner_id=committed_user.id,
+                )
+                if index % 2:
+                    session.delete(item)
+                    session.commit()
+
+    threads = [threading.Thread(target=write) for _ in range(threads_count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    with Session(engine) as session:
+        count = session.exec(
+            select(func.count()).where(Item.owner_id == committed_user.id)
+        ).one()
+        assert count == threads_count * items_per_thread // 2
+        assert get_item_count(session, committed_user) == count
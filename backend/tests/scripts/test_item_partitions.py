@@ -0,0 +1,256 @@
+from collections.abc import Generator
+from datetime import UTC, datetime, timedelta
+from typing import Any
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import event, text
+from sqlmodel import Session, col, delete, select
+
+from app import crud
+from app.core.config import settings
+from app.core.db import engine
+from app.item_partitions import (
+    add_months,
+    create_partitions,
+    detach_partitions,
+    get_partitions,
+    maintain_item_partitions,
+    month_start,
+)
+from app.models import Item, User, get_datetime_utc
+from tests.utils.user import authentication_token_from_email, create_random_user
+from tests.utils.utils import random_email
+
+# Far from the partitions of the other tests and of the seed data
+PAST_MONTH = datetime(2001, 1, 1, tzinfo=UTC)
+
+
+def test_add_months() -> None:
+    assert add_months(datetime(2026, 11, 1, tzinfo=UTC), 3) == datetime(
+        2027, 2, 1, tzinfo=UTC
+    )
+    assert add_months(datetime(2026, 1, 1, tzinfo=UTC), -1) == datetime(
+        2025, 12, 1, tzinfo=UTC
+    )
+
+
+def test_creates_partitions_ahead() -> None:
+    now = datetime(2040, 12, 15, tzinfo=UTC)
+    try:
+        maintain_item_partitions(engine, now=now)
+        with engine.connect() as conn:
+            partitions = get_partitions(conn)
+        expected = ["item_2040_12", *(f"item_2041_0{n}" for n in (1, 2, 3))]
+        assert set(expected) <= set(partitions)
+        # Already there the second time
+        maintain_item_partitions(engine, now=now)
+    finally:
+        with engine.begin() as conn:
+            for name in (
+                "item_2040_12",
+                "item_2041_01",
+                "item_2041_02",
+                "item_2041_03",
+            ):
+                conn.execute(text(f"DROP TABLE IF EXISTS {name}"))
+
+
+@pytest.fixture
+def archive_schema() -> Generator[str]:
+    yield "archive_test"
+    with engine.begin() as conn:
+        conn.execute(text("DROP SCHEMA IF EXISTS archive_test CASCADE"))
+        conn.execute(text(f"DROP TABLE IF EXISTS {PAST_MONTH:item_%Y_%m}"))
+
+
+def test_detach_old_partitions(archive_schema: str) -> None:
+    # Committed, detaching a partition can't be rolled back with the test
+    with Session(engine) as session:
+        create_partitions(session.connection(), PAST_MONTH, PAST_MONTH)
+        user = create_random_user(session)
+        user_id = user.id
+        session.add(Item(title="Old", owner_id=user_id, created_at=PAST_MONTH))
+        session.commit()
+    try:
+        with engine.begin() as conn:
+            detached = detach_partitions(
+                conn, add_months(PAST_MONTH, 1), archive_schema
+            )
+        assert detached == [f"{PAST_MONTH:item_%Y_%m}"]
+        with Session(engine) as session:
+            assert (
+                session.exec(select(User.item_count).where(User.id == user_id)).one()
+                == 0
+            )
+            archived = session.exec(
+                text(f"SELECT count(*) FROM {archive_schema}.{detached[0]}")  # type: ignore[call-overload]
+            ).one()[0]
+            assert archived == 1
+            assert f"{PAST_MONTH:item_%Y_%m}" not in get_partitions(
+                session.connection()
+            )
+    finally:
+        with Session(engine) as session:
+            session.exec(delete(User).where(col(User.id) == user_id))
+            session.commit()
+
+
+def test_read_items_stops_before_old_partitions(
+    client: TestClient, db: Session
+) -> None:
+    # Rolled back with the test transaction
+    current_month = month_start(get_datetime_utc())
+    create_partitions(db.connection(), PAST_MONTH, PAST_MONTH)
+    email = random_email()
+    headers = authentication_token_from_email(client=client, email=email, db=db)
+    user = crud.get_user_by_email(session=db, email=email)
+    assert user
+    for days in range(3):
+        db.add(
+            Item(
+                title="Recent",
+                owner_id=user.id,
+                created_at=get_datetime_utc() - timedelta(seconds=days),
+            )
+        )
+    db.add(Item(title="Old", owner_id=user.id, created_at=PAST_MONTH))
+    db.commit()
+
+    statements: list[tuple[str, Any]] = []
+
+    def capture(*args: Any) -> None:
+        statement, parameters = args[2], args[3]
+        if "FROM item" in statement and "ORDER BY" in statement:
+            statements.append((statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", capture)
+    try:
+        r = client.get(f"{settings.API_V1_STR}/items/?limit=2", headers=headers)
+    finally:
+        event.remove(engine, "before_cursor_execute", capture)
+    assert r.status_code == 200
+    assert [item["title"] for item in r.json()["data"]] == ["Recent", "Recent"]
+
+    # Plan it like with large partitions, where sorting them all would cost more
+    conn = db.connection()
+    conn.exec_driver_sql("SET LOCAL enable_sort = off")
+    conn.exec_driver_sql("SET LOCAL enable_seqscan = off")
+    statement, parameters = statements[0]
+    plan = "\n".join(
+        row[0]
+        for row in conn.exec_driver_sql(
+            f"EXPLAIN (ANALYZE, COSTS OFF, TIMING OFF) {statement}", parameters
+        )
+    )
+    # Not pruned, the ordered scan of the partitions stops once the page is
+    # filled from the current month
+    current_partition = f"{current_month:item_%Y_%m}"
+    old_partition = f"{PAST_MONTH:item_%Y_%m}"
+    current_line = next(line for line in plan.splitlines() if current_partition in line)
+    old_line = next(line for line in plan.splitlines() if old_partition in line)
+    assert "never executed" not in current_line
+    assert "never executed" in old_line
+
+
+def test_read_items_since_prunes_old_partitions(
+    client: TestClient, db: Session
+) -> None:
+    # Rolled back with the test transaction
+    since = month_start(get_datetime_utc())
+    create_partitions(db.connection(), PAST_MONTH, PAST_MONTH)
+    email = random_email()
+    headers = authentication_token_from_email(client=client, email=email, db=db)
+    user = crud.get_user_by_email(session=db, email=email)
+    assert user
+    db.add(Item(title="Recent", owner_id=user.id, created_at=get_datetime_utc()))
+    db.add(Item(title="Old", owner_id=user.id, created_at=PAST_MONTH))
+    db.commit()
+
+    statements: list[tuple[str, Any]] = []
+
+    def capture(*args: Any) -> None:
+        statement, parameters = args[2], args[3]
+        if "FROM item" in statement:
+            statements.append((statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", capture)
+    try:
+        r = client.get(
+            f"{settings.API_V1_STR}/items/",
+            headers=headers,
+            params={"since": since.isoformat()},
+        )
+    finally:
+        event.remove(engine, "before_cursor_execute", capture)
+    assert r.status_code == 200
+    assert [item["title"] for item in r.json()["data"]] == ["Recent"]
+    assert r.json()["count"] == 1
+
+    # Both the count and the page skip the partitions before since
+    assert len(statements) == 2
+    for statement, parameters in statements:
+        plan = "\n".join(
+            row[0]
+            for row in db.connection().exec_driver_sql(
+                f"EXPLAIN (COSTS OFF) {statement}", parameters
+            )
+        )
+        assert f"{since:item_%Y_%m}" in plan
+        assert f"{PAST_MONTH:item_%Y_%m}" not in plan
+
+
+def test_read_item_by_id_probes_each_partition(
+    client: TestClient, superuser_token_headers: dict[str, str], db: Session
+) -> None:
+    create_partitions(db.connection(), PAST_MONTH, PAST_MONTH)
+    user = create_random_user(db)
+    item = Item(title="Recent", owner_id=user.id)
+    db.add(item)
+    db.commit()
+    item_id = item.id
+
+    statements: list[tuple[str, Any]] = []
+
+    def capture(*args: Any) -> None:
+        statement, parameters = args[2], args[3]
+        if "FROM item" in statement and "item.id =" in statement:
+            statements.append((statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", capture)
+    try:
+        r = client.get(
+            f"{settings.API_V1_STR}/items/{item_id}", headers=superuser_token_headers
+        )
+    finally:
+        event.remove(engine, "before_cursor_execute", capture)
+    assert r.status_code == 200
+
+    # Plan it like with large partitions, where the primary key index is used
+    conn = db.connection()
+    conn.exec_driver_sql("SET LOCAL enable_seqscan = off")
+    ((statement, parameters),) = statements
+    plan = "\n".join(
+        row[0]
+        for row in conn.exec_driver_sql(f"EXPLAIN (COSTS OFF) {statement}", parameters)
+    )
+    # Lookups by id alone can't be pruned, they cost an index probe for each
+    # partition, so one per month kept
+    partitions = get_partitions(conn)
+    assert plan.count("Index Scan using") == len(partitions)
+    for name in partitions:
+        assert f"{name}_pkey on {name}" in plan
+
+
+def test_created_at_range_prunes_partitions(db: Session) -> None:
+    create_partitions(db.connection(), PAST_MONTH, PAST_MONTH)
+    since = month_start(get_datetime_utc())
+    plan = "\n".join(
+        row[0]
+        for row in db.connection().exec_driver_sql(
+            "EXPLAIN (COSTS OFF) SELECT * FROM item WHERE created_at >= %(since)s",
+            {"since": since},
+        )
+    )
+    assert f"{since:item_%Y_%m}" in plan
+    assert f"{PAST_MONTH:item_%Y_%m}" not in plan
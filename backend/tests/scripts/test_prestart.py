@@ -0,0 +1,73 @@
+import threading
+from typing import Any
+from unittest.mock import patch
+
+import pytest
+from sqlalchemy import Connection, text
+from sqlalchemy.exc import ProgrammingError
+from sqlmodel import Session, func, select
+
+from app.core.db import engine, init_db
+from app.models import User
+from app.prestart import PRESTART_LOCK_KEY, prestart
+
+
+def test_prestart_at_head() -> None:
+    with patch("app.prestart.run_migrations") as run_migrations:
+        prestart(engine)
+    run_migrations.assert_not_called()
+
+
+def test_prestart_migrates_behind_head() -> None:
+    with (
+        patch("app.prestart.get_alembic_head", return_value="new-revision"),
+        patch("app.prestart.run_migrations") as run_migrations,
+    ):
+        prestart(engine)
+    run_migrations.assert_called_once()
+
+
+def test_prestart_migration_error() -> None:
+    def failing_migration(conn: Connection) -> Any:
+        return conn.execute(text("SELECT * FROM missing_table"))
+
+    with (
+        patch("app.prestart.get_alembic_head", return_value="new-revision"),
+        patch("app.prestart.run_migrations", failing_migration),
+        pytest.raises(ProgrammingError, match="missing_table"),
+    ):
+        prestart(engine)
+    # The lock was released
+    with engine.connect() as conn:
+        locked = conn.execute(
+            text("SELECT pg_try_advisory_lock(:key)"), {"key": PRESTART_LOCK_KEY}
+        ).scalar()
+        conn.execute(
+            text("SELECT pg_advisory_unlock(:key)"), {"key": PRESTART_LOCK_KEY}
+        )
+    assert locked
+
+
+def test_prestart_waits_for_lock() -> None:
+    with engine.connect() as conn:
+        conn.execute(text("SELECT pg_advisory_lock(:key)"), {"key": PRESTART_LOCK_KEY})
+        thread = threading.Thread(target=prestart, args=(engine,))
+        thread.start()
+        thread.join(timeout=0.5)
+        assert thread.is_alive()
+        conn.execute(
+            text("SELECT pg_advisory_unlock(:key)"), {"key": PRESTART_LOCK_KEY}
+        )
+        thread.join(timeout=10)
+        assert not thread.is_alive()
+
+
+def test_init_db_is_idempotent(db: Session) -> None:
+    email = "prestart-superuser@example.com"
+    with patch("app.core.config.settings.FIRST_SUPERUSER", email):
+        init_db(db)
+        init_db(db)
+    count = db.exec(select(func.count()).where(User.email == email)).one()
+    assert count == 1
+    superuser = db.exec(select(User).where(User.email == email)).one()
+    assert superuser.is_superuser
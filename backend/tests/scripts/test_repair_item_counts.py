@@ -0,0 +1,30 @@
+from sqlmodel import Session, col, delete, select, update
+
+from app import crud
+from app.core.db import engine
+from app.models import ItemCreate, User
+from app.repair_item_counts import repair_item_counts
+from tests.utils.user import create_random_user
+
+
+def test_repair_item_counts() -> None:
+    # repair_item_counts() commits on its own connection
+    with Session(engine) as session:
+        user_id = create_random_user(session).id
+        crud.create_item(
+            session=session, item_in=ItemCreate(title="Foo"), owner_id=user_id
+        )
+        session.exec(update(User).where(col(User.id) == user_id).values(item_count=42))
+        session.commit()
+    try:
+        assert repair_item_counts(engine) >= 1
+        with Session(engine) as session:
+            item_count = session.exec(
+                select(User.item_count).where(User.id == user_id)
+            ).one()
+        assert item_count == 1
+        assert repair_item_counts(engine) == 0
+    finally:
+        with Session(engine) as session:
+            session.exec(delete(User).where(col(User.id) == user_id))
+            session.commit()
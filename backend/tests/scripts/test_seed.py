@@ -0,0 +1,38 @@
+from sqlmodel import Session, col, delete, func, select
+
+from app.core.db import engine
+from app.models import Item, User
+from app.seed import SEED_EMAIL_DOMAIN, seed
+
+seeded_users = col(User.email).endswith(f"@{SEED_EMAIL_DOMAIN}")
+
+
+def test_seed(db: Session) -> None:
+    seed(users=20, items=500, whales=2, whale_share=0.5, random_seed=1, reset=True)
+    user_ids = db.exec(select(User.id).where(seeded_users)).all()
+    counts = db.exec(
+        select(Item.owner_id, func.count())
+        .join(User)
+        .where(seeded_users)
+        .group_by(col(Item.owner_id))
+        .order_by(func.count().desc())
+    ).all()
+    assert len(user_ids) == 20
+    assert sum(count for _, count in counts) == 500
+    whale_items = counts[0][1] + counts[1][1]
+    assert whale_items >= 200
+    # UUIDv7 ids sort by creation time
+    items = db.exec(
+        select(Item.id, Item.created_at).join(User).where(seeded_users)
+    ).all()
+    assert all(item_id.version == 7 for item_id, _ in items)
+    assert sorted(items) == sorted(items, key=lambda item: item[1])
+
+    # Same seed, same data
+    seed(users=20, items=500, whales=2, whale_share=0.5, random_seed=1, reset=True)
+    assert set(db.exec(select(User.id).where(seeded_users)).all()) == set(user_ids)
+
+    # seed() commits on its own connection, outside of the test transaction
+    with Session(engine) as session:
+        session.exec(delete(User).where(seeded_users))
+        session.commit()
@@ -0,0 +1,105 @@
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import time
+from collections.abc import Callable
+from pathlib import Path
+from unittest.mock import patch
+
+import httpx
+import uvicorn
+
+from app.core.config import settings
+from app.models import WorkerMetrics
+from app.server import EXIT_MAX_RSS, RecyclingServer
+
+BACKEND_DIR = Path(__file__).parents[2]
+
+
+def get_free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def test_recycles_worker_over_max_rss() -> None:
+    server = RecyclingServer(uvicorn.Config("app.main:app"))
+    with (
+        patch("app.core.config.settings.WORKER_MAX_RSS_MB", 100),
+        patch("app.core.config.settings.WORKER_MAX_RSS_JITTER", 0.1),
+    ):
+        assert 90 * 2**20 <= server.max_rss_bytes <= 100 * 2**20  # type: ignore
+    with patch("app.server.get_rss_bytes", return_value=50 * 2**20):
+        assert not asyncio.run(server.on_tick(10))
+    with patch("app.server.get_rss_bytes", return_value=200 * 2**20):
+        # Only checked once a second
+        assert not asyncio.run(server.on_tick(11))
+        assert asyncio.run(server.on_tick(20))
+    assert server.exit_code == EXIT_MAX_RSS
+
+
+def test_supervisor_replaces_worker_after_max_requests(tmp_path: Path) -> None:
+    metrics_file = tmp_path / "workers.json"
+    base_url = f"http://127.0.0.1:{get_free_port()}"
+    live_url = f"{base_url}{settings.API_V1_STR}/health/live"
+    server = subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "app.server",
+            "--host",
+            "127.0.0.1",
+            "--port",
+            base_url.rsplit(":", 1)[1],
+        ],
+        cwd=BACKEND_DIR,
+        env={
+            **os.environ,
+            "WEB_CONCURRENCY": "1",
+            "WORKER_MAX_REQUESTS": "3",
+            "WORKER_MAX_REQUESTS_JITTER": "0",
+            "WORKER_METRICS_FILE": str(metrics_file),
+            "LOG_LEVEL": "WARNING",
+        },
+        stdout=subprocess.DEVNULL,
+    )
+
+    def read_metrics() -> WorkerMetrics | None:
+        if not metrics_file.exists():
+            return None
+        return WorkerMetrics.model_validate_json(metrics_file.read_bytes())
+
+    def is_serving() -> bool:
+        try:
+            return httpx.get(live_url).is_success
+        except httpx.TransportError:
+            # Connections can be reset while a worker shuts down
+            return False
+
+    def wait_for(condition: Callable[[WorkerMetrics], bool]) -> WorkerMetrics:
+        deadline = time.monotonic() + 60
+        while time.monotonic() < deadline:
+            assert server.poll() is None
+            metrics = read_metrics()
+            if metrics and is_serving() and condition(metrics):
+                return metrics
+            time.sleep(0.2)
+        raise AssertionError("The server didn't reach the expected state in time")
+
+    try:
+        metrics = wait_for(lambda metrics: metrics.started == 1)
+        assert metrics.workers == 1
+        first_pid = metrics.pids[0]
+        # The requests waiting for the worker count too, these are the rest
+        for _ in range(3):
+            is_serving()
+        metrics = wait_for(lambda metrics: metrics.exits.get("max_requests", 0) >= 1)
+        assert metrics.started >= 2
+        assert metrics.workers == 1
+        assert first_pid not in metrics.pids
+    finally:
+        server.terminate()
+        server.wait(timeout=60)
+    assert server.returncode == 0
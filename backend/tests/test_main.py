@@ -0,0 +1,45 @@
+import os
+import subprocess
+import sys
+
+from benchmarks.import_time import (
+    BACKEND_DIR,
+    format_report,
+    measure_import_time,
+    total_import_time,
+)
+
+# Generous, to allow for slow CI machines, it catches large regressions
+IMPORT_TIME_BUDGET_MS = 2500
+
+# Only imported on first use
+LAZY_MODULES = ["sentry_sdk", "emails", "jinja2", "pwdlib", "argon2", "bcrypt"]
+
+
+def test_lazy_modules_are_not_imported_at_startup() -> None:
+    env = {
+        key: value
+        for key, value in os.environ.items()
+        if key not in {"SENTRY_DSN", "TRACES_FILE"}
+    }
+    output = subprocess.run(
+        [
+            sys.executable,
+            "-c",
+            "import sys, app.main; "
+            f"sys.stdout.write(' '.join(m for m in {LAZY_MODULES!r} if m in sys.modules))",
+        ],
+        cwd=BACKEND_DIR,
+        env=env,
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout
+    assert output == ""
+
+
+def test_import_time_budget() -> None:
+    times = measure_import_time("app.main")
+    assert total_import_time(times) / 1000 <= IMPORT_TIME_BUDGET_MS, format_report(
+        times, top=20
+    )
@@ -0,0 +1,88 @@
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+from alembic.script import ScriptDirectory
+from sqlalchemy import URL, Connection, create_engine, text
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.pool import NullPool
+
+BACKEND_DIR = Path(__file__).parents[2]
+
+# Serializes building the template and cloning it across workers
+LOCK_KEY = 7_352_101
+
+
+def _quote(conn: Connection, name: str) -> str:
+    return conn.dialect.identifier_preparer.quote(name)
+
+
+def _template_revision(url: URL) -> str | None:
+    engine = create_engine(url, poolclass=NullPool)
+    try:
+        with engine.connect() as conn:
+            return conn.execute(
+                text("SELECT version_num FROM alembic_version")
+            ).scalar_one_or_none()
+    except OperationalError:
+        return None
+    finally:
+        engine.dispose()
+
+
+def _build_template(conn: Connection, url: URL) -> None:
+    assert url.database
+    conn.execute(text(f"DROP DATABASE IF EXISTS {_quote(conn, url.database)}"))
+    conn.execute(text(f"CREATE DATABASE {_quote(conn, url.database)}"))
+    subprocess.run(
+        [sys.executable, "-m", "alembic", "upgrade", "head"],
+        cwd=BACKEND_DIR,
+        env={
+            **os.environ,
+            "DATABASE_URL": url.render_as_string(hide_password=False),
+        },
+        check=True,
+        capture_output=True,
+    )
+
+
+def create_worker_database(url: URL, worker_id: str) -> str:
+    """
+    Create a database for a test worker, cloned from a migrated template.
+
+    The template is migrated once, and again only when a new Alembic
+    revision is added, so each worker gets a fresh database in about the
+    time of a file copy.
+    """
+    template_url = url.set(database=f"{url.database}_test_template")
+    database = f"{url.database}_test_{worker_id}"
+    head = ScriptDirectory(str(BACKEND_DIR / "app" / "alembic")).get_current_head()
+    maintenance_engine = create_engine(
+        url.set(database="postgres"), isolation_level="AUTOCOMMIT", poolclass=NullPool
+    )
+    with maintenance_engine.connect() as conn:
+        conn.execute(text("SELECT pg_advisory_lock(:key)"), {"key": LOCK_KEY})
+        try:
+            if _template_revision(template_url) != head:
+                _build_template(conn, template_url)
+            conn.execute(text(f"DROP DATABASE IF EXISTS {_quote(conn, database)}"))
+            conn.execute(
+                text(
+                    f"CREATE DATABASE {_quote(conn, database)} "
+                    f"TEMPLATE {_quote(conn, str(template_url.database))}"
+                )
+            )
+        finally:
+            conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": LOCK_KEY})
+    maintenance_engine.dispose()
+    return database
+
+
+def drop_database(url: URL, database: str) -> None:
+    maintenance_engine = create_engine(
+        url.set(database="postgres"), isolation_level="AUTOCOMMIT", poolclass=NullPool
+    )
+    with maintenance_engine.connect() as conn:
+        conn.execute(text(f"DROP DATABASE IF EXISTS {_quote(conn, database)}"))
+    maintenance_engine.dispose()
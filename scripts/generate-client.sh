@@ -4,8 +4,7 @@ set -e
 set -x
 
 cd backend
-FASTAPI_ENV=development uv run python -c "import app.main; import json; print(json.dumps(app.main.app.openapi()))" > ../openapi.json
+FASTAPI_ENV=development uv run python -m app.generate_openapi --output ../frontend/openapi.json
 cd ..
-mv openapi.json frontend/
 bun run --filter frontend generate-client
 bun run lint